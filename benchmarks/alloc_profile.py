@@ -0,0 +1,130 @@
+# benchmarks/alloc_profile.py
+"""Per-frame memory churn of the analysis loop: allocated bytes, page faults and RSS.
+
+Usage:
+    python -m benchmarks.alloc_profile [--resolution 2160p] [--frames 90] [--algorithms fd flow]
+                                       [--clip PATH] [--warmup 10] [--output profile.json]
+
+Each algorithm runs one analysis pass (ExtractionEngine.iter_frames with 'list' output, so no
+frame is retained by a sink, and without the duplicate fast path, so every frame takes the full
+blur + metric path). After `warmup` frames, every frame is measured for:
+  allocated   - tracemalloc peak above the level before the frame, i.e. the numpy / OpenCV
+                arrays allocated (and mostly freed again) while reading and analysing it.
+                Buffers inside the decoder are not visible to tracemalloc.
+  page faults - minor page faults (getrusage): freshly mmap()ed frame-sized buffers fault in
+                page by page, reused ones do not.
+  RSS         - resident set size after the frame (/proc/self/statm; Linux only).
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import statistics
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic import RESOLUTIONS, generate_clip
+from benchmarks.run_benchmarks import CLIP_CACHE_DIR
+from core.engine import ExtractionEngine
+from utils.constants import ALGO_SUFFIXES, OUTPUT_FORMAT_DECISION_LIST
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def rss_bytes():
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def profile_algorithm(clip_path, algorithm, warmup, params=None):
+    """Runs one analysis pass and returns per-frame means / medians / maxima of the measurements."""
+    with tempfile.TemporaryDirectory(prefix="afe_alloc_") as output_dir:
+        engine = ExtractionEngine(clip_path, os.path.join(output_dir, "alloc.mp4"), algorithm, params or {}, False,
+                                  checkpoint_interval=None, output_format=OUTPUT_FORMAT_DECISION_LIST,
+                                  duplicate_fast_path=False)
+        allocated, faults, rss = [], [], []
+        tracemalloc.start()
+        frames = engine.iter_frames()
+        start = time.perf_counter()
+        try:
+            index = 0
+            while True:
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                faults_before = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+                try:
+                    next(frames)
+                except StopIteration:
+                    break
+                if index >= warmup:
+                    allocated.append(tracemalloc.get_traced_memory()[1] - before)
+                    faults.append(resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults_before)
+                    rss.append(rss_bytes())
+                index += 1
+        finally:
+            frames.close()
+            tracemalloc.stop()
+        wall_time = time.perf_counter() - start
+    info = engine.video_info
+    frame_bytes = info['width'] * info['height'] * 3
+    rss = [value for value in rss if value is not None]
+    return {
+        'algorithm': ALGO_SUFFIXES[algorithm],
+        'frames_measured': len(allocated),
+        'frame_bytes': frame_bytes,
+        'allocated_bytes_per_frame_mean': round(statistics.mean(allocated)) if allocated else 0,
+        'allocated_bytes_per_frame_max': max(allocated, default=0),
+        'allocated_frames_per_frame': round(statistics.mean(allocated) / frame_bytes, 3) if allocated else 0.0,
+        'page_faults_per_frame_median': statistics.median(faults) if faults else 0,
+        'rss_steady_mb': round(statistics.median(rss) / 2**20, 1) if rss else None,
+        'rss_max_mb': round(max(rss) / 2**20, 1) if rss else None,
+        'fps': round((index) / wall_time, 2) if wall_time > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-frame allocation / RSS profile of the analysis loop.")
+    parser.add_argument('--resolution', default="2160p", choices=sorted(RESOLUTIONS))
+    parser.add_argument('--frames', type=int, default=90, help="frames of the synthetic clip")
+    parser.add_argument('--clip', help="profile this video instead of a synthetic clip")
+    parser.add_argument('--algorithms', nargs='+', default=sorted(ALGO_SUFFIXES.values()),
+                        choices=sorted(ALGO_SUFFIXES.values()))
+    parser.add_argument('--warmup', type=int, default=10, help="frames excluded from the statistics")
+    parser.add_argument('--output', help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    clip_path = args.clip
+    if clip_path is None:
+        width, height = RESOLUTIONS[args.resolution]
+        clip_path = os.path.join(CLIP_CACHE_DIR, f"synthetic_{args.resolution}_{args.frames}f_s0.mp4")
+        generate_clip(clip_path, width, height, args.frames)
+    suffix_to_algo = {suffix: algo for algo, suffix in ALGO_SUFFIXES.items()}
+    results = []
+    for suffix in args.algorithms:
+        record = profile_algorithm(clip_path, suffix_to_algo[suffix], args.warmup)
+        results.append(record)
+        print(f"{record['algorithm']:<5} allocated/frame {record['allocated_bytes_per_frame_mean'] / 2**20:8.1f} MiB "
+              f"({record['allocated_frames_per_frame']:.2f} BGR frames)  page faults/frame "
+              f"{record['page_faults_per_frame_median']:>6}  RSS steady {record['rss_steady_mb']} MiB "
+              f"(max {record['rss_max_mb']})  {record['fps']:.1f} fps")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'clip': clip_path, 'results': results}, f, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# benchmarks/compare.py
+"""Compares benchmark results against a saved baseline and flags throughput regressions.
+
+Usage:
+    python -m benchmarks.compare current.json [--baseline benchmarks/baseline.json] [--tolerance 0.10]
+
+Exit status is 1 if any case is slower than baseline by more than the tolerance, 0 otherwise.
+"""
+import os
+import sys
+import json
+import argparse
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.run_benchmarks import DEFAULT_BASELINE_PATH
+
+
+def load_records(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return {record['case']: record for record in json.load(f).get('records', [])}
+
+
+def compare(baseline, current, tolerance):
+    """Returns rows of (case, baseline_fps, current_fps, change, status) for cases present in both runs."""
+    rows = []
+    for case in sorted(set(baseline) | set(current)):
+        if case not in baseline or case not in current:
+            rows.append((case, baseline.get(case, {}).get('fps'), current.get(case, {}).get('fps'), None,
+                         "new" if case not in baseline else "missing"))
+            continue
+        base_fps, cur_fps = baseline[case]['fps'], current[case]['fps']
+        change = (cur_fps - base_fps) / base_fps if base_fps > 0 else 0.0
+        if change < -tolerance:
+            status = "REGRESSION"
+        elif change > tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((case, base_fps, cur_fps, change, status))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions against a baseline.")
+    parser.add_argument('current', help="results JSON produced by run_benchmarks")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed relative fps drop (default 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.baseline):
+        print(f"Baseline not found: {args.baseline} (create one with run_benchmarks --save-baseline)")
+        return 2
+    rows = compare(load_records(args.baseline), load_records(args.current), args.tolerance)
+
+    print(f"{'case':<28} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for case, base_fps, cur_fps, change, status in rows:
+        base_text = f"{base_fps:.1f}" if base_fps is not None else "-"
+        cur_text = f"{cur_fps:.1f}" if cur_fps is not None else "-"
+        change_text = f"{change * 100:+.1f}%" if change is not None else "-"
+        print(f"{case:<28} {base_text:>10} {cur_text:>10} {change_text:>8}  {status}")
+    regressions = [row for row in rows if row[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}% tolerance.")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
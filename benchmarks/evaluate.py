@@ -0,0 +1,125 @@
+# benchmarks/evaluate.py
+"""Accuracy-versus-speed evaluation of every algorithm and preset on labelled synthetic clips.
+
+Usage:
+    python -m benchmarks.evaluate [--resolutions 270p] [--frames 480] [--seeds 0 1 2] [--output eval.json]
+
+Ground truth comes from the synthetic generator: a frame should be kept when it starts a
+new drawing or a new scene. For each configuration the harness reports precision, recall,
+F1, kept ratio and frames/sec, and marks the configurations on the quality/speed Pareto
+front (no other configuration is both at least as accurate (F1) and at least as fast).
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic import RESOLUTIONS, generate_clip
+from benchmarks.run_benchmarks import CLIP_CACHE_DIR
+from core.engine import ExtractionEngine
+from utils.constants import PRESETS, ALGO_SUFFIXES
+from utils.helpers import params_from_preset
+
+
+def evaluation_configs():
+    """Returns [(name, algorithm, params)]: each algorithm with default params, then every preset."""
+    configs = [(f"algo:{suffix}", algorithm, {}) for algorithm, suffix in ALGO_SUFFIXES.items()]
+    for preset_name, preset in PRESETS.items():
+        algorithm, params = params_from_preset(preset)
+        configs.append((f"preset:{preset_name}", algorithm, params))
+    return configs
+
+
+def score_decisions(predicted, truth):
+    """Returns (tp, fp, fn) for boolean keep arrays of equal length."""
+    predicted = np.asarray(predicted, dtype=bool)
+    truth = np.asarray(truth, dtype=bool)
+    return (int(np.sum(predicted & truth)), int(np.sum(predicted & ~truth)), int(np.sum(~predicted & truth)))
+
+
+def run_config(clips, output_dir, algorithm, params):
+    """Runs one configuration over all clips; returns aggregated counts and timing."""
+    tp = fp = fn = kept = frames = 0
+    wall_time = 0.0
+    for clip in clips:
+        engine = ExtractionEngine(clip['path'], os.path.join(output_dir, "eval_out.mp4"), algorithm, params, False,
+                                  checkpoint_interval=None)
+        result = engine.run() # Raises on processing errors
+        truth = np.asarray(clip['keep'], dtype=bool)
+        predicted = engine.keep_flags[:len(truth)]
+        c_tp, c_fp, c_fn = score_decisions(predicted, truth[:len(predicted)])
+        tp, fp, fn = tp + c_tp, fp + c_fp, fn + c_fn
+        kept += int(np.sum(predicted))
+        frames += len(predicted)
+        wall_time += result.report['wall_time_s']
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        'kept_ratio': round(kept / frames, 4) if frames else 0.0,
+        'fps': round(frames / wall_time, 2) if wall_time > 0 else 0.0,
+        'frames': frames,
+        'tp': tp, 'fp': fp, 'fn': fn,
+    }
+
+
+def mark_pareto(rows):
+    """Sets row['pareto'] = True for rows not dominated on (f1, fps)."""
+    for row in rows:
+        row['pareto'] = not any(
+            other is not row and other['f1'] >= row['f1'] and other['fps'] >= row['fps']
+            and (other['f1'] > row['f1'] or other['fps'] > row['fps'])
+            for other in rows)
+    return rows
+
+
+def print_table(rows):
+    print(f"{'configuration':<44} {'prec':>6} {'recall':>6} {'f1':>6} {'kept%':>6} {'fps':>8}  pareto")
+    for row in sorted(rows, key=lambda r: -r['fps']):
+        print(f"{row['name']:<44} {row['precision']:>6.3f} {row['recall']:>6.3f} {row['f1']:>6.3f} "
+              f"{row['kept_ratio'] * 100:>5.1f}% {row['fps']:>8.1f}  {'*' if row['pareto'] else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precision/recall vs. speed for every algorithm and preset.")
+    parser.add_argument('--resolutions', nargs='+', default=["270p"], choices=sorted(RESOLUTIONS))
+    parser.add_argument('--frames', type=int, default=480, help="frames per synthetic clip")
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0, 1], help="one clip per seed and resolution")
+    parser.add_argument('--output', help="optional JSON output path")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    clips = []
+    for res_name in args.resolutions:
+        width, height = RESOLUTIONS[res_name]
+        for seed in args.seeds:
+            clip_path = os.path.join(CLIP_CACHE_DIR, f"synthetic_{res_name}_{args.frames}f_s{seed}.mp4")
+            clips.append(generate_clip(clip_path, width, height, args.frames, seed=seed))
+
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="afe_eval_out_") as output_dir:
+        for name, algorithm, params in evaluation_configs():
+            row = {'name': name, 'algorithm': ALGO_SUFFIXES[algorithm], 'params': params}
+            row.update(run_config(clips, output_dir, algorithm, params))
+            rows.append(row)
+    print_table(mark_pareto(rows))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'config': vars(args), 'rows': rows}, f, indent=2, ensure_ascii=False)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# benchmarks/run_benchmarks.py
+"""Headless benchmark suite: times every algorithm and output strategy on synthetic clips.
+
+Output strategies: forward / reverse MP4 (encoded by the async writer; reverse buffers the kept
+frames first), image sequences (png / jpg / webp, thread-pool writer) and the decision list
+(no frames encoded).
+
+Usage:
+    python -m benchmarks.run_benchmarks [--resolutions 270p 720p] [--frames 240] [--repeat 3]
+                                        [--output results.json] [--save-baseline]
+
+No display and no Qt is needed: the Qt-free core.engine runs each case synchronously
+and its JSON run reports are collected.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic import RESOLUTIONS, generate_clip
+from core.engine import ExtractionEngine
+from utils.constants import ALGO_SUFFIXES, OUTPUT_FORMAT_MP4, IMAGE_OUTPUT_FORMATS, OUTPUT_FORMAT_DECISION_LIST
+
+# Output strategies exercised by the suite (name -> ExtractionEngine keyword overrides)
+OUTPUT_STRATEGIES = {
+    "forward": {'reverse_video': False, 'output_format': OUTPUT_FORMAT_MP4},
+    "reverse": {'reverse_video': True, 'output_format': OUTPUT_FORMAT_MP4},
+}
+OUTPUT_STRATEGIES.update({image_format: {'reverse_video': False, 'output_format': image_format}
+                          for image_format in IMAGE_OUTPUT_FORMATS})
+OUTPUT_STRATEGIES[OUTPUT_FORMAT_DECISION_LIST] = {'reverse_video': False, 'output_format': OUTPUT_FORMAT_DECISION_LIST}
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+CLIP_CACHE_DIR = os.path.join(tempfile.gettempdir(), "afe_benchmark_clips")
+
+
+def run_case(clip_path, output_dir, algorithm, strategy, params=None):
+    """Runs one case synchronously and returns its run report (raises on processing error)."""
+    overrides = OUTPUT_STRATEGIES[strategy]
+    output_path = os.path.join(output_dir, f"bench_{ALGO_SUFFIXES[algorithm]}_{strategy}.mp4")
+    engine = ExtractionEngine(clip_path, output_path, algorithm, params or {}, overrides['reverse_video'],
+                              checkpoint_interval=None, # Checkpoint I/O would skew the timings
+                              output_format=overrides['output_format'])
+    return engine.run().report
+
+
+def run_suite(resolutions, frames, repeat, algorithms=None, strategies=None, seed=0):
+    """Runs every (resolution, algorithm, strategy) case and returns the list of result records."""
+    algorithms = algorithms or list(ALGO_SUFFIXES)
+    strategies = strategies or list(OUTPUT_STRATEGIES)
+    records = []
+    with tempfile.TemporaryDirectory(prefix="afe_bench_out_") as output_dir:
+        for res_name in resolutions:
+            width, height = RESOLUTIONS[res_name]
+            clip_path = os.path.join(CLIP_CACHE_DIR, f"synthetic_{res_name}_{frames}f_s{seed}.mp4")
+            generate_clip(clip_path, width, height, frames, seed=seed)
+            for algorithm in algorithms:
+                for strategy in strategies:
+                    wall_times = []
+                    report = None
+                    for _ in range(repeat):
+                        report = run_case(clip_path, output_dir, algorithm, strategy)
+                        wall_times.append(report['wall_time_s'])
+                    best = min(wall_times)
+                    record = {
+                        'case': f"{res_name}/{ALGO_SUFFIXES[algorithm]}/{strategy}",
+                        'resolution': res_name,
+                        'width': width,
+                        'height': height,
+                        'frames': frames,
+                        'algorithm': ALGO_SUFFIXES[algorithm],
+                        'strategy': strategy,
+                        'wall_time_s': best,
+                        'wall_times_s': wall_times,
+                        'fps': round(frames / best, 2) if best > 0 else 0.0,
+                        'kept_frames': report['kept_frames'],
+                        'stages': report['stages'],
+                        'bottleneck_stage': report['bottleneck_stage'],
+                    }
+                    records.append(record)
+                    print(f"{record['case']:<28} {record['fps']:>9.1f} fps  kept={record['kept_frames']:<5} "
+                          f"bottleneck={record['bottleneck_stage']}")
+    return records
+
+
+def build_results(records, args):
+    import cv2
+    import numpy as np
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'processor': platform.processor(), 'cpu_count': os.cpu_count(),
+                    'opencv': cv2.__version__, 'numpy': np.__version__},
+        'config': {'resolutions': args.resolutions, 'frames': args.frames, 'repeat': args.repeat, 'seed': args.seed},
+        'records': records,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless frame-extraction benchmarks on synthetic anime clips.")
+    parser.add_argument('--resolutions', nargs='+', default=["270p", "720p"], choices=sorted(RESOLUTIONS))
+    parser.add_argument('--frames', type=int, default=240, help="frames per synthetic clip")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per case; the fastest is recorded")
+    parser.add_argument('--algorithms', nargs='+', choices=sorted(ALGO_SUFFIXES.values()), help="subset of algorithms (fd/ssim/flow)")
+    parser.add_argument('--strategies', nargs='+', choices=sorted(OUTPUT_STRATEGIES), help="subset of output strategies")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also store the results as {DEFAULT_BASELINE_PATH}")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s - %(message)s')
+    suffix_to_algo = {suffix: algo for algo, suffix in ALGO_SUFFIXES.items()}
+    algorithms = [suffix_to_algo[a] for a in args.algorithms] if args.algorithms else None
+
+    records = run_suite(args.resolutions, args.frames, args.repeat, algorithms, args.strategies, args.seed)
+    results = build_results(records, args)
+
+    output_path = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    paths = [output_path] + ([DEFAULT_BASELINE_PATH] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
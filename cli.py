@@ -0,0 +1,378 @@
+# cli.py
+"""Headless command-line entry point (no Qt, no settings file, no dependency installation).
+
+Usage:
+    python cli.py INPUT [INPUT ...] [-a fd|ssim|flow] [--preset NAME] [-o OUTPUT_DIR] [-j N] [--json]
+    python cli.py --watch DIR [DIR ...] [options]   # long-running watch-folder mode
+
+INPUT may be a video file, a glob pattern (quoted, e.g. "shots/*.mp4") or a directory
+(its video files, non-recursive). Each input is written to
+<output_dir>/processed_<name>.mp4 (default: next to the input), or with --format png|webp|jpg
+to the image sequence <output_dir>/processed_<name>.frames/frame_000000.png, ... With
+--format list nothing is encoded: the kept frames are listed in processed_<name>.json/.csv/.edl.
+
+With --job-db PATH, every job is recorded in a SQLite history and inputs whose content was
+already processed successfully with the same parameters are skipped, so a failed batch can
+simply be re-run (not in --watch mode, which skips files whose output is up to date instead).
+
+Exit status: 0 = every file succeeded (or was skipped), 1 = at least one file failed,
+2 = usage error / no input files, 130 = interrupted.
+In --watch mode the process runs until SIGINT/SIGTERM and then exits with 0 (or 1 if any file failed);
+results are printed as they finish (one JSON object per line with --json).
+"""
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import signal
+import argparse
+
+project_root = os.path.dirname(os.path.abspath(__file__))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils.constants import (PRESETS, ALGO_SUFFIXES, VIDEO_EXTENSIONS, ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW,
+                             WATCH_POLL_INTERVAL, WATCH_SETTLE_SECONDS, OUTPUT_FORMAT_MP4, IMAGE_OUTPUT_FORMATS,
+                             OUTPUT_FORMAT_DECISION_LIST)
+from utils.helpers import params_from_preset, preset_slug
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+# Blur parameter key per algorithm (the same names the GUI and the engine use)
+BLUR_KEYS = {ALGO_FRAME_DIFF: 'f_diff_blur_size', ALGO_SSIM: 'ssim_blur_size', ALGO_OPTICAL_FLOW: 'flow_blur_size'}
+
+
+def resolve_preset(name):
+    """Finds a PRESETS entry by full name or by the English name in parentheses (case-insensitive)."""
+    if name in PRESETS:
+        return PRESETS[name]
+    wanted = name.strip().lower()
+    for preset_name, preset in PRESETS.items():
+        english = preset_name[preset_name.find("(") + 1:preset_name.rfind(")")] if "(" in preset_name else preset_name
+        if wanted in (preset_name.lower(), english.lower()):
+            return preset
+    return None
+
+
+def expand_inputs(patterns):
+    """Expands files / glob patterns / directories into a de-duplicated, ordered list of video paths."""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = sorted(os.path.join(pattern, name) for name in os.listdir(pattern)
+                                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS)
+        elif glob.has_magic(pattern):
+            candidates = sorted(path for path in glob.glob(pattern) if os.path.isfile(path))
+        else:
+            candidates = [pattern] # Missing files are reported as per-file errors
+        for path in candidates:
+            key = os.path.normcase(os.path.abspath(path))
+            if key not in seen:
+                seen.add(key)
+                paths.append(path)
+    return paths
+
+
+def build_params(args):
+    """Returns (algorithm, params) from --preset / --algorithm and the explicit parameter overrides."""
+    if args.preset:
+        algorithm, params = params_from_preset(resolve_preset(args.preset))
+    else:
+        suffix_to_algo = {suffix: algo for algo, suffix in ALGO_SUFFIXES.items()}
+        algorithm, params = suffix_to_algo[args.algorithm or "fd"], {}
+    if args.algorithm and args.preset:
+        logging.warning("--algorithm is ignored when --preset is given.")
+    overrides = {'f_diff_threshold': args.threshold, 'f_diff_min_area': args.min_area,
+                 'ssim_threshold': args.ssim_threshold, 'flow_threshold': args.flow_threshold}
+    params.update({key: value for key, value in overrides.items() if value is not None})
+    if args.blur is not None:
+        params[BLUR_KEYS[algorithm]] = args.blur
+    return algorithm, params
+
+
+def engine_options(args):
+    """Extra ExtractionEngine arguments shared by every job (picklable, for the worker processes)."""
+    return {'output_format': args.format, 'score_cache_dir': args.score_cache, 'all_metrics': args.all_metrics,
+            'temporal_stride': args.stride, 'duplicate_fast_path': not args.no_fast_path,
+            'memory_budget_mb': args.memory_budget, 'concurrent_jobs': args.jobs}
+
+
+def fanout_configs(args):
+    """--also presets as (algorithm, params, file-name suffix) fan-out configurations."""
+    configs = []
+    for name in args.also or ():
+        preset_name = _preset_name(name)
+        algorithm, params = params_from_preset(PRESETS[preset_name])
+        configs.append((algorithm, params, preset_slug(preset_name)))
+    return configs
+
+
+def _preset_name(name):
+    """Full PRESETS key for a name accepted by resolve_preset()."""
+    preset = resolve_preset(name)
+    return next(preset_name for preset_name, candidate in PRESETS.items() if candidate is preset)
+
+
+def _job_options(options, output_path, extra_outputs):
+    """Per-job engine options: fan-out outputs are named after the job's own output."""
+    if not extra_outputs:
+        return options
+    from core.engine import variant_output_path
+    return dict(options, extra_outputs=[(algorithm, params, variant_output_path(output_path, suffix))
+                                        for algorithm, params, suffix in extra_outputs])
+
+
+def _output_path_for(video_path, output_dir, output_format=OUTPUT_FORMAT_MP4):
+    from core.engine import batch_output_path
+    from core.sinks import sink_output_path
+    output_path = batch_output_path(output_dir or os.path.dirname(os.path.abspath(video_path)), video_path)
+    return sink_output_path(output_path, output_format)
+
+
+def iter_results(jobs, max_workers):
+    """Yields result records as jobs finish; in-process when max_workers == 1."""
+    from core.engine import run_extraction_job, create_worker_pool
+    if max_workers <= 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield run_extraction_job(job)
+        return
+    from concurrent.futures import as_completed
+    executor = create_worker_pool(max_workers)
+    try:
+        futures = [executor.submit(run_extraction_job, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def filter_completed_jobs(jobs, store, extra_outputs=()):
+    """Splits jobs into (to_run, skipped_records, job_ids) using the job history in `store`.
+
+    A database error (locked / corrupt file) only costs the history: the job runs untracked.
+    """
+    import sqlite3
+    from core.job_store import content_fingerprint, job_params_key, skipped_record
+    to_run, skipped, job_ids = [], [], {}
+    for job in jobs:
+        video_path, output_path, algorithm, params, reverse_video, options = job
+        try:
+            fingerprint = content_fingerprint(video_path)
+        except OSError: # The worker reports the real error
+            to_run.append(job)
+            continue
+        key = job_params_key(algorithm, params, reverse_video, options['output_format'], extra_outputs,
+                             options.get('temporal_stride', 1), options.get('duplicate_fast_path', True))
+        try:
+            previous_job = store.find_completed(fingerprint, key)
+            if previous_job is None:
+                job_ids[video_path] = store.start(fingerprint, key, video_path, output_path)
+        except sqlite3.Error as e:
+            logging.warning(f"Job history unavailable for {video_path}: {e}")
+            previous_job = None
+        if previous_job is not None:
+            record = skipped_record(os.path.basename(video_path), previous_job)
+            record['input'] = video_path
+            skipped.append(record)
+        else:
+            to_run.append(job)
+    return to_run, skipped, job_ids
+
+
+def finish_job(store, job_id, record, cancelled=False):
+    """Records a job outcome; a database error is logged, never raised (the output is already written)."""
+    import sqlite3
+    try:
+        store.finish(job_id, record, cancelled=cancelled)
+    except sqlite3.Error as e:
+        logging.warning(f"Could not record job outcome for {record.get('input', job_id)}: {e}")
+
+
+def print_record(record):
+    if record['status'] == 'success':
+        print(f"OK    {record['input']} -> {record['output']}  kept={record['kept']}  speed={record['speed']:.2f}%  "
+              f"{record['wall_time_s']:.2f}s", flush=True)
+        for extra in record.get('extra_outputs', []):
+            print(f"      + {extra['output']}  kept={extra['kept']}  speed={extra['speed']:.2f}%", flush=True)
+    elif record['status'] == 'skipped':
+        print(f"SKIP  {record['input']} -> {record['output']}  (already processed)", flush=True)
+    else:
+        print(f"FAIL  {record['input']}: {record['message']}", flush=True)
+
+
+def run_watch(args, algorithm, params):
+    """--watch: processes settled files from the given directories until SIGINT/SIGTERM."""
+    from core.watcher import WatchService
+    directories = [path for path in args.inputs if os.path.isdir(path)]
+    if len(directories) != len(args.inputs):
+        print("--watch expects directories only.", file=sys.stderr)
+        return EXIT_USAGE
+
+    def on_result(record):
+        if args.json:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        else:
+            print_record(record)
+
+    service = WatchService(directories, args.output_dir, algorithm, params, args.reverse, workers=args.jobs,
+                           on_result=on_result, engine_options=engine_options(args), settle_seconds=args.settle, poll_interval=args.poll_interval,
+                           include_existing=not args.skip_existing, use_inotify=not args.polling)
+    signal.signal(signal.SIGTERM, lambda signum, frame: service.stop())
+    print(f"Watching {', '.join(directories)} (Ctrl+C to stop)...", file=sys.stderr)
+    try:
+        _, failed = service.run()
+    except KeyboardInterrupt:
+        service.stop()
+        failed = service.failed
+    print(f"Watch stopped: {service.processed} processed, {service.failed} failed.", file=sys.stderr)
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless anime frame extraction (files, globs or directories).")
+    parser.add_argument('inputs', nargs='+', metavar='INPUT', help="video files, glob patterns or directories")
+    parser.add_argument('-a', '--algorithm', choices=sorted(ALGO_SUFFIXES.values()), help="fd (default) / ssim / flow")
+    parser.add_argument('-p', '--preset', help="preset name, e.g. 'Default' or 'High Action'")
+    parser.add_argument('--threshold', type=int, help="frame difference: pixel threshold")
+    parser.add_argument('--min-area', type=int, help="frame difference: minimum changed area")
+    parser.add_argument('--ssim-threshold', type=float, help="SSIM: keep frames below this similarity")
+    parser.add_argument('--flow-threshold', type=float, help="optical flow: keep frames above this mean motion")
+    parser.add_argument('--blur', type=int, help="Gaussian blur kernel size for the selected algorithm")
+    parser.add_argument('-o', '--output-dir', help="output directory (default: next to each input)")
+    parser.add_argument('-r', '--reverse', action='store_true', help="write the kept frames in reverse order")
+    parser.add_argument('-f', '--format', default=OUTPUT_FORMAT_MP4,
+                        choices=(OUTPUT_FORMAT_MP4,) + IMAGE_OUTPUT_FORMATS + (OUTPUT_FORMAT_DECISION_LIST,),
+                        help="mp4 video (default), an image sequence in <output name>.frames/, or 'list': "
+                             "only the kept frames as <output name>.json/.csv/.edl (no video is written)")
+    parser.add_argument('--also', metavar='PRESET', action='append',
+                        help="also write the output of this preset from the same decode (repeatable), "
+                             "as <output name>_<preset>.mp4")
+    parser.add_argument('--score-cache', metavar='DIR',
+                        help="cache per-frame scores per input here; a later run with the same algorithm/blur "
+                             "(any keep threshold) skips the analysis")
+    parser.add_argument('--all-metrics', action='store_true',
+                        help="score fd, SSIM and optical flow from a single decode and cache all three (needs --score-cache)")
+    parser.add_argument('--stride', type=int, default=1, metavar='K',
+                        help="adaptive analysis: compare frames K apart and only refine intervals that change; "
+                             "frames of held drawings are skipped without being decoded to images (default 1 = off)")
+    parser.add_argument('--no-fast-path', action='store_true',
+                        help="score every frame, even those whose thumbnail hash equals the previous frame's")
+    parser.add_argument('--memory-budget', type=int, metavar='MB',
+                        help="memory for the kept frames of --reverse mp4 output, shared by --jobs; beyond it they are "
+                             "PNG-compressed, spilled to a temp file or decoded again (default: half the available RAM)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, help="files processed in parallel (worker processes)")
+    parser.add_argument('--job-db', metavar='PATH', help="SQLite job history; skip inputs already processed with the same parameters")
+    parser.add_argument('--json', action='store_true', help="print a JSON summary on stdout instead of one line per file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log progress details to stderr")
+    watch = parser.add_argument_group("watch-folder mode")
+    watch.add_argument('-w', '--watch', action='store_true', help="keep running and process new files dropped into the INPUT directories")
+    watch.add_argument('--settle', type=float, default=WATCH_SETTLE_SECONDS,
+                       help="seconds a file's size must stay unchanged before it is processed")
+    watch.add_argument('--poll-interval', type=float, default=WATCH_POLL_INTERVAL, help="directory polling interval without inotify")
+    watch.add_argument('--polling', action='store_true', help="do not use inotify (always poll)")
+    watch.add_argument('--skip-existing', action='store_true', help="ignore files already present when the watch starts")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, stream=sys.stderr,
+                        format='%(levelname)s - %(message)s')
+    if args.preset and resolve_preset(args.preset) is None:
+        parser.error(f"unknown preset {args.preset!r}; available: {', '.join(PRESETS)}")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.stride < 1:
+        parser.error("--stride must be at least 1")
+    if args.memory_budget is not None and args.memory_budget < 1:
+        parser.error("--memory-budget must be at least 1 MB")
+    if args.stride > 1 and (args.also or args.all_metrics):
+        parser.error("--stride cannot be combined with --also / --all-metrics (they need every frame scored)")
+    for name in args.also or ():
+        if resolve_preset(name) is None:
+            parser.error(f"unknown preset {name!r} for --also; available: {', '.join(PRESETS)}")
+    if args.also and args.watch:
+        parser.error("--also is not supported in --watch mode")
+    if args.job_db and args.watch:
+        parser.error("--job-db is not supported in --watch mode (up-to-date outputs are skipped instead)")
+    if args.all_metrics and not args.score_cache:
+        parser.error("--all-metrics needs --score-cache DIR (the extra score tracks are only kept in the cache)")
+
+    if args.watch:
+        algorithm, params = build_params(args)
+        return run_watch(args, algorithm, params)
+
+    video_paths = expand_inputs(args.inputs)
+    if not video_paths:
+        print("No input video files found.", file=sys.stderr)
+        return EXIT_USAGE
+    algorithm, params = build_params(args)
+    options = engine_options(args)
+    extra_outputs = fanout_configs(args)
+    jobs = []
+    for path in video_paths:
+        output_path = _output_path_for(path, args.output_dir, args.format)
+        jobs.append((path, output_path, algorithm, params, args.reverse, _job_options(options, output_path, extra_outputs)))
+
+    start = time.perf_counter()
+    records = []
+    store, job_ids = None, {}
+    if args.job_db:
+        from core.job_store import JobStore
+        try:
+            store = JobStore(args.job_db)
+        except Exception as e: # sqlite3.Error / OSError: process everything instead
+            logging.warning(f"Job history unavailable ({args.job_db}): {e}")
+    if store is not None:
+        jobs, records, job_ids = filter_completed_jobs(jobs, store, extra_outputs)
+        if not args.json:
+            for record in records:
+                print_record(record)
+    if args.jobs > 1 and len(jobs) > 1:
+        # Longest estimated job first, so one long file does not run alone at the end
+        from core.scheduler import plan_batch
+        by_path = {job[0]: job for job in jobs}
+        jobs = [by_path[path] for path in plan_batch(list(by_path), algorithm, args.jobs).paths]
+    try:
+        for record in iter_results(jobs, max(1, min(args.jobs, len(jobs)))):
+            records.append(record)
+            job_id = job_ids.pop(record['input'], None)
+            if job_id is not None:
+                finish_job(store, job_id, record)
+            if not args.json:
+                print_record(record)
+    except KeyboardInterrupt:
+        print("Interrupted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    finally:
+        if store is not None:
+            for video_path, job_id in job_ids.items(): # Never finished: interrupted
+                finish_job(store, job_id, {'status': 'error', 'message': "interrupted"}, cancelled=True)
+            store.close()
+
+    failed = sum(1 for record in records if record['status'] == 'error')
+    skipped = sum(1 for record in records if record['status'] == 'skipped')
+    if args.json:
+        order = {path: index for index, path in enumerate(video_paths)}
+        records.sort(key=lambda record: order[record['input']])
+        summary = {
+            'status': "ok" if not failed else "failed",
+            'algorithm': ALGO_SUFFIXES[algorithm],
+            'params': params,
+            'files_total': len(records),
+            'files_succeeded': len(records) - failed - skipped,
+            'files_failed': failed,
+            'files_skipped': skipped,
+            'wall_time_s': round(time.perf_counter() - start, 4),
+            'files': records,
+        }
+        json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# core/adaptive.py
+"""Coarse-to-fine keep decisions: compare frames `stride` apart and refine only where they differ.
+
+Much of anime is held drawings. AdaptiveSampler compares the first and the last frame of each
+window of `stride` frames; when that change score is well below the keep threshold
+(static_ratio * decision_threshold) the frames inside are dropped without being retrieved
+(cap.grab() only: no BGR conversion, cvtColor, blur or metric). Windows that show change are
+bisected the same way, and adjacent pairs get the exact frame-by-frame comparison. Once a
+window changes, the following windows are compared frame by frame (window tests would only
+add comparisons during motion) until a window keeps nothing, which suggests a hold again.
+
+This is a heuristic: a change that returns to the starting drawing inside a static window
+(a blink) is not seen; a smaller stride or ratio trades speed for safety. grab() still
+decodes the frame in FFmpeg, so the savings are the retrieve, preprocessing and metric. After
+a static window the next one is read speculatively (interior grabbed, end retrieved); when it
+turns out to change, the interior is re-read after a seek, which decodes again from the
+previous keyframe.
+"""
+import time
+import logging
+
+import cv2
+import numpy as np
+
+from core.timing import STAGE_READ
+from utils.constants import ADAPTIVE_STATIC_RATIO
+
+# Shorter intervals inside a changing window are compared frame by frame: testing them first
+# costs more comparisons than it can save
+MIN_TESTED_INTERVAL = 4
+
+
+class AdaptiveSampler:
+    """Yields (index, frame, score, keep) for every frame of a capture, in order, like a sequential pass.
+
+    Dropped frames that were never retrieved come with frame=None, and frames decided by an
+    interval comparison with score NaN. The first and the last frame are always kept. `stats`
+    counts windows, static windows, frames not retrieved, comparisons and seeks.
+    """
+    def __init__(self, analyzer, capture, input_path, stride, static_ratio=ADAPTIVE_STATIC_RATIO,
+                 timer=None, tracker=None):
+        self.analyzer = analyzer
+        self.cap = capture # Replaced when a seek has to reopen the input
+        self.input_path = input_path
+        self.stride = max(2, int(stride))
+        self.static_limit = static_ratio * analyzer.decision_threshold()
+        self.timer = timer
+        self.tracker = tracker
+        self.last_index = -1
+        self._seekable = True
+        self._blurred = {}
+        self.stats = {'windows': 0, 'static_windows': 0, 'frames_not_retrieved': 0, 'comparisons': 0, 'seeks': 0}
+
+    def release(self):
+        self.cap.release()
+
+    # --- Capture access (timed as read) ---
+    def _add_read_time(self, start, frames=1):
+        seconds = time.perf_counter() - start
+        if self.timer is not None:
+            self.timer.add(STAGE_READ, seconds)
+        if self.tracker is not None:
+            self.tracker.add_decoded(seconds, frames)
+
+    def _read(self):
+        start = time.perf_counter()
+        ret, frame = self.cap.read()
+        self._add_read_time(start)
+        return frame if ret else None
+
+    def _grab(self):
+        start = time.perf_counter()
+        ret = self.cap.grab()
+        self._add_read_time(start)
+        return ret
+
+    def _seek(self, index):
+        """Positions the capture so that the next read returns frame `index`."""
+        start = time.perf_counter()
+        self.stats['seeks'] += 1
+        if not (self.cap.set(cv2.CAP_PROP_POS_FRAMES, index) and int(self.cap.get(cv2.CAP_PROP_POS_FRAMES)) == index):
+            # Unreliable seeking in this container: reopen, grab forward and stop speculating
+            logging.warning(f"Adaptive stride: inexact seek to frame {index} in {self.input_path}, "
+                            f"re-reading from the start and disabling speculative skipping.")
+            self._seekable = False
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.input_path)
+            for _ in range(index):
+                if not self.cap.grab():
+                    break
+        self._add_read_time(start, frames=0)
+
+    # --- Decisions ---
+    def _blur(self, frames, index):
+        if index not in self._blurred:
+            self._blurred[index] = self.analyzer.preprocess(frames[index])
+        return self._blurred[index]
+
+    def _compare(self, frames, lo, hi):
+        self.stats['comparisons'] += 1
+        return self.analyzer.compare(self._blur(frames, lo), self._blur(frames, hi), hi)
+
+    def _is_static(self, score):
+        return not np.isnan(score) and score < self.static_limit
+
+    def _drop(self, decisions, lo, hi):
+        """Drops frames lo+1..hi (the last frame of the video stays kept)."""
+        for index in range(lo + 1, hi + 1):
+            decisions[index] = (np.nan, index == self.last_index)
+
+    def _refine(self, frames, decisions, lo, hi, score=None):
+        """Decides frames lo+1..hi of a buffered interval; `score` is the lo/hi comparison if already made."""
+        if hi - lo == 1:
+            if hi == self.last_index:
+                decisions[hi] = (np.nan, True)
+            else:
+                decisions[hi] = self._compare(frames, lo, hi)
+            return
+        if score is None and hi - lo >= MIN_TESTED_INTERVAL:
+            score, _ = self._compare(frames, lo, hi)
+        if score is not None and self._is_static(score):
+            self._drop(decisions, lo, hi)
+            return
+        mid = (lo + hi) // 2
+        self._refine(frames, decisions, lo, mid)
+        self._refine(frames, decisions, mid, hi)
+
+    def _read_window(self, frames, first, last):
+        """Reads frames first..last into `frames`; returns the last index read (first - 1 at end of stream)."""
+        for index in range(first, last + 1):
+            frame = self._read()
+            if frame is None:
+                logging.warning(f"Frame read failed at index {index}/{self.last_index + 1}. End of stream or error.")
+                return index - 1
+            frames[index] = frame
+        return last
+
+    def frames(self, total_frames):
+        self.last_index = total_frames - 1
+        first = self._read()
+        if first is None:
+            logging.warning(f"Frame read failed at index 0/{total_frames}. End of stream or error.")
+            return
+        frames = {0: first}
+        self._blurred = {0: self.analyzer.preprocess(first)}
+        yield 0, first, np.nan, True
+        a = 0
+        coarse = True # Test the whole window first (and read it without retrieving its interior)
+        while a < self.last_index:
+            window_end = min(a + self.stride, self.last_index)
+            self.stats['windows'] += 1
+            frames = {a: frames[a]}
+            self._blurred = {a: self._blurred[a]}
+            decisions = {}
+            skipped = False
+            if coarse and self._seekable and window_end - a > 1:
+                for _ in range(a + 1, window_end):
+                    if not self._grab():
+                        break
+                else:
+                    end_frame = self._read()
+                    if end_frame is not None:
+                        frames[window_end] = end_frame
+                        skipped = True
+                if not skipped: # Stream ended inside the window: read it frame by frame
+                    self._seek(a + 1)
+            b = window_end if skipped else self._read_window(frames, a + 1, window_end)
+            if b <= a:
+                return
+            analysis_start = time.perf_counter()
+            read_seconds = 0.0
+            score = None
+            if coarse and b - a > 1:
+                score, _ = self._compare(frames, a, b)
+            if not coarse: # In motion: exact comparisons only, a window test would nearly always fail
+                for index in range(a + 1, b + 1):
+                    self._refine(frames, decisions, index - 1, index)
+            elif score is not None and self._is_static(score):
+                self.stats['static_windows'] += 1
+                if skipped:
+                    self.stats['frames_not_retrieved'] += b - a - 1
+                self._drop(decisions, a, b)
+            else:
+                if skipped: # Misprediction: fetch the interior, then step over the end frame already held
+                    read_start = time.perf_counter()
+                    self._seek(a + 1)
+                    if self._read_window(frames, a + 1, b - 1) < b - 1:
+                        raise IOError(f"定位后无法重新读取第 {a + 1}-{b - 1} 帧: {self.input_path}")
+                    self._grab()
+                    read_seconds = time.perf_counter() - read_start
+                self._refine(frames, decisions, a, b, score=score)
+            # A window without kept frames suggests a held drawing: go back to window tests
+            coarse = not any(keep for _, keep in decisions.values())
+            if self.tracker is not None:
+                self.tracker.add_analyzed(time.perf_counter() - analysis_start - read_seconds, frames=b - a)
+            for index in range(a + 1, b + 1):
+                score_i, keep = decisions[index]
+                yield index, frames.get(index), score_i, keep
+            if b < window_end:
+                return # End of stream
+            a = b
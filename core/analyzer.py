@@ -0,0 +1,409 @@
+# core/analyzer.py
+import time
+import hashlib
+import logging
+
+import cv2
+import numpy as np
+
+from utils.constants import ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW, ALGO_SUFFIXES, DUPLICATE_THUMB_SIZE
+from core.timing import STAGE_CVT_COLOR, STAGE_BLUR, STAGE_METRIC
+
+_ssim_function = None
+
+def _structural_similarity():
+    """Imports skimage's SSIM on first use, so runs without ALGO_SSIM never load scikit-image."""
+    global _ssim_function
+    if _ssim_function is None:
+        from skimage.metrics import structural_similarity # ImportError is reported as a processing error
+        _ssim_function = structural_similarity
+    return _ssim_function
+
+
+def thumbnail_digest(gray):
+    """blake2b of an area-averaged DUPLICATE_THUMB_SIZE luma thumbnail (every pixel contributes to it).
+
+    Equal digests of consecutive frames mean the frames are identical at thumbnail scale:
+    a re-encoded duplicate or a hold with at most sub-level noise.
+    """
+    thumb = cv2.resize(gray, DUPLICATE_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    return hashlib.blake2b(thumb.tobytes(), digest_size=16).digest()
+
+
+class FrameAnalyzer:
+    """Keep/drop decision for consecutive frames with one algorithm.
+
+    Every algorithm produces a "change score" against the previous frame (larger = more
+    different) and keeps the frame when the score exceeds decision_threshold():
+    frame difference -> largest changed contour area, SSIM -> 1 - SSIM, optical flow ->
+    mean flow magnitude. The first and the last frame are always kept.
+
+    With duplicate_fast_path, analyze() first hashes a small thumbnail of the grayscale frame
+    (thumbnail_digest); a frame whose digest equals the previous frame's is dropped with score
+    0.0 before blur and metric. duplicate_hits / duplicate_checks count how often that fires.
+
+    The sequential pass (analyze()) allocates no frame-sized arrays once warmed up: grayscale,
+    diff, mask and flow buffers are reused via dst= arguments, and the blurred frame alternates
+    between two buffers (current / previous). preprocess() still returns new arrays, because
+    callers such as core.adaptive keep several of them at once.
+    """
+    def __init__(self, algorithm, params, timer=None, duplicate_fast_path=True):
+        self.algorithm = algorithm
+        self.params = params # 传入包含所有可能参数的字典
+        self.timer = timer # Optional StageTimer
+
+        # 根据算法提取和验证所需参数
+        self.threshold = params.get('f_diff_threshold', 15)
+        self.min_area = params.get('f_diff_min_area', 500)
+        self.ssim_threshold = params.get('ssim_threshold', 0.98)
+        # 光流法: 直接使用平均运动幅度阈值，界面上的值越低越敏感 (容易保留)
+        self.flow_threshold = params.get('flow_threshold', 1.0) # 值越小越敏感
+        # 模糊程度根据所选算法获取
+        if self.algorithm == ALGO_SSIM:
+             self.blur_size = params.get('ssim_blur_size', 5)
+        elif self.algorithm == ALGO_OPTICAL_FLOW:
+             self.blur_size = params.get('flow_blur_size', 7)
+        else: # ALGO_FRAME_DIFF
+             self.blur_size = params.get('f_diff_blur_size', 5)
+
+        # Ensure blur size is always odd and positive
+        self.blur_size = max(1, self.blur_size if self.blur_size % 2 == 1 else self.blur_size + 1)
+        self.prev_frame_gray_blurred = None # Used by all algorithms
+        self.duplicate_fast_path = duplicate_fast_path
+        self._prev_digest = None
+        self.duplicate_checks = 0
+        self.duplicate_hits = 0
+        self._buffers = {} # name -> reusable work array
+
+    def _buffer(self, name, shape, dtype=np.uint8):
+        """Reusable work array, reallocated only when the frame size changes."""
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype)
+        return buffer
+
+    def decision_threshold(self):
+        """Returns the score above which a frame is kept, in the units of the per-frame metric."""
+        # 所有算法的分数统一为“变化量”：越大表示与上一帧差异越大
+        if self.algorithm == ALGO_SSIM:
+            return 1.0 - self.ssim_threshold
+        elif self.algorithm == ALGO_OPTICAL_FLOW:
+            return float(self.flow_threshold)
+        return float(self.min_area)
+
+    def metric_key(self):
+        """Identifies the score track: algorithm plus the parameters that change the scores themselves
+        (blur size, and the pixel threshold for frame difference), not the keep thresholds.
+        Tracks scored without the duplicate fast path get a "_nodup" suffix, because the fast path
+        compares thumbnails and so changes the scores of near-identical frames."""
+        key = f"{ALGO_SUFFIXES[self.algorithm]}_b{self.blur_size}"
+        if self.algorithm == ALGO_FRAME_DIFF:
+            key += f"_t{self.threshold}"
+        if not self.duplicate_fast_path:
+            key += "_nodup"
+        return key
+
+    def decide(self, scores, total_frames):
+        """Keep flags for a stored score track, identical to what analyze() decided frame by frame.
+
+        Frames beyond len(scores) were never analysed and are dropped; NaN scores inside the
+        track (first / last frame, SSIM fallbacks) are kept.
+        """
+        keep = np.zeros(total_frames, dtype=bool)
+        analysed = min(len(scores), total_frames)
+        with np.errstate(invalid='ignore'):
+            keep[:analysed] = np.isnan(scores[:analysed]) | (scores[:analysed] > self.decision_threshold())
+        return keep
+
+    def reset(self):
+        self.prev_frame_gray_blurred = None
+        self._prev_digest = None
+        self.duplicate_checks = 0
+        self.duplicate_hits = 0
+
+    def duplicate_stats(self):
+        """Fast-path counters for the run report."""
+        checks = self.duplicate_checks
+        return {'checked': checks, 'hits': self.duplicate_hits,
+                'hit_rate': round(self.duplicate_hits / checks, 4) if checks else 0.0}
+
+    def grayscale(self, frame):
+        """BGR -> gray, plus the thumbnail digest when the duplicate fast path is on (both timed as cvtColor)."""
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._buffer('gray', frame.shape[:2]))
+        digest = thumbnail_digest(gray) if self.duplicate_fast_path else None
+        if self.timer is not None:
+            self.timer.add(STAGE_CVT_COLOR, time.perf_counter() - start)
+        return gray, digest
+
+    def prime(self, frame):
+        """Grayscale of the first frame of a pass; its digest becomes the fast-path reference."""
+        gray, self._prev_digest = self.grayscale(frame)
+        return gray
+
+    @property
+    def reference_digest(self):
+        """Fast-path digest of the last non-duplicate frame (saved and restored by checkpoints)."""
+        return self._prev_digest
+
+    @reference_digest.setter
+    def reference_digest(self, digest):
+        self._prev_digest = digest
+
+    def is_duplicate(self, digest):
+        """Counts one fast-path check; True when `digest` equals the previous frame's (which is then kept as reference)."""
+        if digest is None:
+            return False
+        self.duplicate_checks += 1
+        if digest == self._prev_digest:
+            self.duplicate_hits += 1
+            return True
+        self._prev_digest = digest
+        return False
+
+    def blur(self, gray, dst=None):
+        start = time.perf_counter()
+        blurred = cv2.GaussianBlur(gray, (self.blur_size, self.blur_size), 0, dst=dst)
+        if self.timer is not None:
+            self.timer.add(STAGE_BLUR, time.perf_counter() - start)
+        return blurred
+
+    def spare_blur_buffer(self, shape):
+        """The one of the two blur buffers that does not hold the previous frame."""
+        previous = self.prev_frame_gray_blurred
+        name = 'blur_b' if previous is not None and previous is self._buffers.get('blur_a') else 'blur_a'
+        return self._buffer(name, shape)
+
+    def preprocess(self, frame):
+        """Grayscale + Gaussian blur of a BGR frame into a new array (timed as cvtColor / GaussianBlur)."""
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._buffer('gray', frame.shape[:2]))
+        if self.timer is not None:
+            self.timer.add(STAGE_CVT_COLOR, time.perf_counter() - start)
+        return self.blur(gray)
+
+    def compare(self, prev_blurred, current_blurred, index=None):
+        """Returns (score, keep) for a preprocessed frame against the previous one (timed as metric)."""
+        start = time.perf_counter()
+        score, keep = np.nan, False
+        # --- Frame Difference Logic ---
+        if self.algorithm == ALGO_FRAME_DIFF:
+            diff = cv2.absdiff(current_blurred, prev_blurred, dst=self._buffer('diff', current_blurred.shape))
+            _, thresh_img = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY, dst=self._buffer('mask', diff.shape))
+            contours, _ = cv2.findContours(thresh_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            # Score = largest changed region; the frame is kept when it exceeds min_area
+            score = max((cv2.contourArea(contour) for contour in contours), default=0.0)
+            keep = score > self.min_area
+
+        # --- SSIM Logic ---
+        elif self.algorithm == ALGO_SSIM:
+            # Ensure frames have same dimensions for SSIM
+            if current_blurred.shape == prev_blurred.shape:
+                # win_size should be odd and <= min(height, width), typically small (e.g., 7)
+                win_size = min(7, self.blur_size, current_blurred.shape[0], current_blurred.shape[1])
+                if win_size % 2 == 0: win_size -= 1 # Ensure odd
+                if win_size >= 3: # SSIM needs window size >= 3
+                    similarity_index = _structural_similarity()(prev_blurred, current_blurred, win_size=win_size)
+                    score = 1.0 - similarity_index
+                    # Keep frame if NOT similar enough (same comparison as decide(), so cached tracks agree)
+                    keep = score > self.decision_threshold()
+                else:
+                    # Fallback or warning if window size too small
+                    logging.warning(f"SSIM window size too small ({win_size}) at frame {index}. Keeping frame as precaution.")
+                    keep = True
+            else:
+                logging.warning(f"Frame shape mismatch at frame {index}. Keeping frame.")
+                keep = True # Keep if shapes mismatch (unlikely but possible)
+
+        # --- Optical Flow Logic ---
+        elif self.algorithm == ALGO_OPTICAL_FLOW:
+            # Calculate dense optical flow (Farneback)
+            # Parameters can be tuned: pyr_scale, levels, winsize, iterations, poly_n, poly_sigma, flags
+            shape = current_blurred.shape
+            flow = cv2.calcOpticalFlowFarneback(prev_blurred, current_blurred, self._buffer('flow', shape + (2,), np.float32),
+                                                0.5, 3, 15, 3, 5, 1.2, 0)
+            # Calculate magnitude of flow vectors: split into two reused planes, then cartToPolar in place
+            # (magnitude over x, the unused angle over y; elementwise, so the values match a separate output)
+            flow_x, flow_y = cv2.split(flow, [self._buffer('flow_x', shape, np.float32), self._buffer('flow_y', shape, np.float32)])
+            magnitude, _ = cv2.cartToPolar(flow_x, flow_y, flow_x, flow_y)
+            # Calculate average magnitude (or median, or percentile for robustness)
+            score = float(np.mean(magnitude))
+            # Keep frame if average motion is significant enough
+            keep = score > self.flow_threshold
+
+        if self.timer is not None:
+            self.timer.add(STAGE_METRIC, time.perf_counter() - start)
+        return score, keep
+
+    def analyze(self, frame, index, total_frames):
+        """Returns (score, keep) for frame `index` of a sequential pass and updates the previous-frame state."""
+        # Always keep first frame, prepare for comparison
+        if index == 0:
+            gray = self.prime(frame)
+            self.prev_frame_gray_blurred = self.blur(gray, dst=self.spare_blur_buffer(gray.shape))
+            return np.nan, True
+        # Always keep last frame
+        if index == total_frames - 1:
+            return np.nan, True
+        gray, digest = self.grayscale(frame)
+        if self.is_duplicate(digest):
+            return 0.0, False # Identical to the previous frame: no change, previous state stays valid
+        current_blurred = self.blur(gray, dst=self.spare_blur_buffer(gray.shape))
+        score, keep = np.nan, False
+        if self.prev_frame_gray_blurred is not None:
+            score, keep = self.compare(self.prev_frame_gray_blurred, current_blurred, index)
+        # Update previous frame for the next iteration (the old one's buffer is written next time)
+        self.prev_frame_gray_blurred = current_blurred
+        return score, keep
+
+
+ALL_ALGORITHMS = (ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW)
+
+
+class MultiMetricAnalyzer:
+    """Runs several FrameAnalyzers on a single decode ("all metrics" mode and fan-out runs).
+
+    The grayscale conversion is done once per frame and the blur once per distinct kernel size,
+    so analyzers with the same blur share one buffer. analyzers[0] is the primary one: its
+    (score, keep) is what analyze() returns, so this exposes the FrameAnalyzer interface the
+    engine uses. The scores / keep flags of every analyzer are kept in scores[j] / keep[j], and
+    the score tracks by metric key in `tracks` (for the score cache). The duplicate fast path
+    of the primary analyzer applies to all of them (a duplicate scores 0.0 everywhere), so the
+    other analyzers take over its duplicate_fast_path setting (and with it their metric keys).
+    """
+    def __init__(self, analyzers, timer=None):
+        self.analyzers = list(analyzers)
+        self.primary = self.analyzers[0]
+        for analyzer in self.analyzers[1:]:
+            analyzer.duplicate_fast_path = self.primary.duplicate_fast_path
+        self.algorithm = self.primary.algorithm
+        self.params = self.primary.params
+        self.scores = [] # per analyzer: float64 score track, allocated on the first analyze()
+        self.keep = []   # per analyzer: keep flags
+        self._prev = {} # blur size -> previous blurred frame
+        self._spare = {} # blur size -> buffer of the frame before, overwritten by the next analyze()
+        self.timer = timer
+
+    @classmethod
+    def for_algorithms(cls, algorithm, params, timer=None, algorithms=ALL_ALGORITHMS, extra_analyzers=(),
+                       duplicate_fast_path=True):
+        """Primary algorithm + extra analyzers + every other algorithm with the same params."""
+        analyzers = [FrameAnalyzer(algorithm, params, timer, duplicate_fast_path)] + list(extra_analyzers)
+        analyzers += [FrameAnalyzer(other, params, timer) for other in algorithms if other != algorithm]
+        return cls(analyzers, timer)
+
+    @property
+    def timer(self):
+        return self._timer
+
+    @timer.setter
+    def timer(self, timer):
+        self._timer = timer
+        for analyzer in self.analyzers:
+            analyzer.timer = timer
+
+    @property
+    def tracks(self):
+        """{metric_key: scores} of every analyzer (analyzers with the same key produce the same scores)."""
+        return {analyzer.metric_key(): scores for analyzer, scores in zip(self.analyzers, self.scores)}
+
+    @property
+    def blur_size(self):
+        return self.primary.blur_size
+
+    @property
+    def prev_frame_gray_blurred(self):
+        return self._prev.get(self.primary.blur_size)
+
+    @prev_frame_gray_blurred.setter
+    def prev_frame_gray_blurred(self, frame):
+        # Only the primary state can be restored (checkpoints); the other tracks are then incomplete
+        self._prev = {self.primary.blur_size: frame} if frame is not None else {}
+        self._spare = {}
+
+    @property
+    def reference_digest(self):
+        return self.primary.reference_digest
+
+    @reference_digest.setter
+    def reference_digest(self, digest):
+        self.primary.reference_digest = digest
+
+    def decision_threshold(self):
+        return self.primary.decision_threshold()
+
+    def metric_key(self):
+        return self.primary.metric_key()
+
+    def decide(self, scores, total_frames):
+        return self.primary.decide(scores, total_frames)
+
+    def reset(self):
+        self._prev = {}
+        self._spare = {}
+        self.scores = []
+        self.keep = []
+        self.primary.reset()
+
+    @property
+    def duplicate_fast_path(self):
+        return self.primary.duplicate_fast_path
+
+    @property
+    def duplicate_hits(self):
+        return self.primary.duplicate_hits
+
+    def duplicate_stats(self):
+        return self.primary.duplicate_stats()
+
+    def preprocess(self, frame):
+        """Grayscale once, then one blurred buffer per distinct kernel size: {blur_size: blurred}."""
+        start = time.perf_counter()
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if self._timer is not None:
+            self._timer.add(STAGE_CVT_COLOR, time.perf_counter() - start)
+        return self._blur_all(gray)
+
+    def _blur_all(self, gray, spare=None):
+        """{blur_size: blurred}; written into the `spare` buffers ({blur_size: array}) where they fit."""
+        t_gray = time.perf_counter()
+        blurred = {}
+        for analyzer in self.analyzers:
+            size = analyzer.blur_size
+            if size not in blurred:
+                dst = spare.get(size) if spare else None
+                if dst is not None and dst.shape != gray.shape:
+                    dst = None
+                blurred[size] = cv2.GaussianBlur(gray, (size, size), 0, dst=dst)
+        if self._timer is not None:
+            self._timer.add(STAGE_BLUR, time.perf_counter() - t_gray)
+        return blurred
+
+    def analyze(self, frame, index, total_frames):
+        """Returns the primary (score, keep) and records every analyzer's decision for frame `index`."""
+        if not self.scores:
+            self.scores = [np.full(total_frames, np.nan) for _ in self.analyzers]
+            self.keep = [np.zeros(total_frames, dtype=bool) for _ in self.analyzers]
+        # First and last frame: always kept by every analyzer (same rule as FrameAnalyzer.analyze)
+        if index == 0 or index == total_frames - 1:
+            for keep in self.keep:
+                keep[index] = True
+            if index == 0:
+                gray = self.primary.prime(frame)
+                self._prev = self._blur_all(gray, self._spare)
+            return np.nan, True
+        gray, digest = self.primary.grayscale(frame)
+        if self.primary.is_duplicate(digest):
+            for scores in self.scores:
+                scores[index] = 0.0 # Keep flags stay False
+            return 0.0, False
+        current = self._blur_all(gray, self._spare)
+        for j, analyzer in enumerate(self.analyzers):
+            prev = self._prev.get(analyzer.blur_size)
+            if prev is None:
+                continue
+            score, keep = analyzer.compare(prev, current[analyzer.blur_size], index)
+            self.scores[j][index] = score
+            self.keep[j][index] = keep
+        self._spare, self._prev = self._prev, current # Ping-pong: the old previous frames become the next buffers
+        return self.scores[0][index], bool(self.keep[0][index])
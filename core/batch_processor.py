@@ -1,120 +1,85 @@
 # core/batch_processor.py
-import os
 import logging
 from PyQt5.QtCore import QThread, pyqtSignal
-from core.video_processor import VideoProcessor # Absolute import
+from core.engine import BatchEngine
+from core.job_store import JobStore
+from utils.constants import OUTPUT_FORMAT_MP4
 
 class BatchProcessor(QThread):
-    """Handles processing multiple video files sequentially."""
+    """Handles processing multiple video files (sequentially, or on max_workers threads longest-first).
+
+    Thin QThread adapter around core.engine.BatchEngine: engine callbacks are re-emitted as signals.
+    """
     # Signals remain mostly the same, but file_finished now includes output_path
     overall_progress = pyqtSignal(int)
-    current_file_progress = pyqtSignal(int, str, int, int) # Propagate detailed progress
+    current_file_progress = pyqtSignal(int, str, int, int, dict) # percent, video path, frames; stats gain batch_fps / batch_frames
+    current_file_analysis_started = pyqtSignal(int, float) # Propagate timeline reset (total_frames, threshold)
+    current_file_scores = pyqtSignal(int, object, object) # Propagate per-frame score chunks
+    current_file_write_progress = pyqtSignal(str, str, int, int) # video path, output path, frames written, total (reverse MP4)
+    # Files are identified by their full input path (basenames may repeat across folders)
     file_started = pyqtSignal(str)
-    file_finished = pyqtSignal(str, str, float, int, str) # Added output_path
+    file_finished = pyqtSignal(str, str, float, int, str, dict) # Added output_path and the per-file run report
     file_error = pyqtSignal(str, str)
+    batch_planned = pyqtSignal(object) # core.scheduler.BatchPlan: dispatch order and expected finish times
     batch_finished = pyqtSignal()
     error = pyqtSignal(str)
 
     # Accept algorithm choice and the full parameter dictionary
-    def __init__(self, video_list, output_dir, algorithm, params, reverse_video, parent=None):
+    def __init__(self, video_list, output_dir, algorithm, params, reverse_video, job_db_path=None, max_workers=1,
+                 output_format=OUTPUT_FORMAT_MP4, score_cache_dir=None, all_metrics=False, extra_outputs=None,
+                 temporal_stride=1, memory_budget_mb=None, parent=None):
         super().__init__(parent)
+        self.job_db_path = job_db_path # Optional SQLite job history: already processed inputs are skipped
         self.video_list = list(video_list)
         self.output_dir = output_dir
         self.algorithm = algorithm # Store selected algorithm
         self.params = params       # Store all parameters
         self.reverse_video = reverse_video
-        self._is_running = True
-        self.current_processor = None
-        logging.info(f"BatchProcessor initialized for {len(video_list)} files. Output dir: {output_dir}")
-        logging.info(f"Batch using Algorithm: {self.algorithm}, Params: {self.params}")
+        self.output_format = output_format
+        self.engine = BatchEngine(self.video_list, output_dir, algorithm, params, reverse_video,
+                                  on_file_started=self.file_started.emit,
+                                  on_file_progress=self.current_file_progress.emit,
+                                  on_analysis_started=self.current_file_analysis_started.emit,
+                                  on_frame_scores=self.current_file_scores.emit,
+                                  on_file_finished=self.handle_file_finish,
+                                  on_file_error=self.file_error.emit,
+                                  on_overall_progress=self.overall_progress.emit,
+                                  on_file_write_progress=self.current_file_write_progress.emit,
+                                  on_batch_planned=self.batch_planned.emit,
+                                  max_workers=max_workers,
+                                  output_format=output_format,
+                                  score_cache_dir=score_cache_dir,
+                                  all_metrics=all_metrics,
+                                  temporal_stride=temporal_stride,
+                                  memory_budget_mb=memory_budget_mb,
+                                  extra_outputs=extra_outputs) # Fan-out: [(algorithm, params, suffix), ...]
+
+    @property
+    def max_workers(self):
+        return self.engine.max_workers
+
+    @property
+    def batch_stage_timer(self):
+        return self.engine.batch_stage_timer
+
+    @property
+    def batch_report(self):
+        return self.engine.batch_report
 
     def stop(self):
         """Requests the batch processing and any current video processing to stop."""
-        self._is_running = False
-        if self.current_processor and self.current_processor.isRunning():
-            self.current_processor.stop()
-        logging.info("Batch processing stop requested.")
+        # The engine forwards the request to the file being processed, so cancel takes effect mid-file
+        self.engine.stop()
 
     def run(self):
         """Executes the batch processing loop."""
-        self._is_running = True
-        total_files = len(self.video_list)
-        if total_files == 0:
-            logging.warning("Batch run called with empty video list.")
-            self.batch_finished.emit()
-            return
-
-        files_processed_info = [] # Store results for each file
-
         try:
-            if not os.path.isdir(self.output_dir):
-                 os.makedirs(self.output_dir)
-                 logging.info(f"Created batch output directory: {self.output_dir}")
-
-            for i, video_path in enumerate(self.video_list):
-                if not self._is_running:
-                    logging.info("Batch processing stopped externally.")
-                    break
-
-                base_filename = os.path.basename(video_path)
-                output_filename = f"processed_{os.path.splitext(base_filename)[0]}.mp4"
-                output_path = os.path.join(self.output_dir, output_filename)
-
-                logging.info(f"Batch: Starting file {i+1}/{total_files}: {base_filename}")
-                self.file_started.emit(base_filename)
-
-                # --- Run single video processor ---
-                processor = VideoProcessor(
-                    video_path,
-                    output_path,
-                    self.algorithm, # Pass algorithm choice
-                    self.params,    # Pass all parameters
-                    self.reverse_video
-                )
-                self.current_processor = processor
-
-                # --- Connect signals ---
-                # Use lambda to capture filename and output path
-                # Propagate detailed progress
-                processor.progress.connect(self.current_file_progress.emit)
-                # Connect file_finished to store result and emit batch signal
-                processor.finished.connect(
-                    lambda msg, speed, frames, out_path, fn=base_filename:
-                        self.handle_file_finish(fn, msg, speed, frames, out_path, files_processed_info)
-                )
-                # Connect file_error
-                processor.error.connect(
-                    lambda err_msg, fn=base_filename:
-                        self.handle_file_error(fn, err_msg, files_processed_info)
-                )
-
-                if not self._is_running:
-                    logging.info("Batch processing stopped before running next file.")
-                    self.current_processor = None
-                    break
-
-                processor.run() # Run synchronously
-
-                # --- Disconnect signals (optional but good practice) ---
+            if self.job_db_path:
                 try:
-                     processor.progress.disconnect()
-                     processor.finished.disconnect()
-                     processor.error.disconnect()
-                except TypeError: pass # Ignore errors if already disconnected
-
-
-                self.current_processor = None # Clear reference
-
-                # Update overall progress *after* file is processed (success or error)
-                overall_p = int(((i + 1) / total_files) * 100)
-                self.overall_progress.emit(overall_p)
-
-            # --- Batch finished ---
-            if self._is_running:
-                logging.info("Batch processing completed.")
-            else:
-                logging.info("Batch processing cancelled before completion.")
-
+                    self.engine.job_store = JobStore(self.job_db_path)
+                except Exception as e: # sqlite3.Error / OSError: process everything instead
+                    logging.warning(f"Job history unavailable ({self.job_db_path}): {e}")
+            self.engine.run()
         except OSError as e:
              error_msg = f"批量处理时发生文件/目录错误: {e}"
              logging.exception(error_msg)
@@ -124,14 +89,10 @@ class BatchProcessor(QThread):
             logging.exception(error_msg)
             self.error.emit(error_msg)
         finally:
-             self.current_processor = None
+             if self.engine.job_store is not None:
+                 self.engine.job_store.close()
+                 self.engine.job_store = None
              self.batch_finished.emit() # Signal completion/cancellation
 
-    # Helper methods to handle signals and update shared state
-    def handle_file_finish(self, filename, message, tw_speed, kept_frames, output_path, results_list):
-        results_list.append({'filename': filename, 'status': 'success', 'kept': kept_frames, 'speed': tw_speed, 'output': output_path})
-        self.file_finished.emit(filename, message, tw_speed, kept_frames, output_path)
-
-    def handle_file_error(self, filename, error_message, results_list):
-         results_list.append({'filename': filename, 'status': 'error', 'message': error_message})
-         self.file_error.emit(filename, error_message)
\ No newline at end of file
+    def handle_file_finish(self, video_path, result):
+        self.file_finished.emit(video_path, result.message, result.tw_speed, result.kept_frames, result.output_path, result.report)
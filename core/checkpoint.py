@@ -0,0 +1,104 @@
+# core/checkpoint.py
+"""Resumable analysis: periodic sidecar checkpoints of the per-frame decisions.
+
+A checkpoint stores the keep decisions and scores of the frames analysed so far, the
+index of the next frame and the analyzer's previous-frame state (blurred frame and the
+duplicate fast path's reference digest). It is only reused when
+the input file (path, size, mtime) and the decision parameters are unchanged.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2 # 2: adds the fast-path reference digest
+
+
+def checkpoint_path_for(output_path):
+    """Sidecar next to the output: <output without extension>.checkpoint.npz."""
+    return os.path.splitext(output_path)[0] + ".checkpoint.npz"
+
+
+def input_fingerprint(input_path):
+    """Cheap identity of the input file: absolute path, size and modification time."""
+    st = os.stat(input_path)
+    return f"{os.path.abspath(input_path)}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def params_key(algorithm, params):
+    """Stable hash of everything that influences the keep decisions."""
+    payload = json.dumps({'algorithm': algorithm, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class Checkpoint:
+    """Loads, saves (atomically) and removes the checkpoint sidecar of one run."""
+    def __init__(self, path, fingerprint, decision_key, total_frames):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.decision_key = decision_key
+        self.total_frames = total_frames
+
+    def save(self, next_index, keep_flags, scores, prev_frame, reference_digest=None):
+        """Writes the state after `next_index` analysed frames; failures are logged, never raised."""
+        meta = {'version': CHECKPOINT_VERSION, 'fingerprint': self.fingerprint, 'decision_key': self.decision_key,
+                'total_frames': self.total_frames, 'next_index': int(next_index)}
+        directory = os.path.dirname(self.path) or "."
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint_", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(
+                    f,
+                    meta=np.array(json.dumps(meta)),
+                    keep_bits=np.packbits(keep_flags[:next_index]),
+                    scores=scores[:next_index],
+                    prev_frame=prev_frame if prev_frame is not None else np.zeros((0, 0), dtype=np.uint8),
+                    reference_digest=np.frombuffer(reference_digest or b"", dtype=np.uint8),
+                )
+            os.replace(tmp_path, self.path)
+            tmp_path = None
+            logging.debug(f"Checkpoint saved at frame {next_index}/{self.total_frames}: {self.path}")
+        except Exception as e:
+            logging.warning(f"Could not write checkpoint {self.path}: {e}")
+        finally:
+            if tmp_path is not None:
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    def load(self):
+        """Returns {'next_index', 'keep_flags', 'scores', 'prev_frame', 'reference_digest'} or None if absent /
+        stale / unreadable."""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if (meta.get('version') != CHECKPOINT_VERSION or meta.get('fingerprint') != self.fingerprint
+                        or meta.get('decision_key') != self.decision_key or meta.get('total_frames') != self.total_frames):
+                    logging.info(f"Ignoring stale checkpoint {self.path} (input or parameters changed).")
+                    return None
+                next_index = int(meta['next_index'])
+                keep_flags = np.unpackbits(data['keep_bits'], count=next_index).astype(bool)
+                scores = data['scores'].astype(np.float64) # Same dtype as the engine's score track
+                prev_frame = data['prev_frame']
+                reference_digest = data['reference_digest'].tobytes() or None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if next_index <= 0 or next_index > self.total_frames or len(scores) != next_index:
+            return None
+        return {'next_index': next_index, 'keep_flags': keep_flags, 'scores': scores,
+                'prev_frame': prev_frame if prev_frame.size else None, 'reference_digest': reference_digest}
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.warning(f"Could not remove checkpoint {self.path}: {e}")
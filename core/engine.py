@@ -0,0 +1,1037 @@
+# core/engine.py
+"""Qt-free frame extraction engine.
+
+The GUI (core.video_processor / core.batch_processor), the benchmarks and any headless
+caller share this module. Progress is reported through optional plain callbacks, and
+ExtractionEngine.iter_frames() exposes the analysis pass as an iterator, so nothing here
+imports PyQt5.
+"""
+import os
+import time
+import sqlite3
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from utils.constants import (TIMELINE_CHUNK_FRAMES, CHECKPOINT_INTERVAL, PROGRESS_REPORT_INTERVAL, OUTPUT_FORMAT_MP4,
+                             OUTPUT_FORMAT_DECISION_LIST)
+from core.adaptive import AdaptiveSampler
+from core.analyzer import FrameAnalyzer, MultiMetricAnalyzer, ALL_ALGORITHMS
+from core.checkpoint import Checkpoint, checkpoint_path_for, input_fingerprint, params_key
+from core.frame_store import open_frame_store
+from core.job_store import content_fingerprint, job_params_key, skipped_record
+from core.planner import plan_output
+from core.progress import ProgressTracker
+from core.scheduler import plan_batch
+from core.score_cache import ScoreCache
+from core.sinks import open_sink, sink_output_path
+from core.timing import StageTimer, report_path_for, write_json_report, STAGE_READ, STAGE_WRITE
+
+CANCELLED_MESSAGE = "处理已取消"
+
+
+class ProcessingCancelled(Exception):
+    """Raised by the engine when stop() was requested during a run."""
+    def __init__(self, message=CANCELLED_MESSAGE):
+        super().__init__(message)
+
+
+class ProcessingResult:
+    """Outcome of one ExtractionEngine.run()."""
+    def __init__(self, message, tw_speed, kept_frames, output_path, report):
+        self.message = message
+        self.tw_speed = tw_speed
+        self.kept_frames = kept_frames
+        self.output_path = output_path
+        self.report = report
+
+    def __repr__(self):
+        return f"ProcessingResult(kept_frames={self.kept_frames}, tw_speed={self.tw_speed:.2f}, output_path={self.output_path!r})"
+
+
+def format_processing_error(input_path, exc):
+    """User-facing message for an exception raised while processing `input_path`."""
+    if isinstance(exc, ProcessingCancelled):
+        return str(exc)
+    if isinstance(exc, (IOError, ValueError, cv2.error, ImportError)): # ImportError for scikit-image
+        return f"处理视频 '{os.path.basename(input_path)}' 时发生错误: {exc}"
+    return f"处理视频时发生意外错误: {exc}"
+
+
+def batch_output_path(output_dir, video_path):
+    """Output file used for `video_path` in batch runs: <output_dir>/processed_<name>.mp4."""
+    base_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(output_dir, f"processed_{base_name}.mp4")
+
+
+def variant_output_path(output_path, suffix):
+    """Output of an additional fan-out configuration: <output>_<suffix>.<ext>."""
+    base, ext = os.path.splitext(output_path)
+    return f"{base}_{suffix}{ext}"
+
+
+def twixtor_speed(kept_frames, total_frames):
+    """Twixtor speed (%) that restores the original duration: kept / total frames."""
+    return kept_frames / total_frames * 100 if total_frames > 0 else 0
+
+
+def success_record(filename, result):
+    """Per-file summary entry for batch reports / CLI output from a ProcessingResult."""
+    report = result.report
+    record = {'filename': filename, 'status': 'success', 'kept': result.kept_frames, 'speed': result.tw_speed,
+              'output': result.output_path, 'wall_time_s': report.get('wall_time_s'),
+              'bottleneck_stage': report.get('bottleneck_stage'), 'report_path': report.get('report_path')}
+    if report.get('extra_outputs'):
+        record['extra_outputs'] = [{'output': extra['output_path'], 'kept': extra['kept_frames'],
+                                    'speed': extra['tw_speed'], 'report_path': extra['report_path']}
+                                   for extra in report['extra_outputs']]
+    return record
+
+
+def error_record(filename, message):
+    return {'filename': filename, 'status': 'error', 'message': message}
+
+
+def _call(callback, *args):
+    if callback is not None:
+        callback(*args)
+
+
+class ExtraOutput:
+    """An additional (algorithm, params, output) configuration of a fan-out run.
+
+    It shares the decode and the grayscale / blur buffers of the primary run (MultiMetricAnalyzer)
+    and has its own decisions, sink and result.
+    """
+    def __init__(self, algorithm, params, output_path, output_format=OUTPUT_FORMAT_MP4):
+        self.algorithm = algorithm
+        self.params = params
+        self.output_format = output_format
+        self.output_path = sink_output_path(output_path, output_format)
+        self.analyzer = FrameAnalyzer(algorithm, params)
+        self.sink = None
+        self.frames = None # core.frame_store store buffering kept frames for reverse MP4 output
+        self.result = None
+
+    def __repr__(self):
+        return f"ExtraOutput({self.algorithm!r}, output_path={self.output_path!r})"
+
+
+class ExtractionEngine:
+    """Extracts the significant frames of one video into a new file.
+
+    Callbacks (all optional, called on the caller's thread):
+      on_progress(percent, basename, current_frame, total_frames, stats) - time-throttled,
+          stats is a ProgressTracker.snapshot()
+      on_analysis_started(total_frames, decision_threshold)
+      on_frame_scores(start_index, scores, keep_flags) - chunks of TIMELINE_CHUNK_FRAMES
+      on_write_progress(output_path, written, total) - time-throttled, while reverse MP4 output
+          is written after the analysis; `written` counts frames the encoder has finished
+
+    MP4 is encoded on a separate thread behind a bounded queue (core.sinks.AsyncVideoWriter),
+    so the write stage in the report is the time spent waiting for the encoder.
+
+    run() returns a ProcessingResult and raises IOError / ValueError / cv2.error /
+    ImportError on failure and ProcessingCancelled after stop().
+
+    output_format is 'mp4' (default), an image format ('png' / 'webp' / 'jpg') or 'list'; image
+    sequences go to <output_path without extension>.frames/ and are written while the
+    analysis runs (core.sinks), instead of buffering the kept frames. 'list' writes no frames,
+    only the keep decisions as <output_path without extension>.json / .csv / .edl.
+
+    With checkpoint_interval > 0 the decisions are saved every checkpoint_interval seconds
+    (and on cancel / error) to a sidecar next to the output (core.checkpoint); a later run
+    with the same input and parameters resumes from it. None or 0 disables checkpoints.
+
+    With score_cache_dir, the score track of a completed analysis is stored per input content
+    (core.score_cache) and a later run whose algorithm / blur matches reuses it instead of
+    analysing: only the kept frames are decoded (none for 'list' output). all_metrics=True
+    scores every algorithm from the same decode (MultiMetricAnalyzer) and caches all tracks,
+    so switching algorithm afterwards is a lookup.
+
+    extra_outputs is a list of (algorithm, params, output_path) fan-out configurations written
+    from the same decode (same output_format and reverse setting). Their results are listed in
+    report['extra_outputs'] and each gets its own run report. Checkpoints and score-cache hits
+    only cover the primary configuration, so both are disabled for fan-out runs.
+
+    temporal_stride > 1 enables coarse-to-fine analysis (core.adaptive): frames are compared
+    temporal_stride apart and only intervals that change are refined, so frames inside static
+    stretches are dropped without being retrieved. Scores of those frames are not measured, so
+    adaptive runs write no checkpoint and no score cache (a cache hit is still used); the mode
+    is ignored with all_metrics or extra_outputs, which need every frame scored.
+
+    duplicate_fast_path (default on) drops frames whose luma thumbnail hashes equal to the
+    previous frame's before blur and metric (FrameAnalyzer); the hit rate is shown in the
+    progress stats ('duplicate_rate') and report['duplicate_fast_path'].
+
+    Forward MP4 is written while the analysis runs. Reverse MP4 has to hold the kept frames
+    until the end; core.planner picks in memory / PNG-compressed / spilled to disk / re-decoded
+    in a second pass from the estimated size, memory_budget_mb (None or 0 = automatic) and the
+    RAM available, shared by concurrent_jobs parallel runs (report['memory_plan']).
+    """
+    def __init__(self, input_path, output_path, algorithm, params, reverse_video,
+                 on_progress=None, on_analysis_started=None, on_frame_scores=None, on_write_progress=None,
+                 checkpoint_interval=CHECKPOINT_INTERVAL, output_format=OUTPUT_FORMAT_MP4,
+                 score_cache_dir=None, all_metrics=False, extra_outputs=None, temporal_stride=1,
+                 duplicate_fast_path=True, memory_budget_mb=None, concurrent_jobs=1):
+        self.input_path = input_path
+        self.output_format = output_format
+        self.output_path = sink_output_path(output_path, output_format)
+        self.algorithm = algorithm
+        self.params = params
+        self.reverse_video = reverse_video
+        self.on_progress = on_progress
+        self.on_analysis_started = on_analysis_started
+        self.on_frame_scores = on_frame_scores
+        self.on_write_progress = on_write_progress
+        self._last_write_report = 0.0
+        self._is_running = True
+
+        # Per-stage wall time (read / cvtColor / GaussianBlur / metric / write) for the run report
+        self.stage_timer = StageTimer()
+        self.extra_outputs = [extra if isinstance(extra, ExtraOutput) else ExtraOutput(*extra, output_format=output_format)
+                              for extra in extra_outputs or ()]
+        if all_metrics or self.extra_outputs:
+            # extra_outputs[k] is analyzers[k + 1]
+            self.analyzer = MultiMetricAnalyzer.for_algorithms(
+                algorithm, params, self.stage_timer, algorithms=ALL_ALGORITHMS if all_metrics else (),
+                extra_analyzers=[extra.analyzer for extra in self.extra_outputs],
+                duplicate_fast_path=duplicate_fast_path)
+        else:
+            self.analyzer = FrameAnalyzer(algorithm, params, self.stage_timer, duplicate_fast_path)
+        self.all_metrics = all_metrics
+        self.temporal_stride = max(1, int(temporal_stride or 1))
+        if self.temporal_stride > 1 and (all_metrics or self.extra_outputs):
+            logging.warning("Adaptive stride is ignored with all-metrics / fan-out runs (every frame must be scored).")
+            self.temporal_stride = 1
+        self.adaptive_stats = None # AdaptiveSampler.stats of the last run
+        self.score_cache = ScoreCache(score_cache_dir) if score_cache_dir else None
+        self.memory_budget_mb = memory_budget_mb
+        self.concurrent_jobs = max(1, int(concurrent_jobs or 1))
+        self.memory_plan = None # core.planner.MemoryPlan of the last run
+        self.score_cache_status = None # 'hit' / 'stored' for the report
+        self._fingerprint = None
+        self.needs_frames = output_format != OUTPUT_FORMAT_DECISION_LIST # Decision lists never touch pixels
+        # Per-frame metric track (NaN = not compared) and keep decisions, filled during the analysis pass
+        self.frame_score_track = None
+        self.keep_flags = None
+        # Counters updated by the analysis loop; callers receive throttled snapshots via on_progress
+        self.progress_tracker = ProgressTracker()
+        self.video_info = None
+        self.report = None
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint = None
+        self.resumed_from = 0 # First frame analysed in this run (> 0 when resumed from a checkpoint)
+        self._next_index = 0  # Frames whose decision is final
+
+        logging.info(f"ExtractionEngine initialized for {os.path.basename(input_path)}")
+        logging.info(f"Algorithm: {self.algorithm}, Params: {self.params}, Blur: {self.blur_size}, Reverse: {reverse_video}")
+
+    @property
+    def blur_size(self):
+        return self.analyzer.blur_size
+
+    def decision_threshold(self):
+        return self.analyzer.decision_threshold()
+
+    def stop(self):
+        """Requests the running analysis/write to stop; safe to call from another thread."""
+        self._is_running = False
+        logging.info("Video processing stop requested.")
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def _check_cancelled(self, where):
+        if not self._is_running:
+            logging.info(f"Processing stopped externally ({where}).")
+            raise ProcessingCancelled()
+
+    def _report_progress(self, percent, current, total, stats):
+        _call(self.on_progress, percent, os.path.basename(self.input_path), current, total, stats)
+
+    def _report_write_progress(self, output_path, written, total, force=False):
+        """Time-throttled like the analysis progress; `force` always reports (phase end)."""
+        now = time.perf_counter()
+        if force or now - self._last_write_report >= PROGRESS_REPORT_INTERVAL:
+            self._last_write_report = now
+            _call(self.on_write_progress, output_path, written, total)
+
+    def _emit_frame_scores(self, start, end):
+        """Sends the score/keep slice [start, end) to listeners (copies, since the arrays keep changing)."""
+        if end > start and self.on_frame_scores is not None:
+            self.on_frame_scores(start, self.frame_score_track[start:end].copy(), self.keep_flags[start:end].copy())
+
+    def open_capture(self):
+        """Opens the input and fills self.video_info; the caller releases the returned capture."""
+        cap = cv2.VideoCapture(self.input_path)
+        if not cap.isOpened():
+            raise IOError(f"无法打开输入视频文件: {self.input_path}")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0:
+            fps = 30 # Assume a default FPS
+            logging.warning(f"Invalid FPS detected for {self.input_path}. Assuming {fps} FPS.")
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        if total_frames <= 0 or width <= 0 or height <= 0:
+            cap.release()
+            raise ValueError(f"视频元数据无效: 帧={total_frames}, 宽={width}, 高={height}")
+
+        logging.info(f"Video Info: Frames={total_frames}, FPS={fps:.2f}, Res={width}x{height}")
+        self.video_info = {'frames': total_frames, 'fps': fps, 'width': width, 'height': height}
+        return cap
+
+    def _open_checkpoint(self):
+        if not self.checkpoint_interval or self.checkpoint_interval <= 0 or self.extra_outputs or self.temporal_stride > 1:
+            return None
+        options = dict(self.params)
+        if not self.analyzer.duplicate_fast_path: # Same rule as job_params_key
+            options['duplicate_fast_path'] = False
+        return Checkpoint(checkpoint_path_for(self.output_path), input_fingerprint(self.input_path),
+                          params_key(self.algorithm, options), self.video_info['frames'])
+
+    def save_checkpoint(self):
+        """Persists the decisions made so far (no-op without checkpointing or before the first frame)."""
+        if self.checkpoint is not None and self._next_index > 0:
+            self.checkpoint.save(self._next_index, self.keep_flags, self.frame_score_track,
+                                 self.analyzer.prev_frame_gray_blurred, self.analyzer.reference_digest)
+
+    def _resume(self):
+        """Loads a matching checkpoint into the decision arrays / analyzer; returns the first frame to analyse."""
+        state = self.checkpoint.load() if self.checkpoint is not None else None
+        if state is None:
+            return 0
+        next_index = state['next_index']
+        self.keep_flags[:next_index] = state['keep_flags']
+        self.frame_score_track[:next_index] = state['scores']
+        self.analyzer.prev_frame_gray_blurred = state['prev_frame']
+        self.analyzer.reference_digest = state['reference_digest'] # So the next frame can still be a fast-path duplicate
+        logging.info(f"Resuming {os.path.basename(self.input_path)} from checkpoint at frame "
+                     f"{next_index}/{self.video_info['frames']}.")
+        return next_index
+
+    def _input_fingerprint(self):
+        if self._fingerprint is None:
+            self._fingerprint = ScoreCache.fingerprint(self.input_path)
+        return self._fingerprint
+
+    def _load_cached_scores(self):
+        """Fills the decision arrays from the score cache; returns True on a hit."""
+        if self.score_cache is None or self.extra_outputs:
+            return False
+        total_frames = self.video_info['frames']
+        scores = self.score_cache.load(self._input_fingerprint(), self.analyzer.metric_key(), total_frames)
+        if scores is None:
+            return False
+        analysed = min(len(scores), total_frames)
+        self.frame_score_track[:analysed] = scores[:analysed]
+        self.keep_flags[:] = self.analyzer.decide(scores, total_frames)
+        self.score_cache_status = 'hit'
+        logging.info(f"Score cache hit for {os.path.basename(self.input_path)} ({self.analyzer.metric_key()}): "
+                     f"analysis skipped.")
+        return True
+
+    def _store_scores(self):
+        """Adds the score track(s) of a complete, non-resumed analysis to the score cache."""
+        if self.score_cache is None or self.score_cache_status == 'hit' or self.resumed_from or self.adaptive_stats:
+            return # Adaptive runs leave the scores of skipped frames unmeasured
+        analysed = self._next_index
+        if isinstance(self.analyzer, MultiMetricAnalyzer):
+            tracks = {key: track[:analysed] for key, track in self.analyzer.tracks.items()}
+        else:
+            tracks = {self.analyzer.metric_key(): self.frame_score_track[:analysed]}
+        self.score_cache.store(self._input_fingerprint(), self.video_info['frames'], tracks)
+        self.score_cache_status = 'stored'
+
+    def _sequential_frames(self, cap, total_frames, resume_index, skip_decode):
+        """Frame-by-frame source for iter_frames(): yields (index, frame, score, keep) and records the decisions.
+
+        Frames before resume_index have known decisions (checkpoint / score cache): they are
+        only grabbed, and dropped ones come with frame=None. Frames are decoded into one reused
+        array until a frame may be retained by a sink (see _frame_retained); that array is then
+        handed over and a new one is allocated by the next read.
+        """
+        timer = self.stage_timer
+        analyzer = self.analyzer
+        tracker = self.progress_tracker
+        read_buffer = None
+        for i in range(total_frames):
+            read_start = time.perf_counter()
+            if i < resume_index:
+                # Decision restored from the checkpoint: skip colour conversion for dropped frames
+                keep_this_frame = bool(self.keep_flags[i])
+                frame_score = self.frame_score_track[i]
+                if skip_decode:
+                    ret, frame = True, None
+                else:
+                    ret = cap.grab()
+                    frame = cap.retrieve()[1] if ret and keep_this_frame else None
+                analysis_start = time.perf_counter()
+                if not ret:
+                    logging.warning(f"Frame grab failed at index {i}/{total_frames} while resuming.")
+                    break
+                tracker.add_decoded(analysis_start - read_start)
+                timer.add(STAGE_READ, analysis_start - read_start)
+            else:
+                ret, frame = cap.read(read_buffer)
+                analysis_start = time.perf_counter()
+                if not ret:
+                    logging.warning(f"Frame read failed at index {i}/{total_frames}. End of stream or error.")
+                    break # End of video or error
+                tracker.add_decoded(analysis_start - read_start)
+                timer.add(STAGE_READ, analysis_start - read_start)
+
+                frame_score, keep_this_frame = analyzer.analyze(frame, i, total_frames)
+                self.frame_score_track[i] = frame_score
+                self.keep_flags[i] = keep_this_frame
+                tracker.duplicate_frames = analyzer.duplicate_hits
+                read_buffer = None if self._frame_retained(i, keep_this_frame) else frame
+            tracker.add_analyzed(time.perf_counter() - analysis_start)
+            yield i, frame, frame_score, keep_this_frame
+
+    def _frame_retained(self, index, keep):
+        """True when a sink (primary or fan-out) may hold on to frame `index` after it was yielded."""
+        if not self.needs_frames:
+            return False # Decision lists never keep pixels
+        if keep:
+            return True
+        return any(self.analyzer.keep[j][index] for j in range(1, len(self.extra_outputs) + 1))
+
+    def _adaptive_frames(self, sampler, total_frames):
+        """Coarse-to-fine source for iter_frames() (core.adaptive); records the decisions."""
+        for i, frame, frame_score, keep_this_frame in sampler.frames(total_frames):
+            self.frame_score_track[i] = frame_score
+            self.keep_flags[i] = keep_this_frame
+            yield i, frame, frame_score, keep_this_frame
+
+    def iter_frames(self):
+        """Decodes and analyses the input, yielding (index, frame, score, keep) for every frame.
+
+        Progress / timeline callbacks fire as the iterator is consumed; frame_score_track
+        and keep_flags are complete once it is exhausted. Raises ProcessingCancelled after stop().
+        When resuming from a checkpoint, frames before it are only grabbed (their decisions are
+        known) and dropped ones are yielded with frame=None. The same path replays a score
+        cache hit, without decoding anything when no frames are needed. With temporal_stride > 1
+        dropped frames of static intervals are also yielded with frame=None. The array of a
+        dropped frame is reused for the next read: copy it to keep it.
+        """
+        self.progress_tracker.reset(0)
+        self._report_progress(0, 0, 1, self.progress_tracker.snapshot()) # Initial progress (frame 0 / 1)
+        cap = self.open_capture()
+        sampler = None
+        try:
+            total_frames = self.video_info['frames']
+            analyzer = self.analyzer
+            analyzer.reset()
+
+            # float64 so decisions re-derived from cached scores match the live comparisons exactly
+            self.frame_score_track = np.full(total_frames, np.nan, dtype=np.float64)
+            self.keep_flags = np.zeros(total_frames, dtype=bool)
+            self.checkpoint = self._open_checkpoint()
+            self.score_cache_status = None
+            self.adaptive_stats = None
+            resume_index = self.resumed_from = self._resume()
+            skip_decode = False
+            if resume_index == 0 and self._load_cached_scores():
+                resume_index = total_frames
+                skip_decode = not self.needs_frames
+            self._next_index = 0
+            last_checkpoint = time.perf_counter()
+            scores_emitted_until = 0
+            processed_frames_count = 0
+            _call(self.on_analysis_started, total_frames, analyzer.decision_threshold())
+            tracker = self.progress_tracker
+            tracker.reset(total_frames)
+
+            if self.temporal_stride > 1 and self.score_cache_status != 'hit':
+                sampler = AdaptiveSampler(analyzer, cap, self.input_path, self.temporal_stride,
+                                          timer=self.stage_timer, tracker=tracker)
+                self.adaptive_stats = sampler.stats
+                source = self._adaptive_frames(sampler, total_frames)
+            else:
+                source = self._sequential_frames(cap, total_frames, resume_index, skip_decode)
+
+            # --- Frame Processing Loop ---
+            self._check_cancelled("analysis")
+            for i, frame, frame_score, keep_this_frame in source:
+                self._next_index = i + 1
+                processed_frames_count += 1
+                now = time.perf_counter()
+                if self.checkpoint is not None and i >= resume_index and now - last_checkpoint >= self.checkpoint_interval:
+                    self.save_checkpoint()
+                    last_checkpoint = time.perf_counter()
+                if processed_frames_count - scores_emitted_until >= TIMELINE_CHUNK_FRAMES:
+                    self._emit_frame_scores(scores_emitted_until, processed_frames_count)
+                    scores_emitted_until = processed_frames_count
+                # Time-throttled (~10 Hz): per-frame cross-thread signals flood the UI event loop
+                if tracker.should_report():
+                    stats = tracker.snapshot()
+                    self._report_progress(stats['percent'], processed_frames_count, total_frames, stats)
+
+                yield i, frame, frame_score, keep_this_frame
+
+                if not self._is_running:
+                    self.save_checkpoint()
+                    self._check_cancelled("analysis")
+
+            self._emit_frame_scores(scores_emitted_until, processed_frames_count)
+            self._store_scores()
+            final_stats = tracker.snapshot()
+            final_stats['eta'] = 0.0
+            self._report_progress(100, total_frames, total_frames, final_stats) # Ensure 100% on analysis finish
+            logging.info(f"Analysis throughput: {final_stats['throughput_fps']:.1f} fps "
+                         f"(decode {final_stats['decode_fps']:.1f} fps, analysis {final_stats['analysis_fps']:.1f} fps)")
+            if self.adaptive_stats is not None:
+                logging.info(f"Adaptive stride {self.temporal_stride}: {self.adaptive_stats}")
+            duplicates = analyzer.duplicate_stats()
+            if duplicates['checked']:
+                logging.info(f"Duplicate fast path: {duplicates['hits']}/{duplicates['checked']} frames "
+                             f"({duplicates['hit_rate']:.1%}) dropped without blur / metric")
+        except ProcessingCancelled:
+            raise # Checkpoint already saved above
+        except (Exception, GeneratorExit):
+            # Crash / consumer failure mid-analysis: keep what has been decided so far
+            self.save_checkpoint()
+            raise
+        finally:
+            cap.release()
+            if sampler is not None:
+                sampler.release() # May hold a reopened capture
+
+    def build_report(self, kept_frames, tw_speed, wall_time):
+        """Assembles the JSON-serialisable run report (video info, result and per-stage timings)."""
+        total_frames = self.video_info['frames']
+        return {
+            'input_path': self.input_path,
+            'output_path': self.output_path,
+            'algorithm': self.algorithm,
+            'params': dict(self.params),
+            'blur_size': self.blur_size,
+            'reverse_video': self.reverse_video,
+            'output_format': self.output_format,
+            'resumed_from_frame': self.resumed_from,
+            'all_metrics': self.all_metrics,
+            'score_cache': self.score_cache_status,
+            'temporal_stride': self.temporal_stride,
+            'adaptive': dict(self.adaptive_stats) if self.adaptive_stats is not None else None,
+            'duplicate_fast_path': self.analyzer.duplicate_stats(),
+            'memory_plan': self.memory_plan.to_dict() if self.memory_plan is not None else None,
+            'video': dict(self.video_info),
+            'kept_frames': kept_frames,
+            'tw_speed': tw_speed,
+            'wall_time_s': round(wall_time, 4),
+            'throughput_fps': round(total_frames / wall_time, 2) if wall_time > 0 else 0.0,
+            'stages': self.stage_timer.summary(),
+            'bottleneck_stage': self.stage_timer.bottleneck(),
+        }
+
+    def _open_sink(self):
+        info = self.video_info
+        return open_sink(self.output_path, self.output_format, info['fps'], info['width'], info['height'],
+                         reverse=self.reverse_video, source_path=self.input_path)
+
+    def _open_extra_sinks(self):
+        info = self.video_info
+        for extra in self.extra_outputs:
+            extra.result = None
+            extra.sink = open_sink(extra.output_path, extra.output_format, info['fps'], info['width'], info['height'],
+                                   reverse=self.reverse_video, source_path=self.input_path)
+
+    def _plan_memory(self):
+        """Chooses how reverse MP4 output buffers its kept frames (core.planner) and logs why."""
+        info = self.video_info
+        self.memory_plan = plan_output(info['width'], info['height'], info['frames'], self.output_format,
+                                       self.reverse_video, buffered_outputs=1 + len(self.extra_outputs),
+                                       budget_mb=self.memory_budget_mb, concurrent_jobs=self.concurrent_jobs)
+        logging.info(f"Output strategy: {self.memory_plan.strategy} ({self.memory_plan.reason})")
+
+    def _open_frame_store(self):
+        """A store for the kept frames of one output, or None when they are written right away."""
+        if self.output_format != OUTPUT_FORMAT_MP4 or not self.reverse_video:
+            return None
+        info = self.video_info
+        return open_frame_store(self.memory_plan, self.input_path, info['width'] * info['height'] * 3,
+                                stores=1 + len(self.extra_outputs))
+
+    def _open_outputs(self):
+        """Opens the primary / fan-out sinks and, for reverse MP4, their frame stores; returns (sink, store)."""
+        self._plan_memory()
+        out = self._open_sink()
+        self._open_extra_sinks()
+        for extra in self.extra_outputs:
+            extra.frames = self._open_frame_store()
+        return out, self._open_frame_store()
+
+    def _write_reversed(self, sink, store):
+        """Queues the frames buffered in `store` to `sink`, last to first (the caller closes the sink)."""
+        total = store.count
+        frames = store.reversed_frames()
+        self._report_write_progress(sink.output_path, 0, total, force=True)
+        while True:
+            # It's generally safer NOT to delete the partially written file on cancel;
+            # abort() discards the frames still queued for the encoder
+            self._check_cancelled("write")
+            write_start = time.perf_counter()
+            frame = next(frames, None) # Reading back (decompress / disk / second decode) counts as write time
+            if frame is None:
+                break
+            sink.write(frame)
+            self.stage_timer.add(STAGE_WRITE, time.perf_counter() - write_start)
+            self._report_write_progress(sink.output_path, sink.written, total)
+
+    def _close_sink(self, sink, reversed_total=None):
+        """Waits for the encoder / image writers (timed as write) and reports the end of a reverse write phase."""
+        close_start = time.perf_counter()
+        sink.close()
+        self.stage_timer.add(STAGE_WRITE, time.perf_counter() - close_start)
+        if reversed_total is not None:
+            self._report_write_progress(sink.output_path, reversed_total, reversed_total, force=True)
+
+    def _route_extra_frame(self, index, frame):
+        """Hands frame `index` to every extra output that keeps it (written now unless reverse MP4 needs buffering)."""
+        for j, extra in enumerate(self.extra_outputs, start=1):
+            if not self.analyzer.keep[j][index]:
+                continue
+            if extra.frames is None:
+                write_start = time.perf_counter()
+                extra.sink.write(frame)
+                self.stage_timer.add(STAGE_WRITE, time.perf_counter() - write_start)
+            else:
+                extra.frames.append(index, frame)
+
+    def _finish_extra_outputs(self, primary_report):
+        """Writes buffered frames, closes the extra sinks and builds their reports / results."""
+        total_frames = self.video_info['frames']
+        analysed = self._next_index
+        summaries = []
+        for j, extra in enumerate(self.extra_outputs, start=1):
+            reversed_total = None
+            if extra.frames is not None:
+                reversed_total = extra.frames.count
+                self._write_reversed(extra.sink, extra.frames)
+                extra.frames.close()
+                extra.frames = None
+            kept_count = int(np.count_nonzero(self.analyzer.keep[j][:analysed]))
+            tw_speed = twixtor_speed(kept_count, total_frames)
+            extra.sink.set_decisions(self.analyzer.keep[j][:analysed], self.analyzer.scores[j][:analysed],
+                                     total_frames=total_frames, algorithm=extra.algorithm, params=dict(extra.params),
+                                     decision_threshold=extra.analyzer.decision_threshold(), tw_speed=tw_speed)
+            sink, extra.sink = extra.sink, None
+            self._close_sink(sink, reversed_total)
+            report = dict(primary_report, output_path=extra.output_path, algorithm=extra.algorithm,
+                          params=dict(extra.params), blur_size=extra.analyzer.blur_size, kept_frames=kept_count,
+                          tw_speed=tw_speed, primary_output_path=self.output_path,
+                          report_path=report_path_for(extra.output_path))
+            write_json_report(report['report_path'], report)
+            logging.info(f"Fan-out output {extra.output_path}: kept {kept_count} frames, Twixtor {tw_speed:.2f}%")
+            extra.result = ProcessingResult("处理成功完成!", tw_speed, kept_count, extra.output_path, report)
+            summaries.append({'output_path': extra.output_path, 'algorithm': extra.algorithm,
+                              'params': dict(extra.params), 'kept_frames': kept_count, 'tw_speed': tw_speed,
+                              'report_path': report['report_path']})
+        return summaries
+
+    def run(self):
+        """Analyses the input, writes the kept frames and returns a ProcessingResult."""
+        self._is_running = True
+        self.stage_timer = self.analyzer.timer = StageTimer()
+        self.report = None
+        run_start = time.perf_counter()
+        timer = self.stage_timer
+        out = None
+        store = None # Kept frames of reverse MP4 output (core.frame_store)
+        out_closed = False
+        analysis_done = False
+        self.memory_plan = None
+        frames = self.iter_frames()
+        try:
+            logging.info(f"Starting video processing for: {self.input_path}")
+            for i, frame, _, keep in frames:
+                if out is None:
+                    # Opened once the input is known to be readable (iter_frames validated the metadata)
+                    out, store = self._open_outputs()
+                if keep:
+                    if store is None: # Forward MP4 / image sequence / list: written right away
+                        write_start = time.perf_counter()
+                        out.write(frame)
+                        timer.add(STAGE_WRITE, time.perf_counter() - write_start)
+                    else:
+                        store.append(i, frame)
+                if self.extra_outputs:
+                    self._route_extra_frame(i, frame)
+            analysis_done = True
+            if out is None:
+                out, store = self._open_outputs()
+            total_frames = self.video_info['frames']
+            fps = self.video_info['fps']
+            kept_count = out.count if store is None else store.count
+            logging.info(f"Analysis complete. Kept {kept_count} out of {total_frames} frames.")
+
+            # --- Write Output ---
+            self._check_cancelled("before write")
+            reversed_total = None
+            if store is not None: # Image sequences are reversed by file name on close
+                reversed_total = kept_count
+                logging.info(f"Writing {kept_count} frames in reverse order to {self.output_path}...")
+                self._write_reversed(out, store)
+                store.close()
+                store = None
+
+            # --- Final Calculations ---
+            original_duration = total_frames / fps if fps > 0 else 0
+            new_duration = kept_count / fps if fps > 0 else 0
+            tw_speed = twixtor_speed(kept_count, total_frames)
+
+            logging.info(f"Processing finished successfully for {self.input_path}.")
+            logging.info(f"Original Duration: {original_duration:.2f}s, New Duration: {new_duration:.2f}s")
+            logging.info(f"Suggested Twixtor Speed: {tw_speed:.2f}%")
+
+            # --- Run Report ---
+            analysed = self._next_index
+            out.set_decisions(self.keep_flags[:analysed], self.frame_score_track[:analysed],
+                              total_frames=total_frames, algorithm=self.algorithm, params=dict(self.params),
+                              decision_threshold=self.decision_threshold(), tw_speed=tw_speed)
+            out_closed = True
+            self._close_sink(out, reversed_total) # Flush the encoder / image writers so the write stage and files are final
+            self.report = self.build_report(kept_count, tw_speed, time.perf_counter() - run_start)
+            self.report['report_path'] = report_path_for(self.output_path)
+            if self.extra_outputs:
+                self.report['extra_outputs'] = self._finish_extra_outputs(self.report)
+                self.report['wall_time_s'] = round(time.perf_counter() - run_start, 4)
+                self.report['stages'] = self.stage_timer.summary()
+            write_json_report(self.report['report_path'], self.report)
+            logging.info(f"Stage bottleneck: {self.report['bottleneck_stage']}")
+            if self.checkpoint is not None:
+                self.checkpoint.remove() # Output complete: nothing left to resume
+            return ProcessingResult("处理成功完成!", tw_speed, kept_count, self.output_path, self.report)
+        except BaseException:
+            if analysis_done: # Cancelled / failed while writing: all decisions are final, resume straight to writing
+                self.save_checkpoint()
+            raise
+        finally:
+            frames.close() # Releases the capture if analysis stopped early
+            if out is not None and not out_closed:
+                out.abort()
+            if store is not None:
+                store.close()
+            for extra in self.extra_outputs:
+                if extra.sink is not None:
+                    extra.sink.abort()
+                    extra.sink = None
+                if extra.frames is not None:
+                    extra.frames.close()
+                    extra.frames = None
+
+
+class BatchEngine:
+    """Processes several videos into output_dir/processed_<name>.mp4, on one or more worker threads.
+
+    Callbacks (all optional):
+      on_batch_planned(plan)                    - core.scheduler.BatchPlan, before the first file
+      on_file_started(video_path)
+      on_file_progress(percent, video_path, current_frame, total_frames, stats) - stats gain
+          batch_frames / batch_fps
+      on_analysis_started(total_frames, decision_threshold) - only with max_workers == 1
+      on_frame_scores(start_index, scores, keep_flags)      - only with max_workers == 1
+      on_file_write_progress(video_path, output_path, written, total) - reverse MP4 write phase
+      on_file_finished(video_path, result)      - result is a ProcessingResult
+      on_file_error(video_path, message)
+      on_overall_progress(percent)
+
+    With max_workers > 1 the files are dispatched longest-estimated-first (core.scheduler) so
+    that one long file does not run alone at the end; with one worker the list order is kept.
+    A failing file is reported through on_file_error and the batch continues; run()
+    returns the batch report (also written to output_dir/batch_report.json). With a
+    job_store (core.job_store.JobStore), inputs whose content was already processed
+    successfully with the same parameters are skipped (status 'skipped').
+    """
+    def __init__(self, video_list, output_dir, algorithm, params, reverse_video,
+                 on_file_started=None, on_file_progress=None, on_analysis_started=None, on_frame_scores=None,
+                 on_file_finished=None, on_file_error=None, on_overall_progress=None, job_store=None,
+                 max_workers=1, on_batch_planned=None, output_format=OUTPUT_FORMAT_MP4, score_cache_dir=None,
+                 all_metrics=False, extra_outputs=None, temporal_stride=1, memory_budget_mb=None,
+                 on_file_write_progress=None):
+        self.video_list = list(video_list)
+        self.output_dir = output_dir
+        self.algorithm = algorithm
+        self.params = params
+        self.reverse_video = reverse_video
+        self.output_format = output_format
+        self.score_cache_dir = score_cache_dir # Optional core.score_cache directory shared by all files
+        self.all_metrics = all_metrics
+        self.temporal_stride = temporal_stride # > 1: coarse-to-fine analysis (core.adaptive)
+        self.memory_budget_mb = memory_budget_mb # Reverse MP4 buffering budget (core.planner), shared by the workers
+        # Fan-out: (algorithm, params, suffix) configurations also written from each file's decode,
+        # to processed_<name>_<suffix>.mp4
+        self.extra_outputs = [tuple(extra) for extra in extra_outputs or ()]
+        self.on_file_started = on_file_started
+        self.on_file_progress = on_file_progress
+        self.on_analysis_started = on_analysis_started
+        self.on_frame_scores = on_frame_scores
+        self.on_file_finished = on_file_finished
+        self.on_file_error = on_file_error
+        self.on_overall_progress = on_overall_progress
+        self.on_file_write_progress = on_file_write_progress
+        self.on_batch_planned = on_batch_planned
+        self.job_store = job_store
+        self.max_workers = max(1, int(max_workers))
+        self._is_running = True
+        self._lock = threading.Lock()
+        self._engines = set() # Engines currently running (one per worker)
+        self.plan = None
+        # Aggregate throughput across the whole run
+        self.batch_start_time = None
+        self.frames_in_finished_files = 0
+        self._current_file_frames = {} # video_path -> frames analysed so far
+        # Stage timings merged over all files, written to batch_report.json at the end
+        self.batch_stage_timer = StageTimer()
+        self.batch_report = None
+        self.results = []
+        logging.info(f"BatchEngine initialized for {len(self.video_list)} files ({self.max_workers} worker(s)). Output dir: {output_dir}")
+        logging.info(f"Batch using Algorithm: {self.algorithm}, Params: {self.params}")
+
+    def stop(self):
+        """Requests the batch and the files currently being processed to stop."""
+        self._is_running = False
+        with self._lock:
+            engines = list(self._engines)
+        for engine in engines:
+            engine.stop()
+        logging.info("Batch processing stop requested.")
+
+    @property
+    def is_running(self):
+        return self._is_running
+
+    def _handle_file_progress(self, video_path, value, filename, current_frame, total_frames, stats):
+        """Adds batch-wide frames/sec to the current file's progress stats and forwards them."""
+        with self._lock:
+            self._current_file_frames[video_path] = current_frame
+            batch_frames = self.frames_in_finished_files + sum(self._current_file_frames.values())
+        batch_elapsed = time.perf_counter() - self.batch_start_time if self.batch_start_time else 0.0
+        stats = dict(stats)
+        stats['batch_frames'] = batch_frames
+        stats['batch_fps'] = batch_frames / batch_elapsed if batch_elapsed > 0 else 0.0
+        _call(self.on_file_progress, value, video_path, current_frame, total_frames, stats)
+
+    def _lookup_job(self, video_path):
+        """Returns (fingerprint, params key, previous successful job or None); (None, None, None) without a store."""
+        if self.job_store is None:
+            return None, None, None
+        try:
+            fingerprint = content_fingerprint(video_path)
+        except OSError as e: # Unreadable input: let the engine report the real error
+            logging.warning(f"Cannot fingerprint {video_path}: {e}")
+            return None, None, None
+        key = job_params_key(self.algorithm, self.params, self.reverse_video, self.output_format, self.extra_outputs,
+                             self.temporal_stride)
+        try:
+            return fingerprint, key, self.job_store.find_completed(fingerprint, key)
+        except sqlite3.Error as e: # Locked / corrupt database: the history is only an optimisation
+            logging.warning(f"Job history unavailable for {video_path}: {e}")
+            return None, None, None
+
+    def process_file(self, video_path):
+        """Runs one file; returns its result record (status 'success', 'error' or 'skipped')."""
+        base_filename = os.path.basename(video_path)
+        output_path = sink_output_path(batch_output_path(self.output_dir, video_path), self.output_format)
+        _call(self.on_file_started, video_path)
+        fingerprint, key, previous_job = self._lookup_job(video_path)
+        if previous_job is not None:
+            record = skipped_record(base_filename, previous_job)
+            result = ProcessingResult(f"已跳过: 相同内容和参数已处理过 ({previous_job['output_path']})",
+                                      record['speed'] or 0.0, record['kept'] or 0, record['output'],
+                                      {'report_path': record['report_path'], 'skipped': True})
+            _call(self.on_file_finished, video_path, result)
+            return record
+        job_id = None
+        if fingerprint:
+            try:
+                job_id = self.job_store.start(fingerprint, key, video_path, output_path)
+            except sqlite3.Error as e:
+                logging.warning(f"Job history unavailable for {video_path}: {e}")
+        record = None
+        cancelled = False
+        single = self.max_workers == 1 # The score timeline can only follow one file at a time
+        engine = ExtractionEngine(video_path, output_path, self.algorithm, self.params, self.reverse_video,
+                                  on_progress=functools.partial(self._handle_file_progress, video_path),
+                                  on_analysis_started=self.on_analysis_started if single else None,
+                                  on_frame_scores=self.on_frame_scores if single else None,
+                                  on_write_progress=(functools.partial(self.on_file_write_progress, video_path)
+                                                     if self.on_file_write_progress else None),
+                                  output_format=self.output_format, score_cache_dir=self.score_cache_dir,
+                                  all_metrics=self.all_metrics, temporal_stride=self.temporal_stride,
+                                  memory_budget_mb=self.memory_budget_mb, concurrent_jobs=self.max_workers,
+                                  extra_outputs=[(algorithm, params, variant_output_path(output_path, suffix))
+                                                 for algorithm, params, suffix in self.extra_outputs])
+        with self._lock:
+            self._engines.add(engine)
+        if not self._is_running: # stop() may have raced with the engine registration
+            engine.stop()
+        try:
+            result = engine.run()
+        except Exception as e:
+            error_msg = format_processing_error(video_path, e)
+            cancelled = isinstance(e, ProcessingCancelled)
+            if not cancelled:
+                logging.exception(error_msg)
+            record = error_record(base_filename, error_msg)
+            _call(self.on_file_error, video_path, error_msg)
+        else:
+            record = success_record(base_filename, result)
+            _call(self.on_file_finished, video_path, result)
+        finally:
+            if job_id is not None: # record is None only when interrupted by a BaseException
+                try:
+                    self.job_store.finish(job_id, record or error_record(base_filename, CANCELLED_MESSAGE),
+                                          cancelled=cancelled or record is None)
+                except sqlite3.Error as e:
+                    logging.warning(f"Could not record job outcome for {video_path}: {e}")
+            with self._lock:
+                self._engines.discard(engine)
+                self.batch_stage_timer.merge(engine.stage_timer)
+                self.frames_in_finished_files += self._current_file_frames.pop(video_path, 0)
+        return record
+
+    def _plan(self):
+        """Probes the inputs and orders them (longest first when running in parallel)."""
+        try:
+            self.plan = plan_batch(self.video_list, self.algorithm, self.max_workers,
+                                   longest_first=self.max_workers > 1)
+        except Exception as e: # Scheduling is an optimisation only; never fail the batch over it
+            logging.warning(f"Batch planning failed, keeping list order: {e}")
+            self.plan = None
+            return list(self.video_list)
+        _call(self.on_batch_planned, self.plan)
+        return self.plan.paths
+
+    def _run_parallel(self, ordered_paths):
+        """Dispatches the files in plan order to max_workers threads (OpenCV releases the GIL while decoding/analysing)."""
+        total_files = len(ordered_paths)
+
+        def worker(video_path):
+            if not self._is_running: # Queued jobs are dropped after stop()
+                return None
+            logging.info(f"Batch: Starting {os.path.basename(video_path)}")
+            return self.process_file(video_path)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch") as executor:
+            futures = [executor.submit(worker, path) for path in ordered_paths]
+            for done, future in enumerate(as_completed(futures), 1):
+                record = future.result()
+                if record is not None:
+                    self.results.append(record)
+                _call(self.on_overall_progress, int(done * 100 / total_files))
+
+    def run(self):
+        """Processes every file and returns the batch report; raises OSError if output_dir cannot be created."""
+        self._is_running = True
+        total_files = len(self.video_list)
+        self.results = []
+        self.batch_stage_timer = StageTimer()
+        self.batch_start_time = time.perf_counter()
+        self.frames_in_finished_files = 0
+        self._current_file_frames = {}
+        if total_files == 0:
+            logging.warning("Batch run called with empty video list.")
+            return None
+
+        if not os.path.isdir(self.output_dir):
+            os.makedirs(self.output_dir)
+            logging.info(f"Created batch output directory: {self.output_dir}")
+
+        ordered_paths = self._plan()
+        if self.max_workers > 1:
+            self._run_parallel(ordered_paths)
+        else:
+            for i, video_path in enumerate(ordered_paths):
+                if not self._is_running:
+                    logging.info("Batch processing stopped externally.")
+                    break
+                logging.info(f"Batch: Starting file {i+1}/{total_files}: {os.path.basename(video_path)}")
+                self.results.append(self.process_file(video_path))
+                # Update overall progress *after* file is processed (success or error)
+                _call(self.on_overall_progress, int(((i + 1) / total_files) * 100))
+
+        batch_elapsed = time.perf_counter() - self.batch_start_time
+        if batch_elapsed > 0:
+            logging.info(f"Batch throughput: {self.frames_in_finished_files} frames in {batch_elapsed:.1f}s "
+                         f"({self.frames_in_finished_files / batch_elapsed:.1f} fps)")
+        if self.plan is not None:
+            logging.info(f"Batch wall time {batch_elapsed:.1f}s (planned {self.plan.makespan:.1f}s)")
+        self.batch_report = self.build_batch_report(self.results, batch_elapsed)
+        write_json_report(os.path.join(self.output_dir, "batch_report.json"), self.batch_report)
+        if self._is_running:
+            logging.info("Batch processing completed.")
+        else:
+            logging.info("Batch processing cancelled before completion.")
+        return self.batch_report
+
+    def build_batch_report(self, files_processed_info, batch_elapsed):
+        """Aggregated report for the whole batch: per-file results plus merged stage timings."""
+        return {
+            'output_dir': self.output_dir,
+            'algorithm': self.algorithm,
+            'params': dict(self.params),
+            'reverse_video': self.reverse_video,
+            'output_format': self.output_format,
+            'extra_outputs': [{'algorithm': algorithm, 'params': dict(params), 'suffix': suffix}
+                              for algorithm, params, suffix in self.extra_outputs],
+            'cancelled': not self._is_running,
+            'workers': self.max_workers,
+            'files_total': len(self.video_list),
+            'files_succeeded': sum(1 for info in files_processed_info if info['status'] == 'success'),
+            'files_failed': sum(1 for info in files_processed_info if info['status'] == 'error'),
+            'files_skipped': sum(1 for info in files_processed_info if info['status'] == 'skipped'),
+            'frames_processed': self.frames_in_finished_files,
+            'wall_time_s': round(batch_elapsed, 4),
+            'throughput_fps': round(self.frames_in_finished_files / batch_elapsed, 2) if batch_elapsed > 0 else 0.0,
+            'stages': self.batch_stage_timer.summary(),
+            'bottleneck_stage': self.batch_stage_timer.bottleneck(),
+            'plan': self.plan.as_dict() if self.plan is not None else None,
+            'files': files_processed_info,
+        }
+
+
+# --- Worker processes (CLI --jobs, watch mode) ---
+def run_extraction_job(job):
+    """Processes one (video_path, output_path, algorithm, params, reverse_video[, options]) job and returns its result record.
+
+    options is a dict of extra ExtractionEngine keyword arguments (output_format, score_cache_dir,
+    all_metrics, temporal_stride). Top-level so it can run in a worker process; errors are returned as 'error'
+    records, never raised.
+    """
+    video_path, output_path, algorithm, params, reverse_video = job[:5]
+    options = job[5] if len(job) > 5 else {}
+    filename = os.path.basename(video_path)
+    try:
+        result = ExtractionEngine(video_path, output_path, algorithm, params, reverse_video, **options).run()
+        record = success_record(filename, result)
+    except Exception as e:
+        error_msg = format_processing_error(video_path, e)
+        logging.error(error_msg)
+        record = error_record(filename, error_msg)
+    record['input'] = video_path
+    return record
+
+
+def _init_worker_process(threads_per_job):
+    import signal
+    # Ctrl+C is handled by the parent, which shuts the pool down; workers just finish or get cancelled
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # N jobs x OpenCV's own thread pool would oversubscribe the CPU
+    cv2.setNumThreads(threads_per_job)
+
+
+def create_worker_pool(max_workers):
+    """ProcessPoolExecutor whose workers share the CPU cores between them (OpenCV threads capped per worker)."""
+    from concurrent.futures import ProcessPoolExecutor
+    threads_per_job = max(1, (os.cpu_count() or 1) // max_workers)
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker_process, initargs=(threads_per_job,))
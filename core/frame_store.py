@@ -0,0 +1,177 @@
+# core/frame_store.py
+"""Buffers the kept frames of a reverse MP4 run until they can be written last to first.
+
+One store per buffered output, chosen by core.planner. All share:
+  append(index, frame) - during the analysis pass, in input order
+  count                - frames appended
+  reversed_frames()    - yields the frames last to first (each at most once)
+  close()              - frees memory / removes temporary files (also after an error)
+"""
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+
+from core.planner import STRATEGY_COMPRESSED, STRATEGY_DISK_SPILL, STRATEGY_TWO_PASS
+
+# Fast PNG level: the frames are read back minutes later, smaller files are not worth the time
+COMPRESSED_PNG_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+class MemoryFrameStore:
+    """Raw frames in a list."""
+    def __init__(self):
+        self._frames = []
+
+    @property
+    def count(self):
+        return len(self._frames)
+
+    def append(self, index, frame):
+        self._frames.append(frame)
+
+    def reversed_frames(self):
+        while self._frames:
+            yield self._frames.pop() # Released as soon as written
+
+    def close(self):
+        self._frames = []
+
+
+class CompressedFrameStore:
+    """Lossless PNG-encoded frames in memory (flat colours compress to a fraction of the raw size)."""
+    def __init__(self):
+        self._encoded = []
+        self.encoded_bytes = 0
+
+    @property
+    def count(self):
+        return len(self._encoded)
+
+    def append(self, index, frame):
+        ok, data = cv2.imencode('.png', frame, COMPRESSED_PNG_PARAMS)
+        if not ok:
+            raise IOError(f"无法压缩第 {index} 帧")
+        self._encoded.append(data)
+        self.encoded_bytes += data.nbytes
+
+    def reversed_frames(self):
+        while self._encoded:
+            yield cv2.imdecode(self._encoded.pop(), cv2.IMREAD_COLOR)
+
+    def close(self):
+        self._encoded = []
+
+
+class DiskFrameStore:
+    """Raw frames appended to a temporary file in `directory`, read back in reverse."""
+    def __init__(self, directory=None):
+        self._file = tempfile.TemporaryFile(prefix="afe_frames_", dir=directory)
+        self._shape = None
+        self._count = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def append(self, index, frame):
+        if self._shape is None:
+            self._shape = frame.shape
+        self._file.write(np.ascontiguousarray(frame).data)
+        self._count += 1
+
+    def reversed_frames(self):
+        if not self._count:
+            return
+        frame_bytes = int(np.prod(self._shape))
+        for number in range(self._count - 1, -1, -1):
+            self._file.seek(number * frame_bytes)
+            frame = np.empty(self._shape, dtype=np.uint8)
+            if self._file.readinto(frame.data) != frame_bytes:
+                raise IOError(f"临时帧文件读取失败 (第 {number} 个保留帧)")
+            yield frame
+
+    def close(self):
+        self._file.close() # TemporaryFile: removed on close
+
+
+class TwoPassFrameStore:
+    """Records only the kept indices; reversed_frames() decodes them again from the input.
+
+    The kept frames are re-read in chunks of at most `chunk_frames`, from the last chunk to
+    the first: seek to the chunk's first kept frame, read forward to its last one, write the
+    chunk backwards. Each seek decodes from the previous keyframe, so this is the slowest
+    strategy. When the container seeks inexactly, the input is reopened and read forward.
+    """
+    def __init__(self, input_path, chunk_frames):
+        self.input_path = input_path
+        self.chunk_frames = max(1, int(chunk_frames))
+        self._indices = []
+        self._cap = None
+
+    @property
+    def count(self):
+        return len(self._indices)
+
+    def append(self, index, frame):
+        self._indices.append(index)
+
+    def _position(self, index):
+        """Positions self._cap so that the next read returns frame `index`."""
+        if self._cap is not None and self._cap.set(cv2.CAP_PROP_POS_FRAMES, index) \
+                and int(self._cap.get(cv2.CAP_PROP_POS_FRAMES)) == index:
+            return
+        if self._cap is not None:
+            logging.warning(f"Two-pass output: inexact seek to frame {index}, re-reading {self.input_path} from the start.")
+            self._cap.release()
+        self._cap = cv2.VideoCapture(self.input_path)
+        if not self._cap.isOpened():
+            raise IOError(f"无法重新打开输入视频文件: {self.input_path}")
+        for _ in range(index):
+            if not self._cap.grab():
+                break
+
+    def reversed_frames(self):
+        indices = self._indices
+        if indices and self._cap is None:
+            self._cap = cv2.VideoCapture(self.input_path)
+            if not self._cap.isOpened():
+                raise IOError(f"无法重新打开输入视频文件: {self.input_path}")
+        end = len(indices)
+        while end > 0:
+            start = max(0, end - self.chunk_frames)
+            wanted = indices[start:end]
+            self._position(wanted[0])
+            chunk = []
+            position = wanted[0]
+            for index in wanted:
+                while position < index: # Dropped frames between two kept ones
+                    self._cap.grab()
+                    position += 1
+                ret, frame = self._cap.read()
+                if not ret:
+                    raise IOError(f"第二遍读取失败 (第 {index} 帧): {self.input_path}")
+                chunk.append(frame)
+                position += 1
+            while chunk:
+                yield chunk.pop()
+            end = start
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._indices = []
+
+
+def open_frame_store(plan, input_path, frame_bytes, stores=1):
+    """Creates the store for MemoryPlan `plan`; `stores` buffered outputs share its budget."""
+    if plan.strategy == STRATEGY_COMPRESSED:
+        return CompressedFrameStore()
+    if plan.strategy == STRATEGY_DISK_SPILL:
+        return DiskFrameStore(plan.spill_dir)
+    if plan.strategy == STRATEGY_TWO_PASS:
+        chunk_bytes = (plan.budget_bytes or frame_bytes) // max(1, stores)
+        return TwoPassFrameStore(input_path, chunk_bytes // max(1, frame_bytes))
+    return MemoryFrameStore() # STRATEGY_IN_MEMORY
@@ -0,0 +1,131 @@
+# core/job_store.py
+"""Persistent job history (SQLite) used to skip inputs that were already processed.
+
+Each job row records the input's content fingerprint, a hash of the decision parameters,
+input/output paths, status, timings and the kept-frame count. A batch can then be restarted
+after a failure and only redo the files that did not succeed.
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+
+from core.checkpoint import params_key
+from utils.constants import OUTPUT_FORMAT_MP4
+
+# Bytes hashed at the start, middle and end of the file (plus its size) for the fingerprint
+FINGERPRINT_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fingerprint TEXT NOT NULL,
+    params_key TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT,
+    status TEXT NOT NULL,
+    message TEXT,
+    kept_frames INTEGER,
+    tw_speed REAL,
+    wall_time_s REAL,
+    report_path TEXT,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_lookup ON jobs (fingerprint, params_key, status);
+"""
+
+
+def content_fingerprint(path, chunk_size=FINGERPRINT_CHUNK):
+    """blake2b over the file size and three sampled chunks (start / middle / end).
+
+    Identifies the same content under another name or path without reading multi-GB files
+    completely; files of identical size that differ only outside the sampled chunks collide.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        for offset in sorted({0, max(0, size // 2 - chunk_size // 2), max(0, size - chunk_size)}):
+            f.seek(offset)
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+
+def job_params_key(algorithm, params, reverse_video, output_format=OUTPUT_FORMAT_MP4, extra_outputs=(), temporal_stride=1,
+                   duplicate_fast_path=True):
+    """Hash of everything that changes the output files (extra_outputs: fan-out (algorithm, params, suffix))."""
+    options = dict(params, reverse_video=bool(reverse_video))
+    if output_format != OUTPUT_FORMAT_MP4: # Keeps the keys of MP4 jobs recorded before image output existed
+        options['output_format'] = output_format
+    if extra_outputs:
+        options['extra_outputs'] = [list(extra) for extra in extra_outputs]
+    if temporal_stride and temporal_stride > 1: # Adaptive decisions may differ from a full analysis
+        options['temporal_stride'] = int(temporal_stride)
+    if not duplicate_fast_path:
+        options['duplicate_fast_path'] = False
+    return params_key(algorithm, options)
+
+
+class JobStore:
+    """Thread-safe wrapper around the jobs database."""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL") # Readers (other processes) never block the writer
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def find_completed(self, fingerprint, key):
+        """Latest successful job for this content + parameters whose output still exists, as a dict (or None)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE fingerprint = ? AND params_key = ? AND status = 'success' ORDER BY id DESC",
+                (fingerprint, key)).fetchall()
+        for row in rows:
+            if row['output_path'] and os.path.exists(row['output_path']):
+                return dict(row)
+        return None
+
+    def start(self, fingerprint, key, input_path, output_path):
+        """Inserts a 'running' job and returns its id."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (fingerprint, params_key, input_path, output_path, status, started_at) "
+                "VALUES (?, ?, ?, ?, 'running', ?)",
+                (fingerprint, key, input_path, output_path, time.time()))
+            return cursor.lastrowid
+
+    def finish(self, job_id, record, cancelled=False):
+        """Stores the outcome of a job from its result record ('success' / 'error', or 'cancelled')."""
+        status = 'cancelled' if cancelled else record['status']
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, kept_frames = ?, tw_speed = ?, wall_time_s = ?, "
+                "report_path = ?, finished_at = ? WHERE id = ?",
+                (status, record.get('message'), record.get('kept'), record.get('speed'), record.get('wall_time_s'),
+                 record.get('report_path'), time.time(), job_id))
+
+    def history(self, limit=100):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+
+def skipped_record(filename, job):
+    """Result record for an input skipped because `job` (a find_completed() row) already produced it."""
+    logging.info(f"Skipping {filename}: identical content and parameters already processed -> {job['output_path']}")
+    return {'filename': filename, 'status': 'skipped', 'kept': job['kept_frames'], 'speed': job['tw_speed'],
+            'output': job['output_path'], 'wall_time_s': 0.0, 'bottleneck_stage': None,
+            'report_path': job['report_path'], 'previous_job_id': job['id']}
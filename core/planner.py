@@ -0,0 +1,129 @@
+# core/planner.py
+"""Chooses, before processing, how the kept frames get to the output within a memory budget.
+
+Only reverse MP4 output has to hold the kept frames until the analysis ends (they are written
+last to first); forward MP4, image sequences and decision lists stream. For reverse MP4 the peak
+is estimated as width x height x 3 x frames x expected keep ratio (x outputs) and the first
+strategy that fits is used:
+
+  in_memory  - raw frames in a list (fastest)
+  compressed - lossless PNG-encoded frames in memory (flat anime colours compress well)
+  disk_spill - raw frames appended to a temporary file, read back in reverse
+  two_pass   - only the decisions are kept; the kept frames are decoded again from the input
+               in budget-sized chunks, from the end backwards (core.frame_store)
+
+The budget is the user budget (settings "memory_budget_mb", 0 = automatic) capped by
+MEMORY_BUDGET_FRACTION of the RAM available now, and shared by concurrently running jobs.
+"""
+import sys
+import shutil
+import tempfile
+
+from utils.constants import (OUTPUT_FORMAT_MP4, MEMORY_BUDGET_FRACTION, PLANNER_KEEP_RATIO, PLANNER_PNG_RATIO)
+
+STRATEGY_STREAMING = "streaming"
+STRATEGY_IN_MEMORY = "in_memory"
+STRATEGY_COMPRESSED = "compressed"
+STRATEGY_DISK_SPILL = "disk_spill"
+STRATEGY_TWO_PASS = "two_pass"
+
+_MB = 1024 * 1024
+
+
+def available_memory():
+    """Bytes of RAM available for new allocations, or None when it cannot be determined."""
+    try:
+        import psutil # Optional dependency
+        return int(psutil.virtual_memory().available)
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [('dwLength', ctypes.c_ulong), ('dwMemoryLoad', ctypes.c_ulong),
+                        ('ullTotalPhys', ctypes.c_ulonglong), ('ullAvailPhys', ctypes.c_ulonglong),
+                        ('ullTotalPageFile', ctypes.c_ulonglong), ('ullAvailPageFile', ctypes.c_ulonglong),
+                        ('ullTotalVirtual', ctypes.c_ulonglong), ('ullAvailVirtual', ctypes.c_ulonglong),
+                        ('ullAvailExtendedVirtual', ctypes.c_ulonglong)]
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return int(status.ullAvailPhys)
+    return None
+
+
+def free_disk_space(directory):
+    try:
+        return shutil.disk_usage(directory).free
+    except OSError:
+        return None
+
+
+class MemoryPlan:
+    """The chosen strategy and the numbers behind it (for the log and the run report)."""
+    def __init__(self, strategy, estimated_bytes, budget_bytes, available_bytes, reason, spill_dir=None):
+        self.strategy = strategy
+        self.estimated_bytes = estimated_bytes
+        self.budget_bytes = budget_bytes
+        self.available_bytes = available_bytes
+        self.reason = reason
+        self.spill_dir = spill_dir
+
+    def to_dict(self):
+        def mb(value):
+            return round(value / _MB, 1) if value is not None else None
+        return {'strategy': self.strategy, 'estimated_peak_mb': mb(self.estimated_bytes),
+                'budget_mb': mb(self.budget_bytes), 'available_mb': mb(self.available_bytes), 'reason': self.reason}
+
+    def __repr__(self):
+        return f"MemoryPlan({self.strategy!r}, {self.reason!r})"
+
+
+def memory_budget(budget_mb=None, available=None, concurrent_jobs=1):
+    """Bytes one job may use for buffered frames: the user budget capped by the RAM available now."""
+    limits = []
+    if budget_mb:
+        limits.append(int(budget_mb) * _MB)
+    if available is not None:
+        limits.append(int(available * MEMORY_BUDGET_FRACTION))
+    if not limits:
+        return None # Unknown: nothing to compare against
+    return min(limits) // max(1, int(concurrent_jobs))
+
+
+def plan_output(width, height, frames, output_format, reverse, buffered_outputs=1, budget_mb=None,
+                concurrent_jobs=1, keep_ratio=PLANNER_KEEP_RATIO, spill_dir=None):
+    """Returns the MemoryPlan for one job; buffered_outputs counts outputs that hold frames (fan-out)."""
+    frame_bytes = width * height * 3
+    estimated = int(frame_bytes * frames * keep_ratio) * max(1, buffered_outputs)
+    if output_format != OUTPUT_FORMAT_MP4 or not reverse:
+        return MemoryPlan(STRATEGY_STREAMING, 0, None, None, "kept frames are written while analysing")
+    available = available_memory()
+    budget = memory_budget(budget_mb, available, concurrent_jobs)
+    if budget is None or estimated <= budget:
+        reason = (f"estimated {estimated / _MB:.0f} MB of kept frames fits the budget of {budget / _MB:.0f} MB"
+                  if budget is not None else "available memory unknown, no budget set")
+        return MemoryPlan(STRATEGY_IN_MEMORY, estimated, budget, available, reason)
+    compressed = int(estimated * PLANNER_PNG_RATIO)
+    if compressed <= budget:
+        return MemoryPlan(STRATEGY_COMPRESSED, estimated, budget, available,
+                          f"estimated {estimated / _MB:.0f} MB exceeds the budget of {budget / _MB:.0f} MB; "
+                          f"~{compressed / _MB:.0f} MB as PNG in memory fits")
+    spill_dir = spill_dir or tempfile.gettempdir()
+    free = free_disk_space(spill_dir)
+    if free is not None and estimated * 1.1 <= free:
+        return MemoryPlan(STRATEGY_DISK_SPILL, estimated, budget, available,
+                          f"estimated {estimated / _MB:.0f} MB (~{compressed / _MB:.0f} MB compressed) exceeds the "
+                          f"budget of {budget / _MB:.0f} MB; spilling to {spill_dir} ({free / _MB:.0f} MB free)",
+                          spill_dir=spill_dir)
+    return MemoryPlan(STRATEGY_TWO_PASS, estimated, budget, available,
+                      f"estimated {estimated / _MB:.0f} MB exceeds the budget of {budget / _MB:.0f} MB and the free "
+                      f"space in {spill_dir}; re-decoding kept frames in chunks of {budget / _MB:.0f} MB")
@@ -0,0 +1,110 @@
+# core/probe.py
+"""Cheap container probe: frame count, resolution, fps and codec from the stream header (no decoding).
+
+Results are cached by (absolute path, size, mtime), so files probed when they are added to the
+batch list are not probed again by the scheduler, and a file that changed on disk is re-probed.
+"""
+import os
+import logging
+import threading
+
+import cv2
+
+
+class VideoProbe:
+    """Header information of one video file."""
+    def __init__(self, path, frame_count, width, height, fps, codec=""):
+        self.path = path
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.codec = codec
+
+    @property
+    def megapixel_frames(self):
+        """Frames x megapixels per frame, the unit the cost model works in."""
+        return self.frame_count * self.width * self.height / 1e6
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+    def as_dict(self):
+        return {'frame_count': self.frame_count, 'width': self.width, 'height': self.height, 'fps': self.fps,
+                'codec': self.codec}
+
+    def __repr__(self):
+        return f"VideoProbe({self.path!r}, {self.frame_count} frames, {self.width}x{self.height} @ {self.fps:.2f})"
+
+
+def _fourcc_to_str(value):
+    code = int(value)
+    chars = [chr((code >> (8 * i)) & 0xFF) for i in range(4)]
+    return "".join(chars).strip("\0 ") if all(c.isprintable() for c in chars) else ""
+
+
+def probe_video(path):
+    """Returns a VideoProbe, or None if the file cannot be opened or reports no frames (uncached)."""
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            logging.warning(f"Probe: cannot open {path}")
+            return None
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        codec = _fourcc_to_str(cap.get(cv2.CAP_PROP_FOURCC))
+    finally:
+        cap.release()
+    if frame_count <= 0 or width <= 0 or height <= 0:
+        logging.warning(f"Probe: {path} reports no frames or no resolution")
+        return None
+    return VideoProbe(path, frame_count, width, height, fps, codec)
+
+
+class ProbeCache:
+    """Thread-safe cache of probe results (including failures) keyed by path, size and mtime."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def _key(path):
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+    def get(self, path):
+        """Returns (hit, probe); hit is False when the file was never probed in its current state."""
+        try:
+            key = self._key(path)
+        except OSError:
+            return True, None # Missing file: nothing to probe
+        with self._lock:
+            if key in self._entries:
+                return True, self._entries[key]
+        return False, None
+
+    def probe(self, path):
+        """Cached probe_video(); None for unreadable / invalid files."""
+        hit, result = self.get(path)
+        if hit:
+            return result
+        key = self._key(path)
+        result = probe_video(path)
+        with self._lock:
+            self._entries[key] = result
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by the batch list (background probing) and the scheduler
+probe_cache = ProbeCache()
+
+
+def cached_probe(path):
+    return probe_cache.probe(path)
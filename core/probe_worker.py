@@ -0,0 +1,82 @@
+# core/probe_worker.py
+import logging
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from core.probe import probe_cache
+from core.score_cache import ScoreCache
+
+PROBE_TASK_SIZE = 32 # Files per pool task: fewer task starts and one result signal per group
+
+
+class ProbeSignals(QObject):
+    probed = pyqtSignal(list) # [(path, VideoProbe or None (invalid / unreadable)), ...]
+    scores_found = pyqtSignal(str, str, object, object) # path, metric_key, VideoProbe, float64 scores
+
+
+class ProbeTask(QRunnable):
+    """Probes a group of files (through the shared cache) on a QThreadPool thread."""
+    def __init__(self, paths, signals):
+        super().__init__()
+        self.paths = paths
+        self.signals = signals
+
+    def run(self):
+        results = []
+        for path in self.paths:
+            try:
+                result = probe_cache.probe(path)
+            except Exception as e: # OSError (file removed meanwhile), backend errors
+                logging.warning(f"Probe failed for {path}: {e}")
+                result = None
+            results.append((path, result))
+        self.signals.probed.emit(results)
+
+
+class ScoreLookupTask(QRunnable):
+    """Probes one input and loads its cached score track for `metric_key` (both touch the file, so off the GUI thread)."""
+    def __init__(self, path, cache_dir, metric_key, signals):
+        super().__init__()
+        self.path = path
+        self.cache_dir = cache_dir
+        self.metric_key = metric_key
+        self.signals = signals
+
+    def run(self):
+        try:
+            probe = probe_cache.probe(self.path)
+        except Exception as e:
+            logging.warning(f"Probe failed for {self.path}: {e}")
+            return
+        if probe is None:
+            return
+        cache = ScoreCache(self.cache_dir)
+        scores = cache.load(cache.fingerprint(self.path), self.metric_key, probe.frame_count)
+        if scores is not None:
+            self.signals.scores_found.emit(self.path, self.metric_key, probe, scores)
+
+
+class VideoProber(QObject):
+    """Probes added batch files in the background; results arrive via the probed signal (in the GUI thread)."""
+    probed = pyqtSignal(list)
+    scores_found = pyqtSignal(str, str, object, object) # Only emitted when a cached track exists
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._signals = ProbeSignals(self)
+        self._signals.probed.connect(self.probed)
+        self._signals.scores_found.connect(self.scores_found)
+
+    def probe(self, paths):
+        """Queues paths in groups of PROBE_TASK_SIZE (cache lookups also happen on the pool)."""
+        paths = list(paths)
+        for start in range(0, len(paths), PROBE_TASK_SIZE):
+            self.pool.start(ProbeTask(paths[start:start + PROBE_TASK_SIZE], self._signals))
+
+    def lookup_scores(self, path, cache_dir, metric_key):
+        """Queues a score-cache lookup for one input; a hit arrives via scores_found."""
+        self.pool.start(ScoreLookupTask(path, cache_dir, metric_key, self._signals))
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
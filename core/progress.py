@@ -0,0 +1,63 @@
+# core/progress.py
+import time
+
+from utils.constants import PROGRESS_REPORT_INTERVAL
+
+
+class ProgressTracker:
+    """Frame counters written by the processing thread and read (as snapshots) by the UI.
+
+    Updates are plain attribute writes, so the worker never blocks on the UI; reporting is
+    time-throttled through should_report() instead of happening on every frame.
+    """
+    def __init__(self, total_frames=0, report_interval=PROGRESS_REPORT_INTERVAL):
+        self.report_interval = report_interval
+        self.reset(total_frames)
+
+    def reset(self, total_frames):
+        """Starts a new measurement for a video of total_frames frames."""
+        self.total_frames = max(0, int(total_frames))
+        self.frames_decoded = 0
+        self.frames_analyzed = 0
+        self.decode_seconds = 0.0   # Time spent in cap.read()
+        self.analysis_seconds = 0.0 # Time spent in colour conversion, blur and metric
+        self.duplicate_frames = 0   # Frames dropped by the duplicate fast path (no blur / metric)
+        self.start_time = time.perf_counter()
+        self._last_report_time = None
+
+    def add_decoded(self, seconds, frames=1):
+        self.frames_decoded += frames
+        self.decode_seconds += seconds
+
+    def add_analyzed(self, seconds, frames=1):
+        self.frames_analyzed += frames
+        self.analysis_seconds += seconds
+
+    def should_report(self, now=None):
+        """Returns True at most once per report_interval seconds (always True the first time)."""
+        now = time.perf_counter() if now is None else now
+        if self._last_report_time is None or now - self._last_report_time >= self.report_interval:
+            self._last_report_time = now
+            return True
+        return False
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    def snapshot(self):
+        """Returns a dict with percent, frame counts, per-stage fps, overall fps and ETA (seconds, or -1 if unknown)."""
+        elapsed = self.elapsed()
+        done = self.frames_analyzed
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total_frames - done)
+        return {
+            'percent': int(done * 100 / self.total_frames) if self.total_frames > 0 else 0,
+            'current_frame': done,
+            'total_frames': self.total_frames,
+            'decode_fps': self.frames_decoded / self.decode_seconds if self.decode_seconds > 0 else 0.0,
+            'analysis_fps': done / self.analysis_seconds if self.analysis_seconds > 0 else 0.0,
+            'duplicate_rate': self.duplicate_frames / done if done > 0 else 0.0,
+            'throughput_fps': throughput,
+            'elapsed': elapsed,
+            'eta': remaining / throughput if throughput > 0 else -1.0,
+        }
@@ -0,0 +1,54 @@
+# core/scan_worker.py
+import time
+import logging
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from core.scanner import iter_video_files
+from utils.constants import SCAN_CHUNK_SIZE, SCAN_CHUNK_INTERVAL
+
+
+class DirectoryScanner(QThread):
+    """Walks dropped / chosen folders in the background and streams the matches in chunks.
+
+    A chunk is emitted every SCAN_CHUNK_SIZE files or SCAN_CHUNK_INTERVAL seconds, whichever
+    comes first, so the list fills progressively and the GUI thread only does one model
+    insert per chunk.
+    """
+    files_found = pyqtSignal(list)
+    scan_finished = pyqtSignal(int, bool) # total files found, cancelled
+
+    def __init__(self, roots, extensions, exclude_outputs=True, parent=None):
+        super().__init__(parent)
+        self.roots = list(roots)
+        self.extensions = extensions
+        self.exclude_outputs = exclude_outputs
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def run(self):
+        start = time.perf_counter()
+        total = 0
+        chunk = []
+        last_emit = time.perf_counter()
+        try:
+            for path in iter_video_files(self.roots, self.extensions, self.exclude_outputs,
+                                         should_stop=lambda: not self._is_running):
+                if not self._is_running:
+                    break
+                chunk.append(path)
+                now = time.perf_counter()
+                if len(chunk) >= SCAN_CHUNK_SIZE or now - last_emit >= SCAN_CHUNK_INTERVAL:
+                    total += len(chunk)
+                    self.files_found.emit(chunk)
+                    chunk = []
+                    last_emit = now
+            if chunk:
+                total += len(chunk)
+                self.files_found.emit(chunk)
+        except Exception as e:
+            logging.exception(f"Directory scan failed: {e}")
+        logging.info(f"Scan of {self.roots} found {total} files in {time.perf_counter() - start:.2f}s"
+                     f"{' (cancelled)' if not self._is_running else ''}")
+        self.scan_finished.emit(total, not self._is_running)
@@ -0,0 +1,83 @@
+# core/scanner.py
+"""Recursive discovery of input videos with os.scandir (no Qt).
+
+The walk is iterative (explicit stack, no recursion limit), reuses the DirEntry type
+information instead of stat()-ing every file, and skips hidden directories, directory
+symlinks (loops) and this program's own outputs.
+"""
+import os
+import logging
+
+from utils.constants import VIDEO_EXTENSIONS, ALGO_SUFFIXES
+
+BATCH_OUTPUT_PREFIX = "processed_"
+# Suffixes of single-file outputs (<name>_fd.mp4, <name>_ssim.mp4, ...)
+OUTPUT_SUFFIXES = tuple(f"_{suffix}" for suffix in ALGO_SUFFIXES.values())
+
+
+def parse_extensions(text):
+    """'mp4, .MKV  avi' -> ('.mp4', '.mkv', '.avi'); falls back to VIDEO_EXTENSIONS when empty."""
+    if isinstance(text, (list, tuple)):
+        text = " ".join(text)
+    extensions = []
+    for token in (text or "").replace(",", " ").replace(";", " ").split():
+        ext = token.lower()
+        if not ext.startswith("."):
+            ext = "." + ext
+        if ext != "." and ext not in extensions:
+            extensions.append(ext)
+    return tuple(extensions) or VIDEO_EXTENSIONS
+
+
+def is_processed_output(name, sibling_stems):
+    """True for files written by this program: processed_<name>.mp4, or <stem>_fd/_ssim/_flow.mp4 next to <stem>.*"""
+    if name.startswith(BATCH_OUTPUT_PREFIX):
+        return True
+    stem = os.path.splitext(name)[0]
+    for suffix in OUTPUT_SUFFIXES:
+        if stem.endswith(suffix) and stem[:-len(suffix)] in sibling_stems:
+            return True
+    return False
+
+
+def iter_video_files(roots, extensions=VIDEO_EXTENSIONS, exclude_outputs=True, should_stop=None):
+    """Yields video file paths under `roots` (files or directories), depth-first in name order.
+
+    should_stop() is polled once per directory so a caller can abort a long scan.
+    """
+    extensions = tuple(ext.lower() for ext in extensions)
+    stack = []
+    for root in reversed(list(roots)):
+        if os.path.isdir(root):
+            stack.append(root)
+        elif os.path.splitext(root)[1].lower() in extensions:
+            yield root
+    while stack:
+        if should_stop is not None and should_stop():
+            return
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logging.warning(f"Scan: cannot read {directory}: {e}")
+            continue
+        files, subdirs = [], []
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+        stems = {os.path.splitext(name)[0] for name in files} if exclude_outputs else ()
+        for name in files:
+            if os.path.splitext(name)[1].lower() not in extensions:
+                continue
+            if exclude_outputs and is_processed_output(name, stems):
+                continue
+            yield os.path.join(directory, name)
+        stack.extend(reversed(subdirs))
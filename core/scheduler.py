@@ -0,0 +1,137 @@
+# core/scheduler.py
+"""Cost-aware batch scheduling: estimate each file's processing time and dispatch longest jobs first.
+
+With N parallel workers and files in list order, one long movie that starts last keeps a single
+worker busy while the others sit idle. Sorting by estimated cost (LPT, longest processing time
+first) and giving each job to the next free worker keeps the workers busy until the end.
+
+Costs come from a probe of the container header (frames x resolution) and a per-algorithm
+seconds-per-megapixel-frame coefficient, taken from benchmarks/baseline.json when it exists.
+"""
+import os
+import json
+import heapq
+import logging
+import statistics
+
+from utils.constants import ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW, ALGO_SUFFIXES
+from core.probe import cached_probe
+
+BENCHMARK_BASELINE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                       "benchmarks", "baseline.json")
+
+# Seconds per (frame x megapixel), measured with the benchmark suite on 270p/720p clips; used when
+# the baseline has no record for an algorithm. Only the ratios matter for the dispatch order.
+DEFAULT_SECONDS_PER_MPX_FRAME = {
+    ALGO_FRAME_DIFF: 0.005,
+    ALGO_SSIM: 0.17,
+    ALGO_OPTICAL_FLOW: 0.43,
+}
+FILE_OVERHEAD_SECONDS = 0.05 # Open / writer set-up per file
+
+
+class CostModel:
+    """Estimates the processing time of a probed video for an algorithm."""
+    def __init__(self, seconds_per_mpx_frame=None, file_overhead=FILE_OVERHEAD_SECONDS):
+        self.seconds_per_mpx_frame = dict(DEFAULT_SECONDS_PER_MPX_FRAME)
+        self.seconds_per_mpx_frame.update(seconds_per_mpx_frame or {})
+        self.file_overhead = file_overhead
+
+    @classmethod
+    def from_benchmark_results(cls, path=BENCHMARK_BASELINE_PATH):
+        """Fits the coefficients from a run_benchmarks results file; falls back to the defaults."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f).get('records', [])
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Cannot read benchmark results {path}: {e}; using default cost model.")
+            return cls()
+        suffix_to_algo = {suffix: algo for algo, suffix in ALGO_SUFFIXES.items()}
+        samples = {}
+        for record in records:
+            algorithm = suffix_to_algo.get(record.get('algorithm'))
+            try:
+                work = record['frames'] * record['width'] * record['height'] / 1e6
+                seconds = record['wall_time_s']
+            except (KeyError, TypeError):
+                continue
+            if algorithm is None or record.get('strategy', 'forward') != 'forward' or work <= 0 or seconds <= 0:
+                continue
+            samples.setdefault(algorithm, []).append(seconds / work)
+        fitted = {algorithm: statistics.median(values) for algorithm, values in samples.items()}
+        if fitted:
+            logging.info(f"Cost model from {path}: " + ", ".join(
+                f"{ALGO_SUFFIXES[a]}={v:.4f}s/MPx-frame" for a, v in fitted.items()))
+        return cls(fitted)
+
+    def estimate(self, algorithm, probe):
+        """Estimated seconds for one file; 0 for files that could not be probed (they fail fast)."""
+        if probe is None:
+            return 0.0
+        rate = self.seconds_per_mpx_frame.get(algorithm, DEFAULT_SECONDS_PER_MPX_FRAME[ALGO_FRAME_DIFF])
+        return self.file_overhead + probe.megapixel_frames * rate
+
+
+class PlannedJob:
+    """One file in a batch plan: dispatch position, assigned worker and expected start/finish (seconds from start)."""
+    def __init__(self, path, probe, estimated_seconds):
+        self.path = path
+        self.probe = probe
+        self.estimated_seconds = estimated_seconds
+        self.order = None
+        self.worker = None
+        self.start_s = 0.0
+        self.finish_s = 0.0
+
+    def as_dict(self):
+        return {'path': self.path, 'order': self.order, 'worker': self.worker,
+                'estimated_seconds': round(self.estimated_seconds, 3), 'expected_finish_s': round(self.finish_s, 3),
+                'probe': self.probe.as_dict() if self.probe else None}
+
+
+class BatchPlan:
+    """Dispatch order for a batch plus the simulated schedule on `workers` workers."""
+    def __init__(self, jobs, workers):
+        self.jobs = jobs # In dispatch order
+        self.workers = workers
+
+    @property
+    def makespan(self):
+        """Expected wall time of the whole batch."""
+        return max((job.finish_s for job in self.jobs), default=0.0)
+
+    @property
+    def paths(self):
+        return [job.path for job in self.jobs]
+
+    def as_dict(self):
+        return {'workers': self.workers, 'expected_makespan_s': round(self.makespan, 3),
+                'jobs': [job.as_dict() for job in self.jobs]}
+
+
+def simulate(jobs, workers):
+    """Assigns jobs (in the given order) to whichever worker frees up first and fills in their times."""
+    free_at = [(0.0, worker) for worker in range(max(1, workers))]
+    heapq.heapify(free_at)
+    for order, job in enumerate(jobs):
+        start, worker = heapq.heappop(free_at)
+        job.order, job.worker = order, worker
+        job.start_s, job.finish_s = start, start + job.estimated_seconds
+        heapq.heappush(free_at, (job.finish_s, worker))
+    return BatchPlan(jobs, max(1, workers))
+
+
+def plan_batch(video_paths, algorithm, workers, cost_model=None, longest_first=True, probe=cached_probe):
+    """Probes every file and returns a BatchPlan; longest_first=False keeps the list order (estimates only)."""
+    cost_model = cost_model or CostModel.from_benchmark_results()
+    jobs = []
+    for path in video_paths:
+        info = probe(path)
+        jobs.append(PlannedJob(path, info, cost_model.estimate(algorithm, info)))
+    if longest_first:
+        jobs.sort(key=lambda job: job.estimated_seconds, reverse=True) # Stable: ties keep the list order
+    plan = simulate(jobs, workers)
+    logging.info(f"Batch plan: {len(jobs)} files on {plan.workers} worker(s), expected {plan.makespan:.1f}s")
+    return plan
@@ -0,0 +1,89 @@
+# core/score_cache.py
+"""Per-input cache of per-frame score tracks, so changing algorithm or keep threshold is a lookup.
+
+One <cache_dir>/<content fingerprint>.npz per input video holds a float64 track per metric
+key (FrameAnalyzer.metric_key(): algorithm + blur size [+ pixel threshold] [+ _nodup]), each as long as
+the number of frames analysed. Keep thresholds (min area, SSIM threshold, flow threshold) are
+not part of the key: decisions are re-derived from the scores with FrameAnalyzer.decide().
+"""
+import os
+import json
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from core.job_store import content_fingerprint
+
+SCORE_CACHE_VERSION = 1
+
+_write_lock = threading.Lock() # Serialises read-modify-write of a cache file between batch worker threads
+
+
+class ScoreCache:
+    """Loads and merges score tracks of one input; lookups and failures never raise (a cache must not fail a job)."""
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, fingerprint):
+        return os.path.join(self.directory, f"{fingerprint}.npz")
+
+    @staticmethod
+    def fingerprint(input_path):
+        try:
+            return content_fingerprint(input_path)
+        except OSError as e:
+            logging.warning(f"Score cache: cannot fingerprint {input_path}: {e}")
+            return None
+
+    def _read(self, path, total_frames):
+        """Returns {metric_key: scores} of a cache file, or {} when absent / stale / unreadable."""
+        if not os.path.exists(path):
+            return {}
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['meta']))
+                if meta.get('version') != SCORE_CACHE_VERSION or meta.get('total_frames') != total_frames:
+                    return {}
+                return {key: data[key] for key in data.files if key != 'meta'}
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable score cache {path}: {e}")
+            return {}
+
+    def load(self, fingerprint, metric_key, total_frames):
+        """Returns the cached float64 score track (length = frames analysed) or None."""
+        if fingerprint is None:
+            return None
+        return self._read(self.path_for(fingerprint), total_frames).get(metric_key)
+
+    def available(self, fingerprint, total_frames):
+        """Metric keys cached for an input."""
+        if fingerprint is None:
+            return []
+        return sorted(self._read(self.path_for(fingerprint), total_frames))
+
+    def store(self, fingerprint, total_frames, tracks):
+        """Merges {metric_key: scores} into the input's cache file (written atomically)."""
+        if fingerprint is None or not tracks:
+            return
+        path = self.path_for(fingerprint)
+        tmp_path = None
+        with _write_lock:
+            try:
+                merged = self._read(path, total_frames)
+                merged.update({key: np.asarray(scores, dtype=np.float64) for key, scores in tracks.items()})
+                os.makedirs(self.directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix=".scores_", suffix=".tmp", dir=self.directory)
+                with os.fdopen(fd, 'wb') as f:
+                    meta = {'version': SCORE_CACHE_VERSION, 'total_frames': total_frames}
+                    np.savez_compressed(f, meta=np.array(json.dumps(meta)), **merged)
+                os.replace(tmp_path, path)
+                tmp_path = None
+                logging.info(f"Score cache updated ({', '.join(sorted(tracks))}): {path}")
+            except Exception as e:
+                logging.warning(f"Could not write score cache {path}: {e}")
+            finally:
+                if tmp_path is not None:
+                    try: os.remove(tmp_path)
+                    except OSError: pass
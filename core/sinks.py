@@ -0,0 +1,386 @@
+# core/sinks.py
+"""Output sinks for the kept frames: an MP4 file, a numbered image sequence or a decision list.
+
+VideoSink encodes on a dedicated thread (AsyncVideoWriter) fed through a bounded queue, so the
+analysis / reverse-write loop only blocks when the encoder falls behind.
+
+ImageSequenceSink writes stills without re-encoding a video: each frame is compressed with
+cv2.imencode (which releases the GIL) on a small thread pool, behind a bounded queue so a
+slow disk cannot make memory grow without limit. Frames are numbered in the order they are
+written; reverse output is produced afterwards by renaming, not by buffering frames.
+
+DecisionListSink writes no frames at all, only which frames to keep (JSON, CSV and a CMX3600
+EDL) for editing on the original footage in AE / Premiere.
+"""
+import os
+import csv
+import math
+import json
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from utils.constants import (OUTPUT_FORMAT_MP4, IMAGE_OUTPUT_FORMATS, OUTPUT_FORMAT_DECISION_LIST,
+                             IMAGE_WRITER_THREADS, IMAGE_WRITE_QUEUE_PER_THREAD, VIDEO_WRITE_QUEUE_SIZE)
+
+IMAGE_SEQUENCE_SUFFIX = ".frames" # <output name>.frames/ directory holding the stills
+FRAME_NAME_PREFIX = "frame_"
+FRAME_NUMBER_DIGITS = 6
+_REVERSE_SUFFIX = ".rev" # Temporary names of frames written for reverse output
+
+# cv2.imencode parameters per format: fast lossless PNG, high-quality JPEG / WebP
+IMAGE_ENCODE_PARAMS = {
+    'png': [cv2.IMWRITE_PNG_COMPRESSION, 3],
+    'jpg': [cv2.IMWRITE_JPEG_QUALITY, 95],
+    'webp': [cv2.IMWRITE_WEBP_QUALITY, 95],
+}
+
+
+def is_image_format(output_format):
+    return output_format in IMAGE_OUTPUT_FORMATS
+
+
+def sink_output_path(output_path, output_format):
+    """Maps an .mp4 output path to the path the sink actually writes (<name>.frames for image sequences,
+    <name>.json for decision lists)."""
+    if is_image_format(output_format):
+        return os.path.splitext(output_path)[0] + IMAGE_SEQUENCE_SUFFIX
+    if output_format == OUTPUT_FORMAT_DECISION_LIST:
+        return os.path.splitext(output_path)[0] + ".json"
+    return output_path
+
+
+class AsyncVideoWriter:
+    """A cv2.VideoWriter owned by a dedicated encoder thread, fed through a bounded queue.
+
+    The writer is created, written and released on the encoder thread. put() blocks only when
+    `queue_size` frames are already waiting; the first encoder error is raised from the next
+    put() or from close(). cancel() discards the frames still queued. `written` counts the
+    frames the encoder has finished.
+    """
+    _STOP = object() # Queue sentinel: release the writer and end the thread
+
+    def __init__(self, output_path, fourcc, fps, size, queue_size=VIDEO_WRITE_QUEUE_SIZE):
+        self.output_path = output_path
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._cancelled = threading.Event()
+        self._opened = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, args=(fourcc, fps, size), name="videowrite", daemon=True)
+        self._thread.start()
+        self._opened.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+
+    def _run(self, fourcc, fps, size):
+        writer = None
+        try:
+            # OpenCV VideoWriter does NOT handle audio. This inherently removes audio.
+            writer = cv2.VideoWriter(self.output_path, fourcc, fps, size, isColor=True)
+            if not writer.isOpened():
+                raise IOError(f"无法创建输出视频文件: {self.output_path}")
+        except Exception as e:
+            self._error = e
+            return
+        finally:
+            self._opened.set() # __init__ waits on this, whether or not the writer could be created
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is self._STOP:
+                    break
+                if self._error is not None or self._cancelled.is_set():
+                    continue # Keep draining so put() never blocks on a dead encoder
+                try:
+                    writer.write(frame)
+                    self.written += 1
+                except Exception as e:
+                    self._error = e
+                    logging.error(f"Video encoder failed for {self.output_path}: {e}")
+        finally:
+            writer.release()
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            raise IOError(f"写入输出视频失败 ({self.output_path}): {self._error}")
+
+    def put(self, frame):
+        """Queues one frame (the writer keeps a reference; the caller must not modify it afterwards)."""
+        self._raise_pending_error()
+        self._queue.put(frame)
+
+    def close(self):
+        """Waits until every queued frame is encoded and releases the writer."""
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self._raise_pending_error()
+        return self.written
+
+    def cancel(self):
+        """Drops the queued frames, releases the writer (the file keeps what was encoded) and waits for the thread."""
+        self._cancelled.set()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+
+class VideoSink:
+    """MP4 (mp4v) with the input's fps and size, encoded by an AsyncVideoWriter; audio is not carried over.
+
+    `count` is the number of frames handed to write(), `written` the number already encoded.
+    """
+    def __init__(self, output_path, fps, width, height, queue_size=VIDEO_WRITE_QUEUE_SIZE):
+        self.output_path = output_path
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+            logging.info(f"Created output directory: {output_dir}")
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v') # or 'avc1'
+        self._writer = AsyncVideoWriter(output_path, fourcc, fps, (width, height), queue_size)
+        self.count = 0
+
+    @property
+    def written(self):
+        return self._writer.written
+
+    def write(self, frame):
+        """Queues one frame for the encoder thread; blocks while the queue is full."""
+        self._writer.put(frame)
+        self.count += 1
+
+    def set_decisions(self, keep_flags, scores, **summary):
+        pass # The video itself is the result
+
+    def close(self):
+        """Flushes the encoder; returns the number of frames written."""
+        return self._writer.close()
+
+    def abort(self):
+        """Stops without encoding the frames still queued."""
+        self._writer.cancel()
+
+
+class ImageSequenceSink:
+    """Writes frames as <directory>/frame_000000.<ext>, ... on a thread pool with a bounded queue.
+
+    write() blocks only when `queue_size` frames are already waiting to be encoded. The first
+    encode/write error is raised from the next write() or from close().
+    """
+    def __init__(self, directory, image_format, reverse=False, threads=IMAGE_WRITER_THREADS, queue_size=None):
+        if image_format not in IMAGE_ENCODE_PARAMS:
+            raise ValueError(f"不支持的图片格式: {image_format}")
+        self.directory = directory
+        self.output_path = directory
+        self.extension = "." + image_format
+        self.encode_params = IMAGE_ENCODE_PARAMS[image_format]
+        self.reverse = reverse
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+        threads = max(1, threads)
+        self._slots = threading.BoundedSemaphore(queue_size or threads * IMAGE_WRITE_QUEUE_PER_THREAD)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="imgwrite")
+        self._error = None
+        self._closed = False
+
+    def frame_path(self, number):
+        return os.path.join(self.directory, f"{FRAME_NAME_PREFIX}{number:0{FRAME_NUMBER_DIGITS}d}{self.extension}")
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            raise IOError(f"写入图片序列失败 ({self.directory}): {self._error}")
+
+    def _encode_and_write(self, frame, path):
+        try:
+            if self._error is None:
+                ok, encoded = cv2.imencode(self.extension, frame, self.encode_params)
+                if not ok:
+                    raise IOError(f"cv2.imencode({self.extension}) failed")
+                with open(path, 'wb') as f:
+                    f.write(encoded.tobytes())
+        except Exception as e:
+            if self._error is None:
+                self._error = e
+                logging.error(f"Image sequence write failed for {path}: {e}")
+        finally:
+            self._slots.release()
+
+    def write(self, frame):
+        """Queues one frame (the sink keeps a reference; the caller must not modify it afterwards)."""
+        self._raise_pending_error()
+        path = self.frame_path(self.count)
+        if self.reverse: # Final numbers are only known at the end; see close()
+            path += _REVERSE_SUFFIX
+        self._slots.acquire()
+        self._executor.submit(self._encode_and_write, frame, path)
+        self.count += 1
+
+    def set_decisions(self, keep_flags, scores, **summary):
+        pass
+
+    def _remove_stale_frames(self):
+        """Removes frame files beyond `count` left over from an earlier, longer run into the same directory."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext in (self.extension, _REVERSE_SUFFIX) and stem.startswith(FRAME_NAME_PREFIX):
+                number = stem[len(FRAME_NAME_PREFIX):].split(".")[0]
+                if number.isdigit() and (int(number) >= self.count or ext == _REVERSE_SUFFIX):
+                    try: os.remove(os.path.join(self.directory, name))
+                    except OSError: pass
+
+    def close(self):
+        """Waits for all queued frames, applies reverse numbering; returns the number of frames written."""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True)
+        self._raise_pending_error()
+        if self.reverse:
+            last = self.count - 1
+            for index in range(self.count):
+                os.replace(self.frame_path(index) + _REVERSE_SUFFIX, self.frame_path(last - index))
+        self._remove_stale_frames()
+        return self.count
+
+    def abort(self):
+        """Stops without waiting for queued frames (files already written are left in place)."""
+        if not self._closed:
+            self._closed = True
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def frames_to_timecode(frame, timebase):
+    """Frame number -> non-drop-frame 'HH:MM:SS:FF' at an integer timebase."""
+    seconds, frames = divmod(int(frame), timebase)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}:{frames:02d}"
+
+
+def kept_runs(keep_flags):
+    """Contiguous runs of kept frames as [(first, last_exclusive), ...] in source order."""
+    runs = []
+    start = None
+    for index, keep in enumerate(keep_flags):
+        if keep and start is None:
+            start = index
+        elif not keep and start is not None:
+            runs.append((start, index))
+            start = None
+    if start is not None:
+        runs.append((start, len(keep_flags)))
+    return runs
+
+
+class DecisionListSink:
+    """Records which frames are kept and writes <name>.json / .csv / .edl on close; no frames are encoded.
+
+    JSON: kept frame indices and timestamps, every frame's score and the run summary (tw_speed, ...).
+    CSV: one row per analysed frame (frame, timestamp_s, score, kept).
+    EDL: CMX3600, one cut per run of consecutive kept frames, non-drop-frame timecode at the
+    rounded frame rate. Reverse output is not baked in (the EDL stays in source order); the
+    JSON carries the 'reverse' flag so it can be applied in the editor.
+    """
+    def __init__(self, output_path, fps, source_path=None, reverse=False):
+        self.output_path = output_path
+        base = os.path.splitext(output_path)[0]
+        self.csv_path = base + ".csv"
+        self.edl_path = base + ".edl"
+        self.fps = fps
+        self.timebase = max(1, int(round(fps)))
+        self.source_path = source_path
+        self.reverse = reverse
+        self.count = 0
+        self.keep_flags = None
+        self.scores = None
+        self.summary = {}
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def write(self, frame):
+        self.count += 1
+
+    def set_decisions(self, keep_flags, scores, **summary):
+        """Receives the keep flags / scores of the analysed frames (and summary fields for the JSON) before close()."""
+        self.keep_flags = keep_flags
+        self.scores = scores
+        self.summary = summary
+
+    def _write_json(self, kept):
+        scores = [None if math.isnan(score) else round(float(score), 6) for score in self.scores]
+        data = {
+            'source': self.source_path,
+            'fps': self.fps,
+            'analysed_frames': len(self.keep_flags),
+            'reverse': self.reverse,
+            **self.summary,
+            'kept_count': len(kept),
+            'kept_frames': kept,
+            'kept_timestamps': [round(index / self.fps, 6) for index in kept],
+            'scores': scores,
+        }
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    def _write_csv(self):
+        with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(('frame', 'timestamp_s', 'score', 'kept'))
+            for index in range(len(self.keep_flags)):
+                score = self.scores[index]
+                writer.writerow((index, f"{index / self.fps:.6f}", "" if math.isnan(score) else f"{score:.6f}",
+                                 int(bool(self.keep_flags[index]))))
+
+    def _write_edl(self):
+        clip_name = os.path.basename(self.source_path) if self.source_path else ""
+        title = os.path.splitext(os.path.basename(self.output_path))[0]
+        lines = [f"TITLE: {title}", "FCM: NON-DROP FRAME", ""]
+        record = 0
+        for event, (first, end) in enumerate(kept_runs(self.keep_flags), start=1):
+            length = end - first
+            lines.append(f"{event:03d}  AX       V     C        "
+                         f"{frames_to_timecode(first, self.timebase)} {frames_to_timecode(end, self.timebase)} "
+                         f"{frames_to_timecode(record, self.timebase)} {frames_to_timecode(record + length, self.timebase)}")
+            if clip_name:
+                lines.append(f"* FROM CLIP NAME: {clip_name}")
+            lines.append("")
+            record += length
+        with open(self.edl_path, 'w', encoding='utf-8') as f:
+            f.write("\r\n".join(lines)) # EDL readers expect CRLF
+
+    def close(self):
+        """Writes the three files; returns the number of kept frames."""
+        if self.keep_flags is None:
+            raise ValueError("决策列表缺少分析结果 (set_decisions 未调用)")
+        kept = [int(index) for index in np.flatnonzero(self.keep_flags)]
+        self._write_json(kept)
+        self._write_csv()
+        self._write_edl()
+        return len(kept)
+
+    def abort(self):
+        pass # Nothing is written before close()
+
+
+def open_sink(output_path, output_format, fps, width, height, reverse=False, source_path=None):
+    """Creates the sink for output_format ('mp4', 'png', 'jpg', 'webp', 'list') at output_path (already mapped)."""
+    if output_format == OUTPUT_FORMAT_MP4:
+        return VideoSink(output_path, fps, width, height)
+    if output_format == OUTPUT_FORMAT_DECISION_LIST:
+        return DecisionListSink(output_path, fps, source_path=source_path, reverse=reverse)
+    return ImageSequenceSink(output_path, output_format, reverse=reverse)
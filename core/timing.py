@@ -0,0 +1,83 @@
+# core/timing.py
+import json
+import logging
+import os
+from array import array
+
+import numpy as np
+
+# Stages of the per-frame pipeline, in pipeline order
+STAGE_READ = "read"
+STAGE_CVT_COLOR = "cvtColor"
+STAGE_BLUR = "GaussianBlur"
+STAGE_METRIC = "metric"
+STAGE_WRITE = "write"
+PIPELINE_STAGES = (STAGE_READ, STAGE_CVT_COLOR, STAGE_BLUR, STAGE_METRIC, STAGE_WRITE)
+
+
+class StageTimer:
+    """Records wall-time samples per pipeline stage and summarises them (count, total, percentiles).
+
+    Samples are kept as compact float arrays so percentiles can be computed exactly and
+    timers from several jobs can be merged into one batch-level summary.
+    """
+    def __init__(self):
+        self._samples = {stage: array('d') for stage in PIPELINE_STAGES}
+
+    def add(self, stage, seconds):
+        """Adds one sample (in seconds) for a stage."""
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = array('d')
+        samples.append(seconds)
+
+    def merge(self, other):
+        """Appends all samples of another StageTimer (used for batch aggregation)."""
+        for stage, samples in other._samples.items():
+            if stage not in self._samples:
+                self._samples[stage] = array('d')
+            self._samples[stage].extend(samples)
+
+    def total(self, stage):
+        return float(sum(self._samples.get(stage, ())))
+
+    def summary(self):
+        """Returns {stage: {count, total_s, mean_ms, p50_ms, p90_ms, p99_ms, max_ms}} for stages with samples."""
+        result = {}
+        for stage, samples in self._samples.items():
+            if not samples:
+                continue
+            values = np.frombuffer(samples, dtype=np.float64) * 1000.0 # ms
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            result[stage] = {
+                'count': int(values.size),
+                'total_s': round(float(values.sum()) / 1000.0, 4),
+                'mean_ms': round(float(values.mean()), 4),
+                'p50_ms': round(float(p50), 4),
+                'p90_ms': round(float(p90), 4),
+                'p99_ms': round(float(p99), 4),
+                'max_ms': round(float(values.max()), 4),
+            }
+        return result
+
+    def bottleneck(self):
+        """Returns the name of the stage with the largest total time, or None if nothing was recorded."""
+        totals = {stage: sum(samples) for stage, samples in self._samples.items() if samples}
+        return max(totals, key=totals.get) if totals else None
+
+
+def report_path_for(output_path):
+    """Returns the JSON run report path stored next to an output file (<name>_report.json)."""
+    return os.path.splitext(output_path)[0] + "_report.json"
+
+
+def write_json_report(path, report):
+    """Writes a report dict as UTF-8 JSON. Failures are logged, never raised (a report must not fail a job)."""
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        logging.info(f"Run report written to: {path}")
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        logging.error(f"Could not write run report {path}: {e}")
+        return False
@@ -0,0 +1,285 @@
+# core/watcher.py
+"""Watch-folder mode: detect finished video files in input directories and process them on a worker pool.
+
+New files are noticed through inotify on Linux (ctypes, no extra dependency) and through a
+periodic directory rescan everywhere else. The rescan also runs alongside inotify as a safety
+net, because inotify does not see files written to a network share by another machine. A file
+is only queued once its size and mtime have stopped changing for `settle_seconds`, so copies
+still in progress are never picked up.
+"""
+import os
+import sys
+import time
+import select
+import struct
+import logging
+import threading
+
+from utils.constants import (VIDEO_EXTENSIONS, WATCH_POLL_INTERVAL, WATCH_SETTLE_SECONDS,
+                             WATCH_RESCAN_INTERVAL, OUTPUT_FORMAT_MP4)
+from core.engine import batch_output_path, run_extraction_job, create_worker_pool, error_record
+from core.sinks import sink_output_path
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII') # wd, mask, cookie, name length
+
+
+class InotifyWatch:
+    """Minimal inotify wrapper: reports paths created/modified/moved into the watched directories."""
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._ctypes = ctypes
+        self._libc = libc
+        self.fd = fd
+        self._directories = {}
+
+    def add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            errno = self._ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._directories[wd] = directory
+
+    def read(self, timeout):
+        """Waits up to `timeout` seconds and returns the paths named by the pending events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            directory = self._directories.get(wd)
+            if directory and name:
+                paths.append(os.path.join(directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class FolderWatcher:
+    """Yields video files in `directories` once they have stopped growing (see module docstring)."""
+    def __init__(self, directories, extensions=VIDEO_EXTENSIONS, settle_seconds=WATCH_SETTLE_SECONDS,
+                 poll_interval=WATCH_POLL_INTERVAL, rescan_interval=WATCH_RESCAN_INTERVAL,
+                 include_existing=True, use_inotify=True):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.include_existing = include_existing
+        self.use_inotify = use_inotify and sys.platform.startswith('linux')
+        self._running = True
+        self._pending = {} # path -> ((size, mtime_ns), first time this signature was seen)
+        self._seen = {}    # path -> (size, mtime_ns) already yielded, so unchanged files are not queued twice
+        self.mode = None
+
+    def stop(self):
+        self._running = False
+
+    def is_candidate(self, path):
+        name = os.path.basename(path)
+        if name.startswith('.') or name.startswith('processed_'): # Temp files of copy tools / our own output
+            return False
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def _scan(self):
+        """Lists candidate files in every watched directory."""
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_file() and self.is_candidate(entry.path):
+                                yield entry.path
+                        except OSError:
+                            continue
+            except OSError as e:
+                logging.warning(f"Cannot scan watched directory {directory}: {e}")
+
+    def _note(self, path):
+        if path not in self._pending and self.is_candidate(path):
+            self._pending[path] = None
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return (st.st_size, st.st_mtime_ns)
+
+    def _collect_settled(self, now):
+        """Re-stats pending files and returns those whose size/mtime stayed unchanged for settle_seconds."""
+        settled = []
+        for path, state in list(self._pending.items()):
+            try:
+                signature = self._signature(path)
+            except OSError: # Removed or renamed before it settled
+                del self._pending[path]
+                continue
+            if state is None or state[0] != signature:
+                self._pending[path] = (signature, now)
+            elif signature[0] > 0 and now - state[1] >= self.settle_seconds:
+                del self._pending[path]
+                if self._seen.get(path) != signature:
+                    self._seen[path] = signature
+                    settled.append(path)
+        return settled
+
+    def _open_inotify(self):
+        if not self.use_inotify:
+            return None
+        try:
+            inotify = InotifyWatch()
+            for directory in self.directories:
+                inotify.add_watch(directory)
+            return inotify
+        except (OSError, AttributeError) as e: # AttributeError: libc without inotify symbols
+            logging.warning(f"inotify unavailable ({e}); falling back to polling every {self.poll_interval}s.")
+            return None
+
+    def watch(self):
+        """Generator of settled file paths; runs until stop() is called."""
+        self._running = True
+        for path in self._scan():
+            if self.include_existing:
+                self._note(path)
+            else:
+                try:
+                    self._seen[path] = self._signature(path)
+                except OSError:
+                    pass
+        inotify = self._open_inotify()
+        self.mode = "inotify" if inotify is not None else "polling"
+        logging.info(f"Watching {len(self.directories)} folder(s) using {self.mode}: {self.directories}")
+        # With inotify the full rescan is only a safety net (network shares); without it, it is the only source
+        rescan_every = self.rescan_interval if inotify is not None else self.poll_interval
+        tick = min(1.0, self.poll_interval, self.settle_seconds or 1.0)
+        last_rescan = time.monotonic()
+        try:
+            while self._running:
+                if inotify is not None:
+                    for path in inotify.read(tick):
+                        self._note(path)
+                else:
+                    time.sleep(tick)
+                now = time.monotonic()
+                if now - last_rescan >= rescan_every:
+                    last_rescan = now
+                    for path in self._scan():
+                        try:
+                            if self._seen.get(path) != self._signature(path):
+                                self._note(path)
+                        except OSError:
+                            continue
+                for path in self._collect_settled(now):
+                    if not self._running:
+                        return
+                    yield path
+        finally:
+            if inotify is not None:
+                inotify.close()
+
+
+def is_up_to_date(video_path, output_path):
+    """True when output_path exists and is newer than the input (already processed)."""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(video_path)
+    except OSError:
+        return False
+
+
+class WatchService:
+    """Long-running watch mode: settled files from a FolderWatcher go to a persistent worker pool.
+
+    Outputs use the batch naming (`processed_<name>.mp4`) in output_dir, or next to each input
+    when output_dir is None. on_result(record) is called (from a pool thread) for every finished file.
+    """
+    def __init__(self, directories, output_dir, algorithm, params, reverse_video, workers=1,
+                 on_result=None, engine_options=None, **watcher_options):
+        self.output_dir = output_dir
+        self.algorithm = algorithm
+        self.params = params
+        self.reverse_video = reverse_video
+        self.engine_options = dict(engine_options or {}) # Extra ExtractionEngine arguments (output_format, ...)
+        self.workers = max(1, workers)
+        self.on_result = on_result
+        self.watcher = FolderWatcher(directories, **watcher_options)
+        self._lock = threading.Lock()
+        self.in_flight = set()
+        self.processed = 0
+        self.failed = 0
+
+    def output_path_for(self, video_path):
+        output_path = batch_output_path(self.output_dir or os.path.dirname(video_path), video_path)
+        return sink_output_path(output_path, self.engine_options.get('output_format', OUTPUT_FORMAT_MP4))
+
+    def stop(self):
+        """Stops watching; jobs already running finish, queued ones are cancelled."""
+        self.watcher.stop()
+
+    def _job_done(self, video_path, future):
+        with self._lock:
+            self.in_flight.discard(video_path)
+        if future.cancelled():
+            return
+        try:
+            record = future.result()
+        except Exception as e: # Worker process died (BrokenProcessPool) etc.
+            record = error_record(os.path.basename(video_path), f"处理视频时发生意外错误: {e}")
+            record['input'] = video_path
+        with self._lock:
+            if record['status'] == 'success':
+                self.processed += 1
+            else:
+                self.failed += 1
+        if self.on_result is not None:
+            self.on_result(record)
+
+    def run(self):
+        """Blocks until stop() (or KeyboardInterrupt); returns (processed, failed) counts."""
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        executor = create_worker_pool(self.workers) # Persistent: worker start-up is paid once, not per file
+        try:
+            for video_path in self.watcher.watch():
+                output_path = self.output_path_for(video_path)
+                with self._lock:
+                    if video_path in self.in_flight:
+                        continue
+                if is_up_to_date(video_path, output_path):
+                    logging.info(f"Watch: skipping {video_path}, output is up to date.")
+                    continue
+                logging.info(f"Watch: queueing {video_path}")
+                job = (video_path, output_path, self.algorithm, self.params, self.reverse_video, self.engine_options)
+                with self._lock:
+                    self.in_flight.add(video_path)
+                future = executor.submit(run_extraction_job, job)
+                future.add_done_callback(lambda f, path=video_path: self._job_done(path, f))
+        finally:
+            self.watcher.stop()
+            executor.shutdown(wait=True, cancel_futures=True)
+        return self.processed, self.failed
@@ -1,23 +1,57 @@
 # main.py
 import sys
 import os
+import time
 import logging
 from datetime import datetime # For timestamp in log start/end
 
+_process_start = time.perf_counter()
+
 # --- Early Setup ---
 project_root = os.path.dirname(os.path.abspath(__file__))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from PyQt5.QtWidgets import QApplication, QMessageBox
-from utils.helpers import check_and_install_libraries, setup_logging, custom_exception_hook
+from PyQt5.QtCore import QTimer
+from utils.helpers import find_missing_libraries, setup_logging, custom_exception_hook
 from utils.settings import Settings
 from utils.watermark import watermark_protection, validate_watermark_integrity, run_obfuscated_check
-from ui.main_window import MainWindow
 from utils.constants import APP_NAME # Get app name for log
+# ui.main_window (and with it OpenCV / numpy / the processing core) is imported in main() after QApplication
+
+# Startup timing breakdown: (step, seconds since the previous mark)
+_startup_marks = []
+_last_mark = [_process_start]
+
+def _mark(step):
+    now = time.perf_counter()
+    _startup_marks.append((step, now - _last_mark[0]))
+    _last_mark[0] = now
+
+def _log_startup_timing():
+    """Logs how long each startup step took, up to the first event-loop iteration after show()."""
+    _mark("first event loop iteration")
+    total = time.perf_counter() - _process_start
+    breakdown = ", ".join(f"{step} {seconds * 1000:.0f}ms" for step, seconds in _startup_marks)
+    logging.info(f"Startup timing: {total * 1000:.0f}ms to first window ({breakdown})")
+
+def _run_integrity_check(app):
+    """Watermark integrity check; runs once the window is up so cryptography does not delay it."""
+    try:
+         run_obfuscated_check(lambda: validate_watermark_integrity(watermark_protection))
+         logging.info("Integrity check passed.")
+    except SystemExit:
+         logging.critical("Integrity check failed via obfuscated call. Exiting.")
+         app.exit(1)
+    except Exception as e:
+         logging.critical(f"Error during integrity check: {e}")
+         QMessageBox.critical(None, "安全错误", f"程序完整性检查时发生错误: {e}")
+         app.exit(1)
 
 
 def main():
+    _mark("module imports")
     # 1. Initialize Settings
     try:
         settings = Settings()
@@ -44,42 +78,23 @@ def main():
     sys.excepthook = custom_exception_hook
     start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     logging.info(f"--- {APP_NAME} Application Start --- ({start_time})")
+    _mark("settings + logging")
 
 
-    # 4. Check and Install Libraries
+    # 4. Check Libraries (find_spec only: nothing is imported or installed here)
     logging.info("Checking required libraries...")
-    print("正在检查必需的库...")
     try:
-        libraries_ok = check_and_install_libraries()
-        if not libraries_ok:
-             logging.warning("Some libraries might have failed to install automatically.")
-             # Decide if you want to show a warning or exit
-             # msg = "部分必需的库未能自动安装。请检查控制台输出并尝试手动安装 (`pip install ...`)。程序将尝试继续运行，但可能会出错。"
-             # app_temp = QApplication.instance() or QApplication(sys.argv) # Need argv here
-             # QMessageBox.warning(None, "库安装问题", msg)
+        missing = find_missing_libraries()
+        if missing:
+             logging.warning(f"Missing libraries: {', '.join(missing)}")
+             print(f"缺少必需的库: {', '.join(missing)}。请手动安装: pip install {' '.join(missing)}")
     except Exception as e:
-        logging.error(f"Error during library check/install: {e}")
-        print(f"检查/安装库时出错: {e}")
-        # Decide whether to continue or exit
+        logging.error(f"Error during library check: {e}")
+        print(f"检查库时出错: {e}")
+    _mark("library probe")
 
 
-    # 5. Validate Watermark/Integrity Check
-    try:
-         run_obfuscated_check(lambda: validate_watermark_integrity(watermark_protection))
-         logging.info("Integrity check passed.")
-    except SystemExit:
-         logging.critical("Integrity check failed via obfuscated call. Exiting.")
-         sys.exit(1)
-    except Exception as e:
-         logging.critical(f"Error during integrity check: {e}")
-         try: # Try to show message box
-             app_temp = QApplication.instance() or QApplication(sys.argv)
-             QMessageBox.critical(None, "安全错误", f"程序完整性检查时发生错误: {e}")
-         except: pass
-         sys.exit(1)
-
-
-    # 6. Initialize QApplication
+    # 5. Initialize QApplication
     try:
         # It's generally safer to pass sys.argv here
         app = QApplication(sys.argv)
@@ -87,12 +102,17 @@ def main():
         logging.critical(f"Failed to create QApplication: {e}")
         print(f"FATAL: Could not initialize Qt Application: {e}")
         sys.exit(1)
+    _mark("QApplication")
 
 
-    # 7. Create and Show Main Window
+    # 6. Create and Show Main Window
     try:
+        from ui.main_window import MainWindow
+        _mark("import ui.main_window")
         main_window = MainWindow(settings)
+        _mark("MainWindow()")
         main_window.show()
+        _mark("show()")
     except ImportError as e:
          # Catch specific import errors related to missing modules like QtMultimedia
          logging.critical(f"Failed to create main window due to missing dependency: {e}", exc_info=True)
@@ -104,6 +124,11 @@ def main():
         sys.exit(1)
 
 
+    # 7. Deferred startup work: timing log, then the watermark integrity check (first use of cryptography)
+    QTimer.singleShot(0, _log_startup_timing)
+    QTimer.singleShot(0, lambda: _run_integrity_check(app))
+
+
     # 8. Start Event Loop
     exit_code = app.exec_()
     end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,223 @@
+# ui/batch_model.py
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QColor
+
+from utils.helpers import format_duration
+
+# Job states shown in the status column
+STATUS_PENDING = "待处理"
+STATUS_INVALID = "无效文件"
+STATUS_RUNNING = "处理中"
+STATUS_DONE = "完成"
+STATUS_SKIPPED = "已跳过"
+STATUS_ERROR = "错误"
+
+STATUS_COLORS = {
+    STATUS_INVALID: QColor("red"),
+    STATUS_RUNNING: QColor("blue"),
+    STATUS_DONE: QColor("green"),
+    STATUS_SKIPPED: QColor("darkGreen"),
+    STATUS_ERROR: QColor("red"),
+}
+
+COL_PATH, COL_DURATION, COL_RESOLUTION, COL_FPS, COL_STATUS, COL_PROGRESS, COL_KEPT, COL_SPEED = range(8)
+HEADERS = ("文件", "时长", "分辨率", "FPS", "状态", "进度", "保留帧", "TW 速度")
+PROBE_COLUMNS = (COL_DURATION, COL_RESOLUTION, COL_FPS) # Filled in by the background probe
+
+
+class BatchJob:
+    """One file in the batch list and everything the UI knows about it."""
+    def __init__(self, path):
+        self.path = path
+        self.status = STATUS_PENDING
+        self.progress = 0
+        self.kept_frames = None
+        self.tw_speed = None
+        self.message = ""
+        self.output_path = None
+        self.report_path = None
+        self.probe = None
+        self.plan_order = None
+        self.expected_finish = None
+
+    def reset(self):
+        """Clears the results of a previous run (probe information is kept)."""
+        if self.status != STATUS_INVALID:
+            self.status = STATUS_PENDING
+        self.progress = 0
+        self.kept_frames = None
+        self.tw_speed = None
+        self.message = ""
+        self.output_path = None
+        self.report_path = None
+        self.plan_order = None
+        self.expected_finish = None
+
+    def status_text(self):
+        if self.status == STATUS_PENDING and self.plan_order is not None:
+            return f"计划 #{self.plan_order + 1} | 预计 {format_duration(self.expected_finish)} 完成"
+        return self.status
+
+    def probe_text(self, column):
+        """Duration / resolution / fps cell; empty until the probe has finished (or when it failed)."""
+        probe = self.probe
+        if probe is None:
+            return ""
+        if column == COL_DURATION:
+            return format_duration(probe.duration)
+        if column == COL_RESOLUTION:
+            return f"{probe.width}x{probe.height}"
+        return f"{probe.fps:.2f}"
+
+    def tooltip(self):
+        lines = [self.path]
+        if self.probe is not None:
+            codec = f", {self.probe.codec}" if self.probe.codec else ""
+            lines.append(f"{self.probe.frame_count} 帧, {self.probe.width}x{self.probe.height}, "
+                         f"{self.probe.fps:.2f} fps{codec}, 时长 {format_duration(self.probe.duration)}")
+        elif self.status == STATUS_INVALID:
+            lines.append("无法读取视频信息 (文件损坏、格式不支持或没有帧)，批量处理时将提示跳过。")
+        if self.message:
+            lines.append(self.message)
+        if self.output_path:
+            lines.append(f"输出: {self.output_path}")
+        if self.report_path:
+            lines.append(f"报告: {self.report_path}")
+        return "\n".join(lines)
+
+
+class BatchTableModel(QAbstractTableModel):
+    """Table model over BatchJob objects with an O(1) path -> row index (duplicate check and updates).
+
+    Updates only emit dataChanged for the affected row, so progress from several parallel
+    workers does not re-render the whole list.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = []
+        self._rows = {} # path -> row
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._jobs)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        job = self._jobs[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == COL_PATH:
+                return job.path
+            if column in PROBE_COLUMNS:
+                return job.probe_text(column)
+            if column == COL_STATUS:
+                return job.status_text()
+            if column == COL_PROGRESS:
+                return f"{job.progress}%" if job.status in (STATUS_RUNNING, STATUS_DONE, STATUS_ERROR) else ""
+            if column == COL_KEPT:
+                return "" if job.kept_frames is None else str(job.kept_frames)
+            if column == COL_SPEED:
+                return "" if job.tw_speed is None else f"{job.tw_speed:.1f}%"
+        elif role == Qt.ForegroundRole and column in (COL_PATH, COL_STATUS):
+            return STATUS_COLORS.get(job.status)
+        elif role == Qt.ToolTipRole:
+            return job.tooltip()
+        elif role == Qt.TextAlignmentRole and column in PROBE_COLUMNS + (COL_PROGRESS, COL_KEPT, COL_SPEED):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    # --- List handling ---
+    def __len__(self):
+        return len(self._jobs)
+
+    def __contains__(self, path):
+        return path in self._rows
+
+    def paths(self):
+        return [job.path for job in self._jobs]
+
+    def jobs(self):
+        return list(self._jobs)
+
+    def job(self, path):
+        row = self._rows.get(path)
+        return self._jobs[row] if row is not None else None
+
+    def add_paths(self, paths):
+        """Appends the paths not already in the list (one insert notification); returns the added paths."""
+        added = []
+        seen = set()
+        for path in paths:
+            if path not in self._rows and path not in seen:
+                seen.add(path)
+                added.append(path)
+        if added:
+            first = len(self._jobs)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for offset, path in enumerate(added):
+                self._jobs.append(BatchJob(path))
+                self._rows[path] = first + offset
+            self.endInsertRows()
+        return added
+
+    def remove_rows(self, rows):
+        """Removes the given row numbers (any order)."""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        self.beginResetModel() # One reset is cheaper than many removeRows for large selections
+        remove = set(rows)
+        self._jobs = [job for row, job in enumerate(self._jobs) if row not in remove]
+        self._rows = {job.path: row for row, job in enumerate(self._jobs)}
+        self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self._jobs = []
+        self._rows = {}
+        self.endResetModel()
+
+    def update(self, path, **fields):
+        """Sets BatchJob attributes for one path and repaints only that row; returns the row (or None)."""
+        row = self._rows.get(path)
+        if row is None:
+            return None
+        job = self._jobs[row]
+        for name, value in fields.items():
+            setattr(job, name, value)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(HEADERS) - 1))
+        return row
+
+    def update_many(self, updates):
+        """Applies {path: {attribute: value}} and emits one dataChanged over the affected row range."""
+        rows = []
+        for path, fields in updates.items():
+            row = self._rows.get(path)
+            if row is None:
+                continue
+            job = self._jobs[row]
+            for name, value in fields.items():
+                setattr(job, name, value)
+            rows.append(row)
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), len(HEADERS) - 1))
+
+    def reset_jobs(self):
+        """Clears previous run results of every job before a new batch."""
+        if not self._jobs:
+            return
+        for job in self._jobs:
+            job.reset()
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self._jobs) - 1, len(HEADERS) - 1))
+
+    def count_status(self, *statuses):
+        return sum(1 for job in self._jobs if job.status in statuses)
@@ -14,22 +14,30 @@ from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QLa
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QColor, QPen, QIcon
 from PyQt5.QtCore import Qt, QSize, QUrl, QTimer
 
-# 导入 vlc (如果未安装或找不到会报错，添加错误处理)
-try:
-    import vlc
-    VLC_AVAILABLE = True
-except ImportError:
-    vlc = None
-    VLC_AVAILABLE = False
-    logging.error("DEPENDENCY ERROR: python-vlc library not found. Please install it (`pip install python-vlc`).")
-except Exception as e: # 捕捉其他可能的导入错误 (例如找不到libvlc)
-    vlc = None
-    VLC_AVAILABLE = False
-    logging.error(f"Error importing vlc module: {e}. VLC features disabled.")
+# vlc 在第一次打开对比预览时才导入 (load_vlc)，避免拖慢启动
+vlc = None
+VLC_AVAILABLE = None # None = 尚未尝试导入
+
+def load_vlc():
+    """Imports python-vlc on first call; returns True if it is usable."""
+    global vlc, VLC_AVAILABLE
+    if VLC_AVAILABLE is None:
+        try:
+            import vlc as vlc_module
+            vlc = vlc_module
+            VLC_AVAILABLE = True
+        except ImportError:
+            VLC_AVAILABLE = False
+            logging.error("DEPENDENCY ERROR: python-vlc library not found. Please install it (`pip install python-vlc`).")
+        except Exception as e: # 捕捉其他可能的导入错误 (例如找不到libvlc)
+            VLC_AVAILABLE = False
+            logging.error(f"Error importing vlc module: {e}. VLC features disabled.")
+    return VLC_AVAILABLE
 # ---
 
 from utils.settings import Settings # Absolute import
 from utils.constants import DEFAULT_FRAME_FOR_PREVIEW # Absolute import
+from core.scanner import parse_extensions
 
 # 帮助函数：用于查找打包后的资源路径 (也需要放在 main_window.py 或 helpers.py 中以便共用)
 def resource_path(relative_path):
@@ -112,6 +120,34 @@ class SettingsDialog(QDialog):
         flow_layout.addWidget(self.flow_blur_spin, 1, 1)
         layout.addWidget(flow_group)
 
+        # Batch processing
+        batch_group = QGroupBox("批量处理")
+        batch_layout = QGridLayout(batch_group)
+        self.batch_workers_spin = QSpinBox()
+        self.batch_workers_spin.setRange(1, max(1, os.cpu_count() or 1))
+        self.batch_workers_spin.setValue(settings.get("batch_workers"))
+        self.batch_workers_spin.setToolTip("同时处理的文件数。大于 1 时按预计耗时从长到短调度，避免最后只剩一个长视频在处理。")
+        batch_layout.addWidget(QLabel("并行文件数:"), 0, 0)
+        batch_layout.addWidget(self.batch_workers_spin, 0, 1)
+        self.video_extensions_edit = QLineEdit(settings.get("video_extensions"))
+        self.video_extensions_edit.setToolTip("添加文件或扫描文件夹时接受的扩展名，用空格或逗号分隔，例如: .mp4 .mkv .webm")
+        batch_layout.addWidget(QLabel("视频扩展名:"), 1, 0)
+        batch_layout.addWidget(self.video_extensions_edit, 1, 1)
+        self.scan_exclude_outputs_check = QCheckBox("扫描文件夹时跳过已生成的输出文件 (processed_*, *_fd 等)")
+        self.scan_exclude_outputs_check.setChecked(settings.get("scan_exclude_outputs"))
+        batch_layout.addWidget(self.scan_exclude_outputs_check, 2, 0, 1, 2)
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setRange(0, 1024 * 1024)
+        self.memory_budget_spin.setSingleStep(512)
+        self.memory_budget_spin.setSuffix(" MB")
+        self.memory_budget_spin.setSpecialValueText("自动")
+        self.memory_budget_spin.setValue(settings.get("memory_budget_mb"))
+        self.memory_budget_spin.setToolTip("倒放 MP4 需要保存所有保留帧直到分析结束。超出预算时依次改用: PNG 压缩保存在内存、"
+                                           "写入临时文件、分析后重新解码保留帧。自动 = 当前可用内存的一半; 并行处理时由各文件平分。")
+        batch_layout.addWidget(QLabel("倒放内存预算:"), 3, 0)
+        batch_layout.addWidget(self.memory_budget_spin, 3, 1)
+        layout.addWidget(batch_group)
+
         # General setting
         self.reverse_video_check = QCheckBox("默认倒放视频 (Reverse Video)")
         self.reverse_video_check.setChecked(settings.get("reverse_video"))
@@ -136,14 +172,19 @@ class SettingsDialog(QDialog):
                  else: value = min_val
              return max(min_val, min(max_val, value))
 
-        self.settings.set("f_diff_threshold", self.f_diff_threshold_spin.value())
-        self.settings.set("f_diff_min_area", self.f_diff_min_area_spin.value())
-        self.settings.set("f_diff_blur_size", make_odd_and_clamp(self.f_diff_blur_spin.value()))
-        self.settings.set("ssim_threshold", self.ssim_thresh_spin.value())
-        self.settings.set("ssim_blur_size", make_odd_and_clamp(self.ssim_blur_spin.value()))
-        self.settings.set("flow_threshold", self.flow_thresh_spin.value())
-        self.settings.set("flow_blur_size", make_odd_and_clamp(self.flow_blur_spin.value()))
-        self.settings.set("reverse_video", self.reverse_video_check.isChecked())
+        with self.settings.batch(): # One transaction, one file write
+            self.settings.set("f_diff_threshold", self.f_diff_threshold_spin.value())
+            self.settings.set("f_diff_min_area", self.f_diff_min_area_spin.value())
+            self.settings.set("f_diff_blur_size", make_odd_and_clamp(self.f_diff_blur_spin.value()))
+            self.settings.set("ssim_threshold", self.ssim_thresh_spin.value())
+            self.settings.set("ssim_blur_size", make_odd_and_clamp(self.ssim_blur_spin.value()))
+            self.settings.set("flow_threshold", self.flow_thresh_spin.value())
+            self.settings.set("flow_blur_size", make_odd_and_clamp(self.flow_blur_spin.value()))
+            self.settings.set("reverse_video", self.reverse_video_check.isChecked())
+            self.settings.set("batch_workers", self.batch_workers_spin.value())
+            self.settings.set("memory_budget_mb", self.memory_budget_spin.value())
+            self.settings.set("video_extensions", " ".join(parse_extensions(self.video_extensions_edit.text())))
+            self.settings.set("scan_exclude_outputs", self.scan_exclude_outputs_check.isChecked())
         logging.info("Default settings updated.")
         super().accept()
 
@@ -241,7 +282,7 @@ class PreviewContrastDialog(QDialog):
         self._error_occurred = False
         self._media_loaded = False
 
-        if not VLC_AVAILABLE:
+        if not load_vlc():
              self._error_occurred = True
              QMessageBox.critical(self, "错误", "缺少 'python-vlc' 库。\n无法使用 VLC 预览功能。\n请安装： pip install python-vlc")
              QTimer.singleShot(0, self.reject); return
@@ -16,26 +16,42 @@ except ImportError:
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
                              QFileDialog, QSlider, QCheckBox, QGroupBox, QGridLayout,
                              QMessageBox, QDialog, QTextBrowser, QComboBox,
-                             QLineEdit, QListWidget, QAbstractItemView, QToolTip,
+                             QLineEdit, QTableView, QHeaderView, QAbstractItemView, QToolTip,
                              QApplication, QStyle, QSizePolicy, QDoubleSpinBox,
-                             QFrame, QSpinBox) # 确保 QSpinBox 在这里
+                             QFrame, QSpinBox, QMenu) # 确保 QSpinBox 在这里
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QRect, QTimer, QSize
-from PyQt5.QtGui import QFont, QColor, QPainter, QIcon
+from PyQt5.QtGui import QFont, QPainter, QIcon
 
 # Import refactored components
-from ui.widgets import AEStyleSlider, AnimatedProgressBar
+from ui.widgets import AEStyleSlider, AnimatedProgressBar, ScoreTimelineWidget
 # 不再需要从这里导入 PreviewContrastDialog
 from ui.dialogs import SettingsDialog, HelpDialog, PreviewDialog #, PreviewContrastDialog
 # 导入重写后的 PreviewContrastDialog (确保 dialogs.py 中定义了它)
-from ui.dialogs import PreviewContrastDialog as VLCPreviewDialog # 重命名导入以区分
+from ui.dialogs import PreviewContrastDialog as VLCPreviewDialog, load_vlc # 重命名导入以区分
 
 from core.video_processor import VideoProcessor
 from core.batch_processor import BatchProcessor
+from core.probe import probe_cache
+from core.probe_worker import VideoProber
+from core.scan_worker import DirectoryScanner
+from core.scanner import parse_extensions
+from core.sinks import sink_output_path
+from core.engine import variant_output_path
+from core.analyzer import FrameAnalyzer
+from ui.batch_model import (BatchTableModel, STATUS_PENDING, STATUS_INVALID, STATUS_RUNNING, STATUS_DONE,
+                            STATUS_SKIPPED, STATUS_ERROR, COL_PATH, COL_DURATION, COL_RESOLUTION, COL_FPS,
+                            COL_STATUS, COL_PROGRESS, COL_KEPT, COL_SPEED)
 from utils.settings import Settings
 from utils.watermark import watermark_protection
+from utils.helpers import format_duration, params_from_preset, preset_slug
 # Import constants including presets and algorithms
 from utils.constants import (APP_NAME, APP_AUTHOR, PRESETS,
-                            ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW)
+                            ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW,
+                            JOB_DB_FILENAME, SCORE_CACHE_DIRNAME, OUTPUT_FORMAT_LABELS, OUTPUT_FORMAT_MP4)
+
+# Parameter keys remembered in the settings file when processing starts
+PROCESSING_SETTING_KEYS = ('f_diff_threshold', 'f_diff_min_area', 'f_diff_blur_size',
+                           'ssim_threshold', 'ssim_blur_size', 'flow_threshold', 'flow_blur_size')
 
 # resource_path function remains the same
 def resource_path(relative_path):
@@ -56,6 +72,13 @@ class MainWindow(QWidget):
         self.output_path = None
         self.last_processed_output_path = None # Store path for contrast preview
         self.current_processor = None
+        # Background probing of batch files (frames / fps / resolution / codec), cached by path+size+mtime
+        self.prober = VideoProber(parent=self)
+        self.prober.probed.connect(self.on_videos_probed)
+        self.prober.scores_found.connect(self.on_cached_scores_found)
+        # Background folder scans (drag & drop of folders / "添加文件夹")
+        self.scanners = []
+        self.scan_found = 0
         self.initUI()
         self.load_settings_to_ui() # Load saved settings into UI elements
         self.update_parameter_visibility() # Initial UI state based on loaded algo
@@ -237,6 +260,45 @@ class MainWindow(QWidget):
         self.reverse_video_check.setToolTip("处理后是否将帧顺序倒放")
         param_layout.addWidget(self.reverse_video_check, 10, 2, 1, 3)
 
+        # Row 11: Output format (MP4 video or image sequence)
+        param_layout.addWidget(QLabel("输出格式 (Format):"), 11, 0)
+        self.output_format_combo = QComboBox()
+        for fmt, label in OUTPUT_FORMAT_LABELS.items():
+            self.output_format_combo.addItem(label, fmt)
+        self.output_format_combo.setToolTip("MP4 视频, 或将保留的帧逐张保存为图片序列\n(图片写入 <输出文件名>.frames 文件夹, 倒放时按文件名倒序编号)\n'仅保留帧列表' 不写入任何视频/图片, 只输出 <输出文件名>.json / .csv / .edl,\n可在 AE / PR 中基于原素材剪辑 (分析速度更快, 不产生大文件)")
+        self.set_output_format(self.settings.get("output_format"))
+        param_layout.addWidget(self.output_format_combo, 11, 1, 1, 2)
+
+        self.all_metrics_check = QCheckBox('全部算法评分 (All Metrics)')
+        self.all_metrics_check.setChecked(self.settings.get("all_metrics"))
+        self.all_metrics_check.setToolTip("一次解码同时计算帧差/SSIM/光流三种分数并缓存 (比单一算法慢)。\n"
+                                          "之后对同一视频切换算法或调整保留阈值时直接使用缓存, 无需重新分析。")
+        param_layout.addWidget(self.all_metrics_check, 11, 3, 1, 2)
+
+        # Row 12: A/B fan-out (extra outputs from the same decode)
+        param_layout.addWidget(QLabel("A/B 额外输出:"), 12, 0)
+        self.ab_button = QPushButton()
+        self.ab_button.setToolTip("选择额外输出的预设: 视频只解码一次, 每个预设各自判断并输出一个文件\n"
+                                  "(文件名加预设后缀, 例如 xxx_fd_high_action.mp4)")
+        self.ab_menu = QMenu(self.ab_button)
+        for preset_name in PRESETS:
+            action = self.ab_menu.addAction(preset_name)
+            action.setCheckable(True)
+            action.toggled.connect(self.update_ab_button)
+        self.ab_button.setMenu(self.ab_menu)
+        self.set_ab_presets(self.settings.get("ab_presets"))
+        param_layout.addWidget(self.ab_button, 12, 1, 1, 2)
+
+        param_layout.addWidget(QLabel("自适应步长:"), 12, 3)
+        self.adaptive_stride_spin = QSpinBox()
+        self.adaptive_stride_spin.setRange(1, 48)
+        self.adaptive_stride_spin.setSpecialValueText("关闭") # 1 = frame by frame
+        self.adaptive_stride_spin.setValue(self.settings.get("adaptive_stride"))
+        self.adaptive_stride_spin.setToolTip("先比较相距 k 帧的两帧: 几乎没有变化时直接丢弃中间的帧 (不解码为图像),\n"
+                                             "有变化的区间再逐步细分。适合大量长时间静止画面的素材, 可明显加快 SSIM / 光流分析。\n"
+                                             "区间内变化后又恢复原样的画面 (如眨眼) 可能被漏掉; 与 A/B 额外输出或全部算法评分同时使用时无效。")
+        param_layout.addWidget(self.adaptive_stride_spin, 12, 4)
+
 
         main_layout.addWidget(param_group)
 
@@ -246,19 +308,42 @@ class MainWindow(QWidget):
         batch_group.setObjectName("BatchProcessingGroup")
         # --- 修改结束 ---
         batch_layout = QVBoxLayout()
-        self.video_list_widget = QListWidget()
-        self.video_list_widget.setSelectionMode(QAbstractItemView.ExtendedSelection)
-        self.video_list_widget.setToolTip("要进行批量处理的视频文件列表")
-        # Allow dropping files onto the list widget
-        self.video_list_widget.setAcceptDrops(True)
-        self.video_list_widget.dragEnterEvent = self.list_dragEnterEvent
-        self.video_list_widget.dragMoveEvent = self.list_dragMoveEvent
-        self.video_list_widget.dropEvent = self.list_dropEvent
-        batch_layout.addWidget(self.video_list_widget)
+        # Model/view list: job state lives in BatchJob objects, not in item text
+        self.batch_model = BatchTableModel(self)
+        self.batch_view = QTableView()
+        self.batch_view.setModel(self.batch_model)
+        self.batch_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.batch_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.batch_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.batch_view.setWordWrap(False)
+        self.batch_view.verticalHeader().setVisible(False)
+        self.batch_view.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 6) # Fixed row height: no per-row sizing
+        header = self.batch_view.horizontalHeader()
+        header.setSectionResizeMode(COL_PATH, QHeaderView.Stretch)
+        for column in (COL_DURATION, COL_RESOLUTION, COL_FPS, COL_STATUS, COL_PROGRESS, COL_KEPT, COL_SPEED):
+            header.setSectionResizeMode(column, QHeaderView.Interactive)
+        header.resizeSection(COL_DURATION, 65)
+        header.resizeSection(COL_RESOLUTION, 80)
+        header.resizeSection(COL_FPS, 50)
+        header.resizeSection(COL_STATUS, 190)
+        header.resizeSection(COL_PROGRESS, 55)
+        header.resizeSection(COL_KEPT, 60)
+        header.resizeSection(COL_SPEED, 70)
+        self.batch_view.setToolTip("要进行批量处理的视频文件列表")
+        # Allow dropping files onto the list
+        self.batch_view.setAcceptDrops(True)
+        self.batch_view.dragEnterEvent = self.list_dragEnterEvent
+        self.batch_view.dragMoveEvent = self.list_dragMoveEvent
+        self.batch_view.dropEvent = self.list_dropEvent
+        batch_layout.addWidget(self.batch_view)
         batch_buttons_layout = QHBoxLayout()
         add_videos_button = QPushButton("添加视频 (Add)")
         add_videos_button.clicked.connect(self.add_videos)
         batch_buttons_layout.addWidget(add_videos_button)
+        add_folder_button = QPushButton("添加文件夹 (Add Folder)")
+        add_folder_button.setToolTip("递归扫描文件夹中的所有视频 (在后台进行)")
+        add_folder_button.clicked.connect(self.add_folder)
+        batch_buttons_layout.addWidget(add_folder_button)
         remove_videos_button = QPushButton("移除选中 (Remove Selected)")
         remove_videos_button.clicked.connect(self.remove_videos)
         batch_buttons_layout.addWidget(remove_videos_button)
@@ -319,6 +404,10 @@ class MainWindow(QWidget):
         self.progress_bar.setAlignment(Qt.AlignCenter)
         process_layout.addWidget(self.progress_bar)
 
+        # Per-frame score heatmap, filled progressively while a video is analysed
+        self.score_timeline = ScoreTimelineWidget(self)
+        process_layout.addWidget(self.score_timeline)
+
         self.status_label = QLabel('状态: 空闲') # Text shortened
         self.status_label.setWordWrap(True)
         process_layout.addWidget(self.status_label)
@@ -331,10 +420,11 @@ class MainWindow(QWidget):
         main_layout.addWidget(process_group)
 
         # --- Watermark ---
-        self.watermark_label = QLabel(watermark_protection.get_watermark(), self)
+        self.watermark_label = QLabel('', self)
         self.watermark_label.setStyleSheet("color: rgba(0, 0, 0, 100); font-size: 8pt;")
         self.watermark_label.setAlignment(Qt.AlignRight | Qt.AlignBottom)
-        # Positioned using resizeEvent
+        # Positioned using resizeEvent; the text is decrypted after the first show (loads cryptography lazily)
+        QTimer.singleShot(0, self.show_watermark)
 
         self.setLayout(main_layout)
         self.update_button_states()
@@ -343,13 +433,14 @@ class MainWindow(QWidget):
     # --- Drag and Drop for List Widget ---
     def list_dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
-            # Check if urls are video files (basic check by extension)
+            # Check if urls are folders or video files (basic check by extension)
             valid_urls = False
+            extensions = self.video_extensions()
             for url in event.mimeData().urls():
                 if url.isLocalFile():
                     path = url.toLocalFile()
                     _, ext = os.path.splitext(path)
-                    if ext.lower() in ['.mp4', '.avi', '.mov', '.mkv']:
+                    if os.path.isdir(path) or ext.lower() in extensions:
                          valid_urls = True
                          break
             if valid_urls:
@@ -365,20 +456,27 @@ class MainWindow(QWidget):
 
     def list_dropEvent(self, event):
         if event.mimeData().hasUrls():
-            files_added = []
-            current_items = [self.video_list_widget.item(i).text().split(" (")[0] for i in range(self.video_list_widget.count())]
+            if self.is_processing():
+                event.ignore()
+                return
+            paths, folders = [], []
+            extensions = self.video_extensions()
             for url in event.mimeData().urls():
                 if url.isLocalFile():
                     path = url.toLocalFile()
                     _, ext = os.path.splitext(path)
-                    if ext.lower() in ['.mp4', '.avi', '.mov', '.mkv']:
-                         if path not in current_items and path not in files_added:
-                            files_added.append(path)
+                    if os.path.isdir(path):
+                        folders.append(path)
+                    elif ext.lower() in extensions:
+                         paths.append(path)
 
+            files_added = self.batch_model.add_paths(paths) # Duplicates are dropped by the model's path index
             if files_added:
-                self.video_list_widget.addItems(files_added)
+                self.prober.probe(files_added)
                 logging.info(f"Added {len(files_added)} videos via drag & drop.")
                 self.update_button_states()
+            if folders:
+                self.start_folder_scan(folders)
             event.acceptProposedAction()
         else:
             event.ignore()
@@ -431,6 +529,7 @@ class MainWindow(QWidget):
 
          # Algorithm selection changes visibility
          self.algo_combo.currentIndexChanged.connect(self.update_parameter_visibility)
+         self.algo_combo.currentIndexChanged.connect(self.show_cached_scores)
 
          # Presets
          self.preset_combo.activated[str].connect(self.apply_preset)
@@ -660,6 +759,8 @@ class MainWindow(QWidget):
             self.update_button_states()
             self.last_processed_output_path = None # Reset processed path on new input
             self.contrast_preview_button.setEnabled(False)
+            self.score_timeline.reset(0, 1.0)
+            self.show_cached_scores()
 
     def update_output_state(self):
         """Enables/disables manual output selection based on combo box."""
@@ -718,41 +819,91 @@ class MainWindow(QWidget):
     def add_videos(self):
         """Adds videos to the batch processing list."""
         last_dir = self.settings.get("last_input_dir") or os.path.expanduser("~")
-        files, _ = QFileDialog.getOpenFileNames(self, "选择要批量处理的视频 (Select Videos for Batch)", last_dir, "视频文件 (*.mp4 *.avi *.mov *.mkv);;所有文件 (*.*)")
+        name_filter = " ".join(f"*{ext}" for ext in self.video_extensions())
+        files, _ = QFileDialog.getOpenFileNames(self, "选择要批量处理的视频 (Select Videos for Batch)", last_dir, f"视频文件 ({name_filter});;所有文件 (*.*)")
         if files:
-            current_items = [self.video_list_widget.item(i).text().split(" (")[0] for i in range(self.video_list_widget.count())]
-            added_count = 0
-            files_to_add = []
-            for f in files:
-                 if f not in current_items and f not in files_to_add:
-                     files_to_add.append(f)
-                     added_count += 1
+            files_to_add = self.batch_model.add_paths(files) # Duplicates are dropped by the model's path index
+            added_count = len(files_to_add)
             if files_to_add:
-                self.video_list_widget.addItems(files_to_add)
+                self.prober.probe(files_to_add)
             logging.info(f"Added {added_count} videos to batch list.")
             if added_count > 0:
                  self.settings.set("last_input_dir", os.path.dirname(files[0]))
             self.update_button_states()
 
+    def is_processing(self):
+        return self.current_processor is not None and self.current_processor.isRunning()
+
+    def video_extensions(self):
+        """Extensions accepted for the batch list (settings: video_extensions)."""
+        return parse_extensions(self.settings.get("video_extensions"))
+
+    def add_folder(self):
+        """Adds every video below a chosen folder (scanned in the background)."""
+        last_dir = self.settings.get("last_input_dir") or os.path.expanduser("~")
+        folder = QFileDialog.getExistingDirectory(self, "选择要扫描的文件夹 (Select Folder)", last_dir)
+        if folder:
+            self.settings.set("last_input_dir", folder)
+            self.start_folder_scan([folder])
+
+    def start_folder_scan(self, folders):
+        """Starts a DirectoryScanner; matches are streamed into the list in chunks."""
+        scanner = DirectoryScanner(folders, self.video_extensions(), self.settings.get("scan_exclude_outputs"), parent=self)
+        scanner.files_found.connect(self.on_scan_chunk)
+        scanner.scan_finished.connect(lambda total, cancelled, s=scanner: self.on_scan_finished(s, total, cancelled))
+        self.scanners.append(scanner)
+        self.scan_found = 0 if len(self.scanners) == 1 else self.scan_found
+        logging.info(f"Scanning folders: {folders}")
+        self.status_label.setText(f"状态: 正在扫描文件夹 {', '.join(os.path.basename(f) or f for f in folders)}...")
+        scanner.start()
+
+    def on_scan_chunk(self, paths):
+        """Adds one chunk of scanned files (a single model insert) and queues them for probing."""
+        files_added = self.batch_model.add_paths(paths)
+        self.scan_found += len(files_added)
+        if files_added:
+            self.prober.probe(files_added)
+        if not self.is_processing():
+            self.update_button_states()
+            self.status_label.setText(f"状态: 正在扫描文件夹... 已添加 {self.scan_found} 个视频")
+
+    def on_scan_finished(self, scanner, total, cancelled):
+        if scanner in self.scanners:
+            self.scanners.remove(scanner)
+        scanner.deleteLater()
+        logging.info(f"Folder scan finished: {total} files found, {self.scan_found} added, cancelled={cancelled}")
+        if not self.scanners and not self.is_processing():
+            self.status_label.setText(f"状态: 文件夹扫描完成，添加了 {self.scan_found} 个视频")
+
+    def on_videos_probed(self, results):
+        """Stores background probe results on the matching batch jobs (invalid files are flagged)."""
+        updates = {}
+        for path, probe in results:
+            job = self.batch_model.job(path)
+            if job is None:
+                continue # Removed from the list meanwhile
+            fields = {'probe': probe}
+            if job.status in (STATUS_PENDING, STATUS_INVALID):
+                fields['status'] = STATUS_PENDING if probe is not None else STATUS_INVALID
+            updates[path] = fields
+        self.batch_model.update_many(updates)
+
     def remove_videos(self):
         """Removes selected videos from the batch list."""
-        selected_items = self.video_list_widget.selectedItems()
-        if not selected_items: return
-        # Iterate backwards when removing multiple items
-        for item in reversed(selected_items):
-            self.video_list_widget.takeItem(self.video_list_widget.row(item))
-        logging.info(f"Removed {len(selected_items)} videos from batch list.")
+        rows = [index.row() for index in self.batch_view.selectionModel().selectedRows()]
+        if not rows: return
+        self.batch_model.remove_rows(rows)
+        logging.info(f"Removed {len(rows)} videos from batch list.")
         self.update_button_states()
 
     def clear_videos(self):
         """Clears the entire batch list."""
-        if self.video_list_widget.count() > 0:
-            self.video_list_widget.clear()
+        if len(self.batch_model) > 0:
+            self.batch_model.clear()
             logging.info("Cleared batch list.")
             self.update_button_states()
 
 
-    # --- Settings ---
     def open_settings(self):
         """Opens the settings dialog."""
         dialog = SettingsDialog(self.settings, self)
@@ -798,6 +949,10 @@ class MainWindow(QWidget):
 
         # General
         self.reverse_video_check.setChecked(self.settings.get("reverse_video"))
+        self.set_output_format(self.settings.get("output_format"))
+        self.all_metrics_check.setChecked(self.settings.get("all_metrics"))
+        self.set_ab_presets(self.settings.get("ab_presets"))
+        self.adaptive_stride_spin.setValue(self.settings.get("adaptive_stride"))
 
         logging.debug("Loaded settings into UI controls.")
         # Visibility update is handled separately by update_parameter_visibility()
@@ -838,13 +993,8 @@ class MainWindow(QWidget):
               QMessageBox.warning(self, "无处理后视频", "找不到用于对比的处理后视频文件。\n请先成功处理一个视频。")
               return
 
-         # --- 检查 VLC 库是否真的在运行时可用 ---
-         # 注意：VLC_AVAILABLE 需要在 ui.dialogs 中定义并在此处可用
-         # 如果没有把它设为全局可访问，可以在这里再次尝试导入 vlc
-         try:
-             import vlc # 再次检查导入
-             if vlc is None: raise ImportError # 如果之前导入失败
-         except ImportError:
+         # --- 检查 VLC 库是否真的在运行时可用 (首次调用时才导入 vlc) ---
+         if not load_vlc():
              QMessageBox.critical(self, "错误", "缺少 'python-vlc' 库或初始化失败。\n无法使用 VLC 预览功能。\n请安装： pip install python-vlc")
              return
          # ---
@@ -863,6 +1013,68 @@ class MainWindow(QWidget):
 
 
     # --- Processing ---
+    def save_processing_settings(self, selected_algorithm, current_params):
+        """Stores the algorithm and its parameters as the defaults for the next launch."""
+        values = {key: current_params[key] for key in PROCESSING_SETTING_KEYS}
+        values['selected_algorithm'] = selected_algorithm
+        values['output_format'] = self.output_format()
+        values['all_metrics'] = self.all_metrics_check.isChecked()
+        values['ab_presets'] = self.ab_presets()
+        values['adaptive_stride'] = self.adaptive_stride_spin.value()
+        self.settings.update(values)
+
+    def ab_presets(self):
+        return [action.text() for action in self.ab_menu.actions() if action.isChecked()]
+
+    def set_ab_presets(self, preset_names):
+        for action in self.ab_menu.actions():
+            action.setChecked(action.text() in (preset_names or ()))
+        self.update_ab_button()
+
+    def update_ab_button(self):
+        count = len(self.ab_presets())
+        self.ab_button.setText(f"已选 {count} 个预设" if count else "无 (None)")
+
+    def extra_output_configs(self, current_params, output_path=None):
+        """Fan-out configurations of the checked A/B presets: (algorithm, params, output_path or suffix)."""
+        configs = []
+        for preset_name in self.ab_presets():
+            algorithm, params = params_from_preset(PRESETS[preset_name], base_params=current_params)
+            suffix = preset_slug(preset_name)
+            configs.append((algorithm, params, variant_output_path(output_path, suffix) if output_path else suffix))
+        return configs
+
+    def score_cache_dir(self):
+        return os.path.join(self.settings.app_dir, SCORE_CACHE_DIRNAME)
+
+    def show_cached_scores(self):
+        """Looks up the cached score track of the input for the selected algorithm in the background (no analysis);
+        on_cached_scores_found() puts it on the timeline."""
+        if self.is_processing() or not self.input_path:
+            return
+        analyzer = FrameAnalyzer(self.algo_combo.currentText(), self.get_current_parameters())
+        self.prober.lookup_scores(self.input_path, self.score_cache_dir(), analyzer.metric_key())
+
+    def on_cached_scores_found(self, path, metric_key, probe, scores):
+        """Shows a cached score track, unless the input, algorithm or score parameters changed meanwhile."""
+        if self.is_processing() or path != self.input_path:
+            return
+        algorithm = self.algo_combo.currentText()
+        analyzer = FrameAnalyzer(algorithm, self.get_current_parameters())
+        if analyzer.metric_key() != metric_key:
+            return
+        keep_flags = analyzer.decide(scores, probe.frame_count)
+        self.score_timeline.reset(probe.frame_count, analyzer.decision_threshold())
+        self.score_timeline.add_scores(0, scores, keep_flags[:len(scores)])
+        self.status_label.setText(f"状态: 已载入缓存的 {algorithm} 分数, 当前参数将保留 {int(keep_flags.sum())} 帧 (无需重新分析)")
+
+    def output_format(self):
+        return self.output_format_combo.currentData()
+
+    def set_output_format(self, output_format):
+        index = self.output_format_combo.findData(output_format)
+        self.output_format_combo.setCurrentIndex(max(index, 0))
+
     def get_current_parameters(self):
          """Collects current parameter values from the UI based on selected algorithm."""
          params = {
@@ -885,7 +1097,7 @@ class MainWindow(QWidget):
         single_ready = bool(self.input_path and self.output_path and os.path.exists(self.input_path))
         self.process_button.setEnabled(single_ready and not processing)
 
-        batch_ready = self.video_list_widget.count() > 0
+        batch_ready = len(self.batch_model) > 0
         self.batch_process_button.setEnabled(batch_ready and not processing)
 
         # Contrast preview enabled only if single input & processed output exist and not processing
@@ -928,7 +1140,7 @@ class MainWindow(QWidget):
         batch_group = self.findChild(QGroupBox, "BatchProcessingGroup") # 使用 objectName
         if batch_group:
              for button in batch_group.findChildren(QPushButton): button.setEnabled(not processing)
-             self.video_list_widget.setEnabled(not processing)
+             # The list stays enabled (scrolling, tooltips) while processing; drops are refused in list_dropEvent
         else:
              logging.warning("Could not find BatchProcessingGroup to disable controls.")
         # --- 修改结束 ---
@@ -941,6 +1153,7 @@ class MainWindow(QWidget):
         self.tw_speed_label.setText("")
         self.progress_bar.setValue(0)
         self.progress_bar.setFormat("处理中... %p%")
+        self.score_timeline.reset(0, 1.0)
         self.last_processed_output_path = None # Reset on new process start
         self.contrast_preview_button.setEnabled(False)
 
@@ -958,8 +1171,9 @@ class MainWindow(QWidget):
              QMessageBox.critical(self, "文件未找到", f"输入文件不存在:\n{self.input_path}")
              return
 
-        if os.path.exists(self.output_path):
-            reply = QMessageBox.question(self, '确认覆盖', f"输出文件已存在:\n{os.path.basename(self.output_path)}\n\n是否覆盖?",
+        target_path = sink_output_path(self.output_path, self.output_format())
+        if os.path.exists(target_path):
+            reply = QMessageBox.question(self, '确认覆盖', f"输出文件已存在:\n{os.path.basename(target_path)}\n\n是否覆盖?",
                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.No:
                 self.status_label.setText("状态: 操作取消")
@@ -971,25 +1185,27 @@ class MainWindow(QWidget):
 
             selected_algorithm = self.algo_combo.currentText()
             current_params = self.get_current_parameters()
-            # Save chosen algorithm and params to settings for next launch?
-            self.settings.set('selected_algorithm', selected_algorithm)
-            self.settings.set('f_diff_threshold', current_params['f_diff_threshold'])
-            self.settings.set('f_diff_min_area', current_params['f_diff_min_area'])
-            self.settings.set('f_diff_blur_size', current_params['f_diff_blur_size'])
-            self.settings.set('ssim_threshold', current_params['ssim_threshold'])
-            self.settings.set('ssim_blur_size', current_params['ssim_blur_size'])
-            self.settings.set('flow_threshold', current_params['flow_threshold'])
-            self.settings.set('flow_blur_size', current_params['flow_blur_size'])
+            # Save chosen algorithm and params to settings for next launch (one coalesced write)
+            self.save_processing_settings(selected_algorithm, current_params)
 
             self.current_processor = VideoProcessor(
                 self.input_path,
                 self.output_path,
                 selected_algorithm,
                 current_params,
-                self.reverse_video_check.isChecked()
+                self.reverse_video_check.isChecked(),
+                output_format=self.output_format(),
+                score_cache_dir=self.score_cache_dir(),
+                all_metrics=self.all_metrics_check.isChecked(),
+                extra_outputs=self.extra_output_configs(current_params, self.output_path),
+                temporal_stride=self.adaptive_stride_spin.value(),
+                memory_budget_mb=self.settings.get("memory_budget_mb")
             )
             # Connect signals
             self.current_processor.progress.connect(self.update_progress)
+            self.current_processor.analysis_started.connect(self.score_timeline.reset)
+            self.current_processor.frame_scores.connect(self.score_timeline.add_scores)
+            self.current_processor.write_progress.connect(self.update_write_progress)
             self.current_processor.finished.connect(self.on_single_process_finished)
             self.current_processor.error.connect(self.on_process_error)
 
@@ -1011,23 +1227,38 @@ class MainWindow(QWidget):
 
     def process_batch_videos(self):
         """Starts processing videos in the batch list."""
-        if self.video_list_widget.count() == 0:
+        if len(self.batch_model) == 0:
             QMessageBox.warning(self, "列表为空", "请先向批量处理列表中添加视频。")
             return
 
+        video_paths = self.batch_model.paths()
+        # Files already known to be invalid (background probe) are reported now, not halfway through the batch
+        invalid_paths = [path for path in video_paths if probe_cache.get(path) == (True, None)]
+        if invalid_paths:
+            names = "\n".join(os.path.basename(path) for path in invalid_paths[:10])
+            more = f"\n... 等共 {len(invalid_paths)} 个" if len(invalid_paths) > 10 else ""
+            reply = QMessageBox.question(self, "无效文件",
+                                         f"以下文件无法读取视频信息:\n{names}{more}\n\n是否跳过这些文件并继续处理其余文件？",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+            if reply != QMessageBox.Yes:
+                self.status_label.setText("状态: 批量处理取消")
+                return
+            for path in invalid_paths:
+                logging.warning(f"Batch: skipping invalid file {path}")
+            invalid_set = set(invalid_paths)
+            video_paths = [path for path in video_paths if path not in invalid_set]
+            if not video_paths:
+                self.status_label.setText("状态: 没有可处理的有效文件")
+                return
+
         output_dir = QFileDialog.getExistingDirectory(self, "选择批量输出目录", self.settings.get("last_output_dir") or os.path.expanduser("~"))
         if not output_dir:
             self.status_label.setText("状态: 批量处理取消")
             return
         self.settings.set("last_output_dir", output_dir)
 
-        video_paths = [self.video_list_widget.item(i).text().split(" (")[0] for i in range(self.video_list_widget.count())]
-        # Reset batch list item states
-        for i in range(self.video_list_widget.count()):
-            item = self.video_list_widget.item(i)
-            item.setText(video_paths[i]) # Restore original text
-            item.setForeground(QColor("black"))
-            item.setToolTip("")
+        # Reset batch list job states (invalid files keep their flag)
+        self.batch_model.reset_jobs()
 
 
         try:
@@ -1037,15 +1268,7 @@ class MainWindow(QWidget):
             selected_algorithm = self.algo_combo.currentText()
             current_params = self.get_current_parameters()
             # Save chosen algorithm and params to settings
-            self.settings.set('selected_algorithm', selected_algorithm)
-            # ... (save other params as in single process) ...
-            self.settings.set('f_diff_threshold', current_params['f_diff_threshold'])
-            self.settings.set('f_diff_min_area', current_params['f_diff_min_area'])
-            self.settings.set('f_diff_blur_size', current_params['f_diff_blur_size'])
-            self.settings.set('ssim_threshold', current_params['ssim_threshold'])
-            self.settings.set('ssim_blur_size', current_params['ssim_blur_size'])
-            self.settings.set('flow_threshold', current_params['flow_threshold'])
-            self.settings.set('flow_blur_size', current_params['flow_blur_size'])
+            self.save_processing_settings(selected_algorithm, current_params)
 
 
             self.current_processor = BatchProcessor(
@@ -1053,11 +1276,23 @@ class MainWindow(QWidget):
                 output_dir,
                 selected_algorithm,
                 current_params,
-                self.reverse_video_check.isChecked()
+                self.reverse_video_check.isChecked(),
+                job_db_path=os.path.join(self.settings.app_dir, JOB_DB_FILENAME),
+                max_workers=self.settings.get("batch_workers"),
+                output_format=self.output_format(),
+                score_cache_dir=self.score_cache_dir(),
+                all_metrics=self.all_metrics_check.isChecked(),
+                extra_outputs=self.extra_output_configs(current_params),
+                temporal_stride=self.adaptive_stride_spin.value(),
+                memory_budget_mb=self.settings.get("memory_budget_mb")
             )
             # Connect batch-specific signals
             self.current_processor.overall_progress.connect(self.update_overall_progress)
             self.current_processor.current_file_progress.connect(self.update_current_file_progress)
+            self.current_processor.current_file_analysis_started.connect(self.score_timeline.reset)
+            self.current_processor.current_file_scores.connect(self.score_timeline.add_scores)
+            self.current_processor.current_file_write_progress.connect(self.update_current_file_write_progress)
+            self.current_processor.batch_planned.connect(self.on_batch_planned)
             self.current_processor.file_started.connect(self.on_batch_file_started)
             self.current_processor.file_finished.connect(self.on_batch_file_finished)
             self.current_processor.file_error.connect(self.on_batch_file_error)
@@ -1092,14 +1327,26 @@ class MainWindow(QWidget):
 
 
     # --- Signal Handlers ---
-    def update_progress(self, value, filename, current_frame, total_frames):
-        """Updates progress bar for single video processing, showing frame count."""
+    def update_progress(self, value, filename, current_frame, total_frames, stats):
+        """Updates progress bar for single video processing, showing frame count, throughput and ETA."""
         if isinstance(self.current_processor, VideoProcessor):
              self.progress_bar.setValue(value)
              self.progress_bar.setFormat(f"{filename} ({current_frame}/{total_frames}) - %p%")
+             self.status_label.setText(f"状态: 处理中... 解码 {stats.get('decode_fps', 0):.0f} fps | "
+                                       f"分析 {stats.get('analysis_fps', 0):.0f} fps | "
+                                       f"重复帧 {stats.get('duplicate_rate', 0):.0%} | "
+                                       f"剩余时间 {format_duration(stats.get('eta', -1))}")
+
+    def update_write_progress(self, output_path, written, total):
+        """Shows the reverse-MP4 write phase that follows the analysis (frames encoded / total)."""
+        if isinstance(self.current_processor, VideoProcessor):
+            percent = int(written * 100 / total) if total > 0 else 100
+            self.progress_bar.setValue(percent)
+            self.progress_bar.setFormat(f"写入 {os.path.basename(output_path)} ({written}/{total}) - %p%")
+            self.status_label.setText(f"状态: 正在倒序写入输出视频... {written}/{total} 帧")
 
     # Add output_path parameter to handler
-    def on_single_process_finished(self, message, tw_speed, kept_frames, output_path):
+    def on_single_process_finished(self, message, tw_speed, kept_frames, output_path, report):
         """Handles successful completion of single video processing."""
         if isinstance(self.current_processor, VideoProcessor):
             logging.info(f"Single process finished: {message}. Output: {output_path}")
@@ -1111,11 +1358,19 @@ class MainWindow(QWidget):
             self.status_label.setText(f"状态: <font color='{result_color}'>{message}</font> 保留了 <font color='{kept_frames_color}'>{kept_frames}</font> 帧。")
             self.tw_speed_label.setText(f"建议 Twixtor 速度: <font color='{speed_color}'><b>{tw_speed:.2f}%</b></font> (恢复原时长)")
 
-            # Store the path for contrast preview and enable the button
-            self.last_processed_output_path = output_path
+            # Store the path for contrast preview and enable the button (only MP4 output can be played)
+            self.last_processed_output_path = output_path if report.get('output_format') == OUTPUT_FORMAT_MP4 else None
             self.update_button_states() # Re-evaluates button states
 
-            QMessageBox.information(self, "处理完成", f"{message}\n保留了 {kept_frames} 帧。\n输出文件: {output_path}\n\n建议 Twixtor 速度: {tw_speed:.2f}%")
+            timing_text = ""
+            if report.get('bottleneck_stage'):
+                timing_text = f"\n\n耗时 {report.get('wall_time_s', 0):.1f} 秒, 瓶颈阶段: {report['bottleneck_stage']}\n运行报告: {report.get('report_path', '')}"
+            if report.get('resumed_from_frame'):
+                timing_text += f"\n(从检查点的第 {report['resumed_from_frame']} 帧继续处理)"
+            for extra in report.get('extra_outputs', []):
+                timing_text += (f"\n\nA/B 输出: {extra['output_path']}\n保留了 {extra['kept_frames']} 帧, "
+                                f"建议 Twixtor 速度: {extra['tw_speed']:.2f}%")
+            QMessageBox.information(self, "处理完成", f"{message}\n保留了 {kept_frames} 帧。\n输出文件: {output_path}\n\n建议 Twixtor 速度: {tw_speed:.2f}%{timing_text}")
 
     # (on_process_error remains the same)
     def on_process_error(self, error_message):
@@ -1141,54 +1396,58 @@ class MainWindow(QWidget):
             self.progress_bar.setValue(value)
             self.progress_bar.setFormat(f"总进度: %p%")
 
-    def update_current_file_progress(self, value, filename, current_frame, total_frames):
-        """Updates status label for the current file's progress in batch."""
+    def update_current_file_progress(self, value, video_path, current_frame, total_frames, stats):
+        """Updates the file's progress column and the status label, including aggregate throughput."""
+        if isinstance(self.current_processor, BatchProcessor):
+            self.batch_model.update(video_path, progress=value)
+            self.status_label.setText(f"状态: 正在处理 {os.path.basename(video_path)} ({current_frame}/{total_frames}) - {value}% | "
+                                      f"解码 {stats.get('decode_fps', 0):.0f} fps | 分析 {stats.get('analysis_fps', 0):.0f} fps | "
+                                      f"剩余 {format_duration(stats.get('eta', -1))} | "
+                                      f"批量总速度 {stats.get('batch_fps', 0):.0f} 帧/秒")
+
+    def update_current_file_write_progress(self, video_path, output_path, written, total):
+        """Status line for a file that finished its analysis and is writing reverse MP4 output."""
         if isinstance(self.current_processor, BatchProcessor):
-            self.status_label.setText(f"状态: 正在处理 {filename} ({current_frame}/{total_frames}) - {value}%")
+            self.status_label.setText(f"状态: 正在倒序写入 {os.path.basename(output_path)} ({written}/{total} 帧)")
+
+    def on_batch_planned(self, plan):
+        """Shows the dispatch order and expected finish time of every file in the list."""
+        if not isinstance(self.current_processor, BatchProcessor):
+            return
+        for planned in plan.jobs:
+            self.batch_model.update(planned.path, plan_order=planned.order, expected_finish=planned.finish_s,
+                                    probe=planned.probe)
+        self.status_label.setText(f"状态: 批量处理中 ({plan.workers} 个并行), 预计总耗时 {format_duration(plan.makespan)}")
 
-    def on_batch_file_started(self, filename):
-        """Highlights the file being processed in the list."""
+    def on_batch_file_started(self, video_path):
+        """Marks the file being processed in the list."""
         if isinstance(self.current_processor, BatchProcessor):
+            filename = os.path.basename(video_path)
             self.status_label.setText(f"状态: 开始处理 {filename}...")
             logging.info(f"Batch: Started processing {filename}")
-            for i in range(self.video_list_widget.count()):
-                item = self.video_list_widget.item(i)
-                item_text = item.text().split(" (")[0]
-                if os.path.basename(item_text) == filename:
-                     item.setForeground(QColor("blue"))
-                     self.video_list_widget.scrollToItem(item)
-                elif item.foreground().color() == QColor("blue"): # Reset previous blue
-                     item.setForeground(QColor("black"))
+            row = self.batch_model.update(video_path, status=STATUS_RUNNING, progress=0)
+            if row is not None and self.current_processor.max_workers == 1:
+                self.batch_view.scrollTo(self.batch_model.index(row, 0))
 
 
     # Add output_path parameter to handler
-    def on_batch_file_finished(self, filename, message, tw_speed, kept_frames, output_path):
-        """Handles successful completion of one file within a batch."""
+    def on_batch_file_finished(self, video_path, message, tw_speed, kept_frames, output_path, report):
+        """Handles successful completion (or skip) of one file within a batch."""
         if isinstance(self.current_processor, BatchProcessor):
+            filename = os.path.basename(video_path)
             logging.info(f"Batch: Finished {filename}. Kept {kept_frames} frames. TW Speed: {tw_speed:.2f}%. Output: {output_path}")
-            for i in range(self.video_list_widget.count()):
-                item = self.video_list_widget.item(i)
-                item_text = item.text().split(" (")[0]
-                if os.path.basename(item_text) == filename:
-                    item.setForeground(QColor("green"))
-                    # Show more info in the list item
-                    item.setText(f"{item_text} (完成 ✔ | {kept_frames} 帧 | TW: {tw_speed:.1f}%)")
-                    item.setToolTip(f"输出: {output_path}") # Show output path on hover
-                    break
-            self.status_label.setText(f"状态: {filename} 处理完成 ({kept_frames} 帧).")
-
-    def on_batch_file_error(self, filename, error_message):
+            skipped = bool(report.get('skipped'))
+            self.batch_model.update(video_path, status=STATUS_SKIPPED if skipped else STATUS_DONE, progress=100,
+                                    kept_frames=kept_frames, tw_speed=tw_speed, message=message,
+                                    output_path=output_path, report_path=report.get('report_path'))
+            self.status_label.setText(f"状态: {filename} {message if skipped else '处理完成'} ({kept_frames} 帧).")
+
+    def on_batch_file_error(self, video_path, error_message):
         """Handles error for one file within a batch."""
         if isinstance(self.current_processor, BatchProcessor):
+            filename = os.path.basename(video_path)
             logging.error(f"Batch: Error processing {filename}: {error_message}")
-            for i in range(self.video_list_widget.count()):
-                item = self.video_list_widget.item(i)
-                item_text = item.text().split(" (")[0]
-                if os.path.basename(item_text) == filename:
-                    item.setForeground(QColor("red"))
-                    item.setText(f"{item_text} (错误 ❌)")
-                    item.setToolTip(error_message)
-                    break
+            self.batch_model.update(video_path, status=STATUS_ERROR, message=error_message)
             self.status_label.setText(f"<font color='red'>错误处理 {filename}: {error_message}</font>")
 
     def on_batch_process_finished(self):
@@ -1196,12 +1455,12 @@ class MainWindow(QWidget):
         if isinstance(self.current_processor, BatchProcessor):
             logging.info("Batch processing finished signal received.")
             was_cancelled = not self.cancel_button.isEnabled()
+            total_count = len(self.current_processor.video_list)
             self.end_processing_state()
 
             # Count successes and failures
-            success_count = sum(1 for item_idx in range(self.video_list_widget.count()) if "✔" in self.video_list_widget.item(item_idx).text())
-            error_count = sum(1 for item_idx in range(self.video_list_widget.count()) if "❌" in self.video_list_widget.item(item_idx).text())
-            total_count = self.video_list_widget.count()
+            success_count = self.batch_model.count_status(STATUS_DONE, STATUS_SKIPPED)
+            error_count = self.batch_model.count_status(STATUS_ERROR)
 
             if not was_cancelled:
                  self.progress_bar.setValue(100)
@@ -1240,6 +1499,11 @@ class MainWindow(QWidget):
                 event.ignore()
                 return
 
+        self.prober.pool.clear() # Drop queued probes; running ones finish on their own
+        for scanner in self.scanners:
+            scanner.stop()
+            scanner.wait(2000)
+        self.settings.flush() # Write any debounced settings change before exit
         logging.info("Application closing.")
         super().closeEvent(event)
 
@@ -1247,6 +1511,13 @@ class MainWindow(QWidget):
     def resizeEvent(self, event):
         """Adjust watermark position on window resize."""
         super().resizeEvent(event)
+        self.position_watermark()
+
+    def show_watermark(self):
+        self.watermark_label.setText(watermark_protection.get_watermark())
+        self.position_watermark()
+
+    def position_watermark(self):
         label_size = self.watermark_label.sizeHint()
         margin = 5
         self.watermark_label.setGeometry(
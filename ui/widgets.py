@@ -1,8 +1,9 @@
 # ui/widgets.py
+import numpy as np
 from PyQt5.QtWidgets import (QSlider, QStyleOptionSlider, QStyle, QLabel,
-                             QProgressBar, QApplication)
+                             QProgressBar, QApplication, QWidget, QSizePolicy)
 from PyQt5.QtCore import Qt, QRect, QPropertyAnimation, QEasingCurve, QPoint
-from PyQt5.QtGui import QPainter, QColor, QPen, QBrush
+from PyQt5.QtGui import QPainter, QColor, QPen, QBrush, QImage
 
 class AEStyleSlider(QSlider):
     """A slider mimicking After Effects style with a value tooltip."""
@@ -191,9 +192,10 @@ class AnimatedProgressBar(QProgressBar):
 
     def setValue(self, value):
         """Sets the progress bar value with animation."""
-        # Stop existing animation before starting a new one
+        # Retarget a running animation instead of restarting it, so frequent updates stay smooth
         if self._animation.state() == QPropertyAnimation.Running:
-            self._animation.stop()
+            self._animation.setEndValue(int(value))
+            return
 
         # Only animate if the value changes significantly (optional optimization)
         #if abs(value - self.value()) > 1:
@@ -211,4 +213,100 @@ class AnimatedProgressBar(QProgressBar):
         # Return the target value if animating, otherwise current value
         if self._animation.state() == QPropertyAnimation.Running:
             return self._animation.endValue()
-        return super().value()
\ No newline at end of file
+        return super().value()
+
+class ScoreTimelineWidget(QWidget):
+    """Heatmap strip of per-frame metric scores (top) and keep/drop decisions (bottom) for a whole video.
+
+    Frames are binned to one column per pixel with numpy and rendered into a QImage,
+    so painting cost depends on the widget width, not on the frame count.
+    """
+    _UNPROCESSED_COLOR = (60, 60, 60)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(24)
+        self.setMaximumHeight(24)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.setToolTip("逐帧分数时间轴: 上半部分为变化分数 (蓝=低于阈值, 黄=接近阈值, 红=远高于阈值), "
+                        "下半部分为保留比例 (绿=保留, 暗=丢弃)")
+        self._scores = np.zeros(0, dtype=np.float32)
+        self._states = np.zeros(0, dtype=np.int8) # -1 = not analysed yet, 0 = dropped, 1 = kept
+        self._threshold = 1.0
+        self._image = None
+        self._image_data = None # Keeps the numpy buffer alive while QImage references it
+        self._dirty = True
+        self._lut = self._build_lut()
+
+    @staticmethod
+    def _build_lut():
+        """Blue -> yellow (at threshold) -> red colour ramp with 256 entries, indexed by score/threshold in [0, 2]."""
+        stops = np.array([0.0, 0.5, 1.0])
+        colors = np.array([[40, 70, 200], [240, 220, 60], [220, 40, 40]], dtype=np.float32)
+        positions = np.linspace(0.0, 1.0, 256)
+        return np.stack([np.interp(positions, stops, colors[:, c]) for c in range(3)], axis=1).astype(np.uint8)
+
+    def reset(self, total_frames, threshold):
+        """Clears the strip for a new video of total_frames frames and the given keep threshold."""
+        total_frames = max(0, int(total_frames))
+        self._scores = np.full(total_frames, np.nan, dtype=np.float32)
+        self._states = np.full(total_frames, -1, dtype=np.int8)
+        self._threshold = float(threshold)
+        self._dirty = True
+        self.update()
+
+    def add_scores(self, start, scores, keep_flags):
+        """Stores a chunk of per-frame scores/decisions starting at frame index start."""
+        end = min(start + len(scores), len(self._scores))
+        if start >= end:
+            return
+        count = end - start
+        self._scores[start:end] = scores[:count]
+        self._states[start:end] = np.asarray(keep_flags[:count], dtype=np.int8)
+        self._dirty = True
+        self.update() # Repaints are coalesced by Qt, the image is rebuilt lazily in paintEvent
+
+    def _rebuild_image(self, width):
+        """Downsamples the frame arrays into `width` bins and renders a width x 2 RGB image."""
+        n = len(self._scores)
+        rgb = np.empty((2, width, 3), dtype=np.uint8)
+        rgb[:] = self._UNPROCESSED_COLOR
+        if n > 0:
+            edges = np.linspace(0, n, width + 1).astype(np.int64)
+            starts = np.minimum(edges[:-1], n - 1)
+            counts = np.maximum(edges[1:] - edges[:-1], 1)
+
+            analysed = self._states >= 0
+            analysed_per_bin = np.add.reduceat(analysed.astype(np.int32), starts)
+            kept_per_bin = np.add.reduceat((self._states == 1).astype(np.int32), starts)
+            # fmax ignores NaN (first/last frames and frames that were never compared)
+            peak_scores = np.fmax.reduceat(self._scores, starts)
+
+            has_data = analysed_per_bin > 0
+            threshold = self._threshold if self._threshold > 0 else max(float(np.nanmax(self._scores, initial=0.0)), 1e-6)
+            ratio = np.nan_to_num(peak_scores / threshold, nan=0.0)
+            lut_index = np.clip(ratio / 2.0 * 255.0, 0, 255).astype(np.int64)
+            rgb[0][has_data] = self._lut[lut_index[has_data]]
+
+            kept_ratio = np.where(has_data, kept_per_bin / np.maximum(analysed_per_bin, 1), 0.0)
+            kept_ratio = kept_ratio * np.minimum(analysed_per_bin / counts, 1.0)
+            keep_rgb = np.stack([25 + 20 * kept_ratio, 35 + 165 * kept_ratio, 25 + 45 * kept_ratio], axis=1)
+            rgb[1][has_data] = keep_rgb[has_data].astype(np.uint8)
+
+        self._image_data = np.ascontiguousarray(rgb)
+        self._image = QImage(self._image_data.data, width, 2, width * 3, QImage.Format_RGB888)
+        self._dirty = False
+
+    def resizeEvent(self, event):
+        self._dirty = True
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        width = max(1, self.width())
+        if self._dirty or self._image is None or self._image.width() != width:
+            self._rebuild_image(width)
+        painter = QPainter(self)
+        score_height = int(self.height() * 0.65)
+        painter.drawImage(QRect(0, 0, width, score_height), self._image, QRect(0, 0, width, 1))
+        painter.drawImage(QRect(0, score_height, width, self.height() - score_height), self._image, QRect(0, 1, width, 1))
+        painter.end()
@@ -1,4 +1,5 @@
 # utils/constants.py
+import os
 
 # --- App Info ---
 APP_NAME = "动漫抽帧 V2.1" # 版本号更新
@@ -6,12 +7,54 @@ APP_AUTHOR = "Enjoy" # Or keep "笑颜" if preferred
 
 # --- Processing Defaults ---
 DEFAULT_FRAME_FOR_PREVIEW = 100
+TIMELINE_CHUNK_FRAMES = 240 # 每分析多少帧向时间轴热力图发送一次分数
+PROGRESS_REPORT_INTERVAL = 0.1 # 进度上报的最小间隔 (秒)，即最多 10 Hz
+CHECKPOINT_INTERVAL = 30.0 # 分析过程中保存断点续传检查点的间隔 (秒)
+JOB_DB_FILENAME = "jobs.sqlite3" # 批量任务历史数据库 (位于应用数据目录)，用于跳过已处理过的输入
+SCORE_CACHE_DIRNAME = "score_cache" # 每帧分数缓存目录 (位于应用数据目录)，切换算法/阈值时无需重新分析
+# 自适应步长: 相距 k 帧的两帧变化量低于 阈值 x 该比例 时, 视为静止区间, 中间帧不解码为图像直接丢弃
+ADAPTIVE_STATIC_RATIO = 0.5
+DUPLICATE_THUMB_SIZE = (64, 36) # 重复帧快速判断: 与上一帧的灰度缩略图 (宽, 高) 完全相同时直接丢弃, 不做模糊和比较
+SETTINGS_SAVE_DELAY = 0.5 # 设置修改后延迟写盘的时间 (秒)，期间的多次修改合并为一次写入
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv') # 可作为输入的视频扩展名 (小写)
+# 输出格式: MP4 视频、图片序列 (<输出名>.frames/frame_000000.png ...) 或只输出保留帧列表 (不写视频)
+OUTPUT_FORMAT_MP4 = "mp4"
+IMAGE_OUTPUT_FORMATS = ("png", "webp", "jpg")
+OUTPUT_FORMAT_DECISION_LIST = "list" # <输出名>.json / .csv / .edl
+OUTPUT_FORMAT_LABELS = {
+    "mp4": "MP4 视频",
+    "png": "PNG 图片序列 (无损)",
+    "webp": "WebP 图片序列",
+    "jpg": "JPEG 图片序列",
+    "list": "仅保留帧列表 (JSON/CSV/EDL, 不输出视频)",
+}
+IMAGE_WRITER_THREADS = min(8, os.cpu_count() or 1) # 图片序列编码/写入线程数
+IMAGE_WRITE_QUEUE_PER_THREAD = 2 # 每个写入线程最多排队的帧数 (限制内存占用)
+VIDEO_WRITE_QUEUE_SIZE = 8 # MP4 编码线程前最多排队的帧数 (限制内存占用)
+# 内存预算规划 (倒放 MP4 需要保留所有保留帧直到分析结束)
+MEMORY_BUDGET_FRACTION = 0.5 # 自动预算: 最多使用当前可用内存的该比例
+PLANNER_KEEP_RATIO = 0.6 # 预估保留帧比例 (偏保守)
+PLANNER_PNG_RATIO = 0.25 # 预估无损 PNG 压缩后大小 / 原始大小 (动漫画面通常更小)
+SCAN_CHUNK_SIZE = 500 # 扫描文件夹时每批加入列表的文件数
+SCAN_CHUNK_INTERVAL = 0.2 # 扫描文件夹时最长多久向列表推送一次结果 (秒)
+
+# --- Watch-Folder Mode ---
+WATCH_POLL_INTERVAL = 2.0    # 无 inotify 时的目录轮询间隔 (秒)
+WATCH_SETTLE_SECONDS = 5.0   # 文件大小/修改时间保持不变多久后才视为复制完成 (秒)
+WATCH_RESCAN_INTERVAL = 30.0 # 使用 inotify 时仍定期全量扫描 (网络共享上的远程写入不会触发 inotify)
 
 # --- Algorithm Identifiers ---
 ALGO_FRAME_DIFF = "帧差法 (Frame Difference)"
 ALGO_SSIM = "结构相似性 (SSIM)"
 ALGO_OPTICAL_FLOW = "光流法 (Optical Flow)"
 
+# Short algorithm names used in output file names, benchmarks and reports
+ALGO_SUFFIXES = {
+    ALGO_FRAME_DIFF: "fd",
+    ALGO_SSIM: "ssim",
+    ALGO_OPTICAL_FLOW: "flow",
+}
+
 # --- Parameter Presets ---
 # 格式: 'Preset Name': {'algorithm': ALGO_*, param1: value1, ...}
 # 注意: SSIM 的阈值是越接近1表示越相似，所以保留条件是 ssim < threshold
@@ -1,60 +1,90 @@
 # utils/helpers.py
+import re
 import sys
-import subprocess
-import importlib
+import importlib.util
 import logging
 
-def check_and_install_libraries():
-    """Checks for required libraries and installs them if missing."""
-    required_libraries = [
-        'PyQt5',
-        'opencv-python',
-        'numpy',
-        'cryptography',
-        'appdirs'
-    ]
-    installed_all = True
-    for library in required_libraries:
+from utils.constants import ALGO_FRAME_DIFF, ALGO_SSIM, ALGO_OPTICAL_FLOW
+
+# pip package name -> module looked up at startup
+REQUIRED_LIBRARIES = {
+    'PyQt5': 'PyQt5.QtCore',
+    'opencv-python': 'cv2',
+    'numpy': 'numpy',
+    'cryptography': 'cryptography',
+    'appdirs': 'appdirs',
+}
+# Only needed by one feature each; loaded lazily on first use
+OPTIONAL_LIBRARIES = {
+    'scikit-image': 'skimage', # SSIM algorithm
+    'python-vlc': 'vlc',       # VLC contrast preview
+}
+
+def find_missing_libraries(libraries=REQUIRED_LIBRARIES):
+    """Returns the pip package names whose modules cannot be found.
+
+    Uses importlib.util.find_spec only: nothing is imported (beyond parent packages) and nothing
+    is installed, so the probe costs milliseconds instead of loading every library.
+    """
+    missing = []
+    for library, module_name in libraries.items():
         try:
-            # Module name might differ from package name (e.g., opencv-python -> cv2)
-            module_name = library.replace('-', '_')
-            if library == 'opencv-python':
-                module_name = 'cv2'
-            elif library == 'PyQt5':
-                 # Check for a core module like QtCore
-                 importlib.import_module('PyQt5.QtCore')
-            else:
-                importlib.import_module(module_name)
-            logging.info(f"Library '{library}' is already installed.")
-            print(f"{library} 已安装")
-        except ImportError:
-            installed_all = False
-            print(f"{library} 未安装，正在安装...")
-            logging.info(f"Library '{library}' not found. Attempting installation.")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", library])
-                print(f"{library} 安装完成")
-                logging.info(f"Library '{library}' installed successfully.")
-            except subprocess.CalledProcessError as e:
-                print(f"无法安装 {library}. 请手动安装: pip install {library}")
-                logging.error(f"Failed to install {library}: {e}")
-                # Depending on how critical the lib is, you might want to exit
-                # sys.exit(f"Error: Could not install required library {library}")
-            except Exception as e:
-                print(f"安装 {library} 时发生未知错误: {e}")
-                logging.error(f"Unknown error installing {library}: {e}")
-
-    return installed_all
+            found = importlib.util.find_spec(module_name) is not None
+        except (ImportError, ValueError): # Parent package missing / broken module spec
+            found = False
+        if found:
+            logging.debug(f"Library '{library}' found.")
+        else:
+            missing.append(library)
+            logging.warning(f"Library '{library}' not found (module '{module_name}'). Install with: pip install {library}")
+    return missing
+
+def params_from_preset(preset, base_params=None):
+    """Converts a PRESETS entry into (algorithm, params) using the processor's parameter keys.
+
+    Presets use short keys ('threshold', 'blur_size', ...) that depend on the algorithm; this applies
+    the same mapping as MainWindow.apply_preset on top of base_params.
+    """
+    params = dict(base_params or {})
+    algorithm = preset.get('algorithm', ALGO_FRAME_DIFF)
+    if algorithm == ALGO_FRAME_DIFF:
+        params['f_diff_threshold'] = preset.get('threshold', 15)
+        params['f_diff_min_area'] = preset.get('min_area', 500)
+        params['f_diff_blur_size'] = preset.get('blur_size', 5)
+    elif algorithm == ALGO_SSIM:
+        params['ssim_threshold'] = preset.get('ssim_threshold', 0.98)
+        params['ssim_blur_size'] = preset.get('blur_size', 5)
+    elif algorithm == ALGO_OPTICAL_FLOW:
+        params['flow_threshold'] = preset.get('flow_threshold', preset.get('flow_sensitivity', 1.0))
+        params['flow_blur_size'] = preset.get('blur_size', 7)
+    return algorithm, params
+
+def preset_slug(preset_name):
+    """File-name suffix for a preset: '高速动作 (High Action)' -> 'high_action'."""
+    english = preset_name[preset_name.find("(") + 1:preset_name.rfind(")")] if "(" in preset_name else preset_name
+    return re.sub(r'[^0-9a-z]+', '_', english.lower()).strip('_') or "preset"
 
 def setup_logging(log_file_path):
     """Configures logging for the application."""
     logging.basicConfig(filename=log_file_path, level=logging.DEBUG,
                         format='%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
-                        encoding='utf-8') # Specify encoding for wider compatibility
+                        encoding='utf-8', # Specify encoding for wider compatibility
+                        force=True) # Settings() logs before this runs, which already installed a default stderr handler
     print(f"日志文件位于: {log_file_path}")
 
 def custom_exception_hook(exctype, value, traceback):
     """Custom exception handler to log unhandled exceptions."""
     logging.error("Unhandled exception caught by hook:", exc_info=(exctype, value, traceback))
     # Call the default excepthook to print to stderr
-    sys.__excepthook__(exctype, value, traceback)
\ No newline at end of file
+    sys.__excepthook__(exctype, value, traceback)
+
+def format_duration(seconds):
+    """Formats a duration in seconds as MM:SS (or H:MM:SS); negative values mean unknown."""
+    if seconds is None or seconds < 0:
+        return "--:--"
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
\ No newline at end of file
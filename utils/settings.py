@@ -1,13 +1,24 @@
 # utils/settings.py
 import os
 import json
+import atexit
 import logging
+import tempfile
+import threading
+from contextlib import contextmanager
 import appdirs
-from utils.constants import APP_NAME, APP_AUTHOR, ALGO_FRAME_DIFF # Import constants
+from utils.constants import APP_NAME, APP_AUTHOR, ALGO_FRAME_DIFF, SETTINGS_SAVE_DELAY # Import constants
+
+_MISSING = object() # Sentinel: key not present in the settings dict
 
 class Settings:
-    """Manages application settings persistence using JSON."""
-    def __init__(self):
+    """Manages application settings persistence using JSON.
+
+    set()/update() change the in-memory values and schedule one debounced save
+    (SETTINGS_SAVE_DELAY); batch() groups several changes into a single transaction.
+    Saves are atomic (temp file + os.replace), and pending changes are flushed at exit.
+    """
+    def __init__(self, save_delay=SETTINGS_SAVE_DELAY):
         self.app_dir = appdirs.user_data_dir(APP_NAME, APP_AUTHOR)
         os.makedirs(self.app_dir, exist_ok=True)
         # 使用新版本号的文件名，避免与旧版冲突
@@ -17,9 +28,17 @@ class Settings:
         self.default_settings = {
             # --- General ---
             "reverse_video": False,
+            "output_format": "mp4", # mp4 视频, 或 png / webp / jpg 图片序列
+            "ab_presets": [], # A/B 额外输出: 同一次解码中按这些预设额外输出 (文件名加预设后缀)
+            "all_metrics": False, # 一次解码同时计算全部算法的分数并缓存, 之后切换算法无需重新分析
+            "adaptive_stride": 1, # 自适应步长 k (1 = 关闭): 先比较相距 k 帧的两帧, 只细分有变化的区间
             "preview_frame_index": 100,
             "last_input_dir": "",
             "last_output_dir": "",
+            "batch_workers": 1, # 批量处理时并行处理的文件数
+            "memory_budget_mb": 0, # 倒放时保存保留帧可用的内存 (MB), 0 = 自动 (可用内存的一半)
+            "video_extensions": ".mp4 .avi .mov .mkv", # 添加/扫描文件夹时接受的扩展名
+            "scan_exclude_outputs": True, # 扫描文件夹时跳过本程序生成的输出文件
             # --- Algorithm Choice ---
             "selected_algorithm": ALGO_FRAME_DIFF, # 默认算法
             # --- Frame Difference Params ---
@@ -34,7 +53,13 @@ class Settings:
             "flow_blur_size": 7,
         }
         self.settings = {} # Initialize empty
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._batch_depth = 0
+        self._save_timer = None
         self.load()
+        atexit.register(self.flush)
         logging.info(f"Settings loaded from: {self.filename}")
         logging.info(f"Log file location: {self.log_file}")
 
@@ -86,15 +111,60 @@ class Settings:
 
 
     def save(self):
-        """Saves current settings to the JSON file."""
+        """Saves current settings to the JSON file atomically (temp file in the same directory + os.replace)."""
+        with self._lock:
+            self._cancel_save_timer()
+            snapshot = dict(self.settings)
+            self._dirty = False
+        tmp_path = None
         try:
-            with open(self.filename, 'w', encoding='utf-8') as f:
-                json.dump(self.settings, f, indent=4)
+            fd, tmp_path = tempfile.mkstemp(prefix=".settings_", suffix=".tmp", dir=self.app_dir)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filename) # Readers see either the old or the new file, never a torn one
+            tmp_path = None
             logging.debug("Settings saved.")
-        except IOError as e:
+        except (IOError, OSError) as e:
             logging.error(f"Could not save settings to {self.filename}: {e}")
+            self._dirty = True # Retry on the next flush
         except Exception as e:
             logging.error(f"Unexpected error saving settings: {e}")
+        finally:
+            if tmp_path is not None:
+                try: os.remove(tmp_path)
+                except OSError: pass
+
+    def flush(self):
+        """Writes pending changes now (no-op if nothing changed since the last save)."""
+        with self._lock:
+            if not self._dirty:
+                self._cancel_save_timer()
+                return
+        self.save()
+
+    def _cancel_save_timer(self):
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
+
+    def _schedule_save(self):
+        """(Re)starts the debounce timer; several changes in quick succession produce one write."""
+        with self._lock:
+            if not self._dirty or self._batch_depth:
+                return
+            self._cancel_save_timer()
+            if self.save_delay <= 0:
+                timer = None
+            else:
+                timer = threading.Timer(self.save_delay, self.flush)
+                timer.daemon = True
+                self._save_timer = timer
+        if timer is None:
+            self.save()
+        else:
+            timer.start()
 
     # --- 修改 get 方法 ---
     def get(self, key):
@@ -108,6 +178,34 @@ class Settings:
     # --- 修改结束 ---
 
     def set(self, key, value):
-        """Sets a setting value by key and saves the settings."""
-        self.settings[key] = value
-        self.save()
\ No newline at end of file
+        """Sets a setting value by key; the file is written shortly after (see flush())."""
+        self.update({key: value})
+
+    def update(self, values):
+        """Sets several values at once with a single (debounced) save."""
+        with self._lock:
+            for key, value in values.items():
+                if self.settings.get(key, _MISSING) != value:
+                    self.settings[key] = value
+                    self._dirty = True
+        self._schedule_save()
+
+    @contextmanager
+    def batch(self):
+        """Groups set()/update() calls into one transaction: saved once at the end, rolled back on error."""
+        with self._lock:
+            self._batch_depth += 1
+            snapshot = dict(self.settings)
+            was_dirty = self._dirty
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self.settings = snapshot
+                self._dirty = was_dirty
+            raise
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+        self._schedule_save()
+
@@ -3,14 +3,25 @@ import hashlib
 import time
 import random
 import sys
-from cryptography.fernet import Fernet
 import logging
 
 class WatermarkProtection:
     """Handles encryption and integrity check for a watermark."""
     def __init__(self, watermark_text):
         self.watermark = watermark_text
+        # cryptography is imported on first use (verify_integrity / get_watermark), not at import time
+        self._initialized = False
+        self.key = None
+        self.cipher_suite = None
+        self.encrypted_watermark = None
+        self.checksum = None
+
+    def _ensure_initialized(self):
+        if self._initialized:
+            return
+        self._initialized = True
         try:
+            from cryptography.fernet import Fernet
             self.key = Fernet.generate_key()
             self.cipher_suite = Fernet(self.key)
             self.encrypted_watermark = self._encrypt_watermark()
@@ -43,6 +54,7 @@ class WatermarkProtection:
 
     def verify_integrity(self):
         """Checks if the watermark data has been tampered with."""
+        self._ensure_initialized()
         if not self.checksum or not self.encrypted_watermark:
             logging.warning("Integrity check skipped: Watermark not initialized properly.")
             # Depending on security needs, you might return False here
@@ -54,6 +66,7 @@ class WatermarkProtection:
 
     def get_watermark(self):
         """Returns the decrypted watermark if integrity check passes."""
+        self._ensure_initialized()
         if self.verify_integrity() and self.encrypted_watermark:
             return self._decrypt_watermark(self.encrypted_watermark)
         logging.warning("Could not retrieve watermark due to integrity check failure or initialization error.")